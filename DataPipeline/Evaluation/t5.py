@@ -6,7 +6,7 @@ from google.cloud import storage
 import tempfile
 import os
 import json
-import mysql.connector
+from database import execute_batch, execute_query
 from datetime import datetime
 
 os.environ["TOKENIZERS_PARALLELISM"] = "false"
@@ -123,25 +123,13 @@ def compare_roberta_with_saved(new_file_path, gcp_bucket="auditpulse-data", gcs_
 
 
 def files_to_be_evaluated():
-    # Step 1: Database connection config
-    mysql_conn = mysql.connector.connect(
-        host='34.46.191.121',
-        port=3306,
-        user='root',
-        database='auditpulse',
-        password=os.getenv('MYSQL_GCP_PASS')
-    )
-
-    mysql_cursor = mysql_conn.cursor()
-
     query = """
     SELECT run_id, audit_report_path, prompt_path
     FROM runs
     WHERE evaluation_status is NULL AND audit_report_path IS NOT NULL;
     """
 
-    mysql_cursor.execute(query)
-    id_and_paths = mysql_cursor.fetchall()  # Use fetchall() to get the result
+    id_and_paths = execute_query(query, fetch='all')
     path=[]
     run_id=[]
     prompt_path=[]
@@ -151,9 +139,6 @@ def files_to_be_evaluated():
         run_id.append(id_and_path[0])
         prompt_path.append(id_and_path[2])
 
-    # No need to commit after a SELECT query
-    mysql_cursor.close()
-    mysql_conn.close()
     return [path, run_id, prompt_path]
 
 def download_specific_files_from_gcp(bucket_name, folder_name, local_folder, file_paths):
@@ -211,38 +196,24 @@ def simple_md_to_txt(md_path, txt_path):
 
 
 def update_metrice_table(file_path, sbert_score, mbert_score, bert_score, roberta_score, run_id, path):
-    # Step 1: Database connection config
-    mysql_conn = mysql.connector.connect(
-        host='34.46.191.121',
-        port=3306,
-        user='root',
-        database='auditpulse',
-        password=os.getenv('MYSQL_GCP_PASS')
-    )
-
-    mysql_cursor = mysql_conn.cursor()
-
-    # Step 2: Insert into the metrics table
+    # Step 1: Insert into the metrics table
     insert_query = """
     INSERT INTO metrics (gen_report, sbert_score, mbert_score, bert_score, roberta_score, run_id, prompt_path)
     VALUES (%s, %s, %s, %s, %s, %s, %s);
     """
-    mysql_cursor.execute(insert_query, (file_path, sbert_score, mbert_score, bert_score, roberta_score, run_id, path))
 
-    # Step 3: Update the runs table
+    # Step 2: Update the runs table
     update_query = """
     UPDATE runs
     SET evaluation_status = 1
     WHERE run_id = %s;
     """
-    mysql_cursor.execute(update_query, (run_id,))  # run_id is used for updating the evaluation_status
-    
-    # Commit the changes to the database
-    mysql_conn.commit()
 
-    # Step 4: Close the cursor and connection
-    mysql_cursor.close()
-    mysql_conn.close()
+    # Both statements commit in one transaction
+    execute_batch([
+        (insert_query, (file_path, sbert_score, mbert_score, bert_score, roberta_score, run_id, path)),
+        (update_query, (run_id,)),  # run_id is used for updating the evaluation_status
+    ])
 
 def clear_temp_folder(folder_path="temp"):
     if os.path.exists(folder_path):
@@ -261,24 +232,11 @@ def clear_temp_folder(folder_path="temp"):
 
 
 def alert_trigger(run_id):
-    # Step 1: Connect to MySQL and fetch full run data
-    mysql_conn = mysql.connector.connect(
-        host='34.46.191.121',
-        port=3306,
-        user='root',
-        database='auditpulse',
-        password=os.getenv('MYSQL_GCP_PASS')
-    )
-    mysql_cursor = mysql_conn.cursor(dictionary=True)
-
-    # Get full details for the run_id
-    mysql_cursor.execute("SELECT * FROM runs WHERE run_id = %s", (run_id,))
-    run_data = mysql_cursor.fetchone()
+    # Step 1: Fetch full run data
+    run_data = execute_query("SELECT * FROM runs WHERE run_id = %s", (run_id,), fetch='one', dictionary=True)
 
     if not run_data:
         print(f"No data found for run_id {run_id}")
-        mysql_cursor.close()
-        mysql_conn.close()
         return
 
     # Step 2: Prepare alert content
@@ -299,8 +257,6 @@ def alert_trigger(run_id):
 
     # Clean up
     os.remove(alert_filepath)
-    mysql_cursor.close()
-    mysql_conn.close()
 
 
 if __name__ == "__main__":
@@ -46,11 +46,9 @@ class TestSimilarityPipeline(unittest.TestCase):
         self.assertIsInstance(result, float)
         os.remove('temp_test.txt')
 
-    @patch('t5.mysql.connector.connect')
-    def test_files_to_be_evaluated(self, mock_connect):
-        mock_cursor = MagicMock()
-        mock_cursor.fetchall.return_value = [(1, 'gen.md', 'prompt.md')]
-        mock_connect.return_value.cursor.return_value = mock_cursor
+    @patch('t5.execute_query')
+    def test_files_to_be_evaluated(self, mock_execute_query):
+        mock_execute_query.return_value = [(1, 'gen.md', 'prompt.md')]
         result = t5.files_to_be_evaluated()
         expected = [['gen.md'], [1], ['prompt.md']]
         self.assertEqual(result, expected)
@@ -68,21 +66,15 @@ class TestSimilarityPipeline(unittest.TestCase):
         mock_bucket.blob.return_value = mock_blob
         mock_storage_client.return_value.bucket.return_value = mock_bucket
 
-        mock_conn = MagicMock()
-        mock_cursor = MagicMock()
-        mock_cursor.fetchone.return_value = {"run_id": 1, "value": "some"}
-        mock_conn.cursor.return_value = mock_cursor
-
-        with patch('t5.mysql.connector.connect', return_value=mock_conn):
+        with patch('t5.execute_query', return_value={"run_id": 1, "value": "some"}):
             t5.alert_trigger(1)
             self.assertTrue(mock_blob.upload_from_filename.called)
 
-    @patch('t5.mysql.connector.connect')
-    def test_update_metrics_table(self, mock_connect):
-        mock_cursor = MagicMock()
-        mock_connect.return_value.cursor.return_value = mock_cursor
+    @patch('t5.execute_batch')
+    def test_update_metrics_table(self, mock_execute_batch):
         t5.update_metrice_table("file", 0.91, 0.92, 0.88, 0.93, 1, "prompt")
-        self.assertTrue(mock_cursor.execute.called)
+        self.assertTrue(mock_execute_batch.called)
+        self.assertEqual(len(mock_execute_batch.call_args[0][0]), 2)
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,87 @@
+"""
+Measures worker startup cost in fresh interpreters.
+
+Reports the import time of the worker and flow modules, and the worker's
+time-to-first-pull: the time from interpreter start until `subscriber` opens its
+streaming pull. Pub/Sub and Cloud Storage clients are replaced by stand-ins so the
+benchmark needs no GCP credentials.
+
+Usage:
+    python benchmarks/startup_benchmark.py --repeats 5
+"""
+import os
+import sys
+import argparse
+import statistics
+import subprocess
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src')
+
+IMPORT_SNIPPET = """
+import time
+start = time.perf_counter()
+import {module}
+print(time.perf_counter() - start)
+"""
+
+FIRST_PULL_SNIPPET = """
+import time
+start = time.perf_counter()
+from unittest import mock
+import app
+
+class FirstPull(BaseException):
+    pass
+
+def subscribe(*args, **kwargs):
+    print(time.perf_counter() - start)
+    raise FirstPull()
+
+with mock.patch.object(app.pubsub_v1, 'SubscriberClient') as subscriber_client, \\
+     mock.patch.object(app.storage, 'Client'):
+    subscriber_client.return_value.subscribe.side_effect = subscribe
+    try:
+        app.subscriber(0, 'prompts')
+    except FirstPull:
+        pass
+"""
+
+
+def measure(snippet, repeats):
+    """
+    Runs a snippet in fresh interpreters and collects the duration it prints.
+
+    Args:
+        snippet (str): Python code that prints a duration in seconds as its last line.
+        repeats (int): Number of interpreters to start.
+
+    Returns:
+        list[float]: Durations in seconds.
+    """
+    durations = []
+    for _ in range(repeats):
+        result = subprocess.run([sys.executable, '-c', snippet], cwd=SRC_DIR, capture_output=True, text=True)
+        if result.returncode != 0:
+            raise RuntimeError(result.stderr)
+        durations.append(float(result.stdout.strip().splitlines()[-1]))
+    return durations
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeats', type=int, default=5)
+    args = parser.parse_args()
+
+    benchmarks = {
+        'import app': IMPORT_SNIPPET.format(module='app'),
+        'import auditpulse_flow.main': IMPORT_SNIPPET.format(module='auditpulse_flow.main'),
+        'time to first pull': FIRST_PULL_SNIPPET,
+    }
+    print(f"{'benchmark':<30}{'median (s)':>12}{'max (s)':>12}")
+    for name, snippet in benchmarks.items():
+        durations = measure(snippet, args.repeats)
+        print(f"{name:<30}{statistics.median(durations):>12.3f}{max(durations):>12.3f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,120 @@
+"""
+Measures the duration pairing behind the visualization report on synthetic event logs.
+
+Generates an event log of interleaved LLM and tool calls, half of them without a
+call_id like logs written before calls were tagged, and times `pair_durations`
+against the previous row-by-row pairing. The previous pairing is quadratic, so it
+runs on a smaller log given by --legacy-events.
+
+Usage:
+    python benchmarks/visualization_benchmark.py --events 50000 --repeats 3
+"""
+import os
+import sys
+import time
+import argparse
+import statistics
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+from log_visualization.vizCreator import pair_durations
+
+
+def make_events(n_events, seed=0):
+    """
+    Builds a synthetic event log.
+
+    Args:
+        n_events (int): Approximate number of events, two per call.
+        seed (int): Seed of the random durations.
+
+    Returns:
+        pd.DataFrame: Events sorted by timestamp, as returned by `load_events`.
+    """
+    rng = np.random.default_rng(seed)
+    n_calls = n_events // 2
+    kinds = rng.choice(['llm_call', 'tool_usage'], size=n_calls, p=[0.7, 0.3])
+    # Calls of a thread run one after the other, spread them over four threads.
+    gaps = rng.exponential(2.0, size=n_calls)
+    durations = rng.lognormal(1.0, 0.8, size=n_calls)
+    thread = np.arange(n_calls) % 4
+    starts = np.zeros(n_calls)
+    for t in range(4):
+        mask = thread == t
+        starts[mask] = np.cumsum(gaps[mask] + np.concatenate([[0], durations[mask][:-1]]))
+    base = pd.Timestamp('2025-01-01')
+    call_ids = np.where(np.arange(n_calls) % 2 == 0, [f'call-{i}' for i in range(n_calls)], None)
+    end_types = np.where(kinds == 'llm_call', 'llm_call_completed', 'tool_usage_finished')
+    events = pd.DataFrame({
+        'type': np.concatenate([np.char.add(kinds.astype(str), '_started'), end_types]),
+        'timestamp': base + pd.to_timedelta(np.concatenate([starts, starts + durations]), unit='s'),
+        'call_id': np.concatenate([call_ids, call_ids]),
+    })
+    return events.sort_values('timestamp', kind='stable').reset_index(drop=True)
+
+
+def legacy_pair_durations(events):
+    """Previous pairing: every start takes the first unused end after it, row by row."""
+    duration_df = []
+    for event_prefix, event_kind in [('LLM CALL', 'llm_call'), ('TOOL USAGE', 'tool_usage')]:
+        starts = events[events['type'] == f"{event_kind}_started"].copy()
+        ends = events[events['type'].isin([f"{event_kind}_completed", f"{event_kind}_finished"])].copy()
+
+        for _, start in starts.iterrows():
+            later_ends = ends[ends['timestamp'] > start['timestamp']]
+            if not later_ends.empty:
+                end = later_ends.iloc[0]
+                duration_df.append({
+                    'Type': event_prefix,
+                    'Start': start['timestamp'],
+                    'End': end['timestamp'],
+                    'Duration (s)': (end['timestamp'] - start['timestamp']).total_seconds()
+                })
+                ends.drop(end.name, inplace=True)
+    return pd.DataFrame(duration_df)
+
+
+def measure(func, events, repeats):
+    """
+    Times a pairing function.
+
+    Args:
+        func (callable): Pairing function taking the events.
+        events (pd.DataFrame): Event log.
+        repeats (int): Number of runs.
+
+    Returns:
+        list[float]: Durations in seconds.
+    """
+    durations = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func(events)
+        durations.append(time.perf_counter() - start)
+    return durations
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--events', type=int, default=50000)
+    parser.add_argument('--legacy-events', type=int, default=5000)
+    parser.add_argument('--repeats', type=int, default=3)
+    args = parser.parse_args()
+
+    events = make_events(args.events)
+    legacy_events = make_events(args.legacy_events)
+    benchmarks = {
+        f'pair_durations ({len(events)} events)': (pair_durations, events),
+        f'pair_durations ({len(legacy_events)} events)': (pair_durations, legacy_events),
+        f'legacy pairing ({len(legacy_events)} events)': (legacy_pair_durations, legacy_events),
+    }
+    print(f"{'benchmark':<40}{'median (s)':>12}{'max (s)':>12}")
+    for name, (func, bench_events) in benchmarks.items():
+        durations = measure(func, bench_events, args.repeats)
+        print(f"{name:<40}{statistics.median(durations):>12.3f}{max(durations):>12.3f}")
+
+
+if __name__ == '__main__':
+    main()
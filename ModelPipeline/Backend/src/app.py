@@ -10,48 +10,192 @@ import traceback
 import json
 import glob
 import shutil
-import re
+import signal
+import gzip
+import threading
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
 
 import base64
 from data_validation.data_validation import DataValidator
-from log_visualization.vizCreator import createVisualizations
+from database import execute_batch, execute_query
+from auditpulse_flow.checkpoint import RunCheckpoint
+from auditpulse_flow.event_log import start_event_log, get_event_log, close_event_log
+from auditpulse_flow.report_assembler import REPORT_SECTIONS
+from auditpulse_flow.result_store import InflightRuns, get_result_store, make_result_key
+from auditpulse_flow.llm_config import LLM_MODEL
+from status_channel import publish_status
 
 from google.cloud import firestore, storage
 from google.cloud import pubsub_v1
-import mysql.connector
+from google.cloud.pubsub_v1.subscriber.scheduler import ThreadScheduler
 from multiprocessing import Process
 
+_run_log_sink = contextvars.ContextVar('run_log_sink', default=None)
+_debug_log_sink = contextvars.ContextVar('debug_log_sink', default=None)
+
+class LogSink:
+    """
+    Buffered log file of a run, kept open for the whole run.
+
+    Writes go to an in-memory buffer that is flushed every `flush_interval` seconds by
+    a background thread, on rotation and on close. Once the file grows past `max_bytes`
+    it is rotated to log_path.1, log_path.2, ... keeping `backup_count` old files.
+
+    Attributes:
+        log_path (str): Path of the log file.
+        max_bytes (int): Size in bytes above which the file is rotated.
+        backup_count (int): Number of rotated files kept.
+        flush_interval (float): Seconds between flushes of the buffer.
+    """
+    _open_sinks = set()
+    _open_sinks_lock = threading.Lock()
+    _flusher = None
+
+    def __init__(self, log_path, max_bytes=64*1024*1024, backup_count=3, flush_interval=2.0, buffer_size=64*1024):
+        self.log_path = log_path
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.flush_interval = flush_interval
+        self.buffer_size = buffer_size
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(log_path) or '.', exist_ok=True)
+        self._file = open(log_path, 'a', encoding='utf-8', buffering=buffer_size)
+        self._size = self._file.tell()
+        with LogSink._open_sinks_lock:
+            LogSink._open_sinks.add(self)
+            if LogSink._flusher is None:
+                LogSink._flusher = threading.Thread(target=LogSink._flush_open_sinks, args=(flush_interval,), daemon=True)
+                LogSink._flusher.start()
+
+    @classmethod
+    def _flush_open_sinks(cls, flush_interval):
+        while True:
+            time.sleep(flush_interval)
+            with cls._open_sinks_lock:
+                sinks = list(cls._open_sinks)
+            for sink in sinks:
+                sink.flush()
+
+    def write(self, data):
+        with self._lock:
+            if self._file is None:
+                return
+            self._file.write(data)
+            self._size += len(data)
+            if self._size >= self.max_bytes:
+                self._rotate()
+
+    def _rotate(self):
+        self._file.close()
+        for idx in range(self.backup_count - 1, 0, -1):
+            if os.path.exists(f"{self.log_path}.{idx}"):
+                os.replace(f"{self.log_path}.{idx}", f"{self.log_path}.{idx+1}")
+        if self.backup_count > 0:
+            os.replace(self.log_path, f"{self.log_path}.1")
+        self._file = open(self.log_path, 'w', encoding='utf-8', buffering=self.buffer_size)
+        self._size = 0
+
+    def flush(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.flush()
+
+    def close(self):
+        with LogSink._open_sinks_lock:
+            LogSink._open_sinks.discard(self)
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+class RunRetry(Exception):
+    """Raised by a failed run that will be redelivered, with the number of attempts it made so far"""
+    def __init__(self, message, attempt):
+        super().__init__(message)
+        self.attempt = attempt
+
 class TeeStream:
-    """Take the standard output and writes it to file"""
-    def __init__(self, original_stream, log_file):
+    """Take the standard output and writes it to the log sink of the run active in the current context"""
+    def __init__(self, original_stream, log_sink_var):
         self.original_stream = original_stream
-        self.log_file = log_file
+        self.log_sink_var = log_sink_var
         
     def write(self, data):
         self.original_stream.write(data)
         self.original_stream.flush()
-        with open(self.log_file, 'a', encoding='utf-8') as f:
-            f.write(data)
+        log_sink = self.log_sink_var.get()
+        if log_sink:
+            log_sink.write(data)
             
     def flush(self):
         self.original_stream.flush()
 
+class RunLogHandler(logging.Handler):
+    """Writes log records to the debug log sink of the run active in the current context"""
+    def emit(self, record):
+        log_sink = _debug_log_sink.get()
+        if log_sink:
+            try:
+                log_sink.write(self.format(record) + '\n')
+            except Exception:
+                self.handleError(record)
+
 def setup_logging(run_log_file, debug_log_file, log_level=logging.INFO):
     """Set up logging that captures all stdout and stderr"""
-    # Set up normal logging for your custom log messages
-    logging.basicConfig(
-        level=log_level,
-        format="%(asctime)s - %(levelname)s - %(message)s",
-        handlers=[
-            logging.StreamHandler(),
-            logging.FileHandler(debug_log_file)
-        ]
-    )
-    
-    # Redirect stdout to both console and file
-    sys.stdout = TeeStream(sys.stdout, run_log_file)
-    sys.stderr = TeeStream(sys.stderr, debug_log_file)
-    
+    # The handlers and streams are shared by every run in the process, so they are installed
+    # once and each run only sets the log sinks of its own context.
+    root_logger = logging.getLogger()
+    root_logger.setLevel(log_level)
+    if not any(isinstance(handler, RunLogHandler) for handler in root_logger.handlers):
+        formatter = logging.Formatter("%(asctime)s - %(levelname)s - %(message)s")
+        for handler in (logging.StreamHandler(), RunLogHandler()):
+            handler.setFormatter(formatter)
+            root_logger.addHandler(handler)
+
+    # Redirect stdout to both console and file.
+    if not isinstance(sys.stdout, TeeStream):
+        sys.stdout = TeeStream(sys.stdout, _run_log_sink)
+    if not isinstance(sys.stderr, TeeStream):
+        sys.stderr = TeeStream(sys.stderr, _debug_log_sink)
+    _run_log_sink.set(LogSink(run_log_file))
+    _debug_log_sink.set(LogSink(debug_log_file))
+
+def flush_logging():
+    """Flushes the log sinks of the current run, e.g. before the log files are read or uploaded"""
+    for log_sink_var in (_run_log_sink, _debug_log_sink):
+        if log_sink_var.get():
+            log_sink_var.get().flush()
+    if get_event_log():
+        get_event_log().flush()
+
+def teardown_logging():
+    """Closes the log sinks of the current run and detaches them from its context"""
+    for log_sink_var in (_run_log_sink, _debug_log_sink):
+        if log_sink_var.get():
+            log_sink_var.get().close()
+            log_sink_var.set(None)
+    close_event_log()
+
+def get_worker_config():
+    """
+    Reads the worker runtime configuration from the environment.
+
+    Returns:
+        dict: Number of worker processes, concurrent runs per process, the in-flight
+              LLM call limit used for backpressure, the idle timeout in seconds,
+              how long a message may stay leased while its run is in flight and
+              how many times a failing run is attempted before it is marked failed.
+    """
+    return {
+        'num_workers': int(os.getenv('AUDITPULSE_NUM_WORKERS', 1)),
+        'runs_per_worker': int(os.getenv('AUDITPULSE_RUNS_PER_WORKER', 4)),
+        'max_inflight_llm_calls': int(os.getenv('AUDITPULSE_MAX_INFLIGHT_LLM_CALLS', 8)),
+        'idle_timeout': float(os.getenv('AUDITPULSE_IDLE_TIMEOUT', 'inf')),
+        'max_lease_duration': int(os.getenv('AUDITPULSE_MAX_LEASE_SECONDS', 2*60*60)),
+        'max_run_attempts': int(os.getenv('AUDITPULSE_MAX_RUN_ATTEMPTS', 3)),
+    }
+
 def get_input_data(envelope):
     data = envelope.data
     data = json.loads(data)
@@ -66,6 +210,10 @@ def get_input_data(envelope):
             company_ticker, 
             year)
 
+def get_force_refresh(envelope):
+    """Returns True when the request asks for a new report even if a fresh one exists."""
+    return bool(json.loads(envelope.data).get('force_refresh', False))
+
 def get_document(db_client, collection_name, document_name):
     """
     Retrieves a document from the Firestore database.
@@ -100,13 +248,92 @@ def get_query(type):
                         SET status=%s, audit_report_path=%s, explainability_report_path=%s, logs_path=%s, prompt_path=%s, message=%s
                         WHERE run_id=%s
                       """
-                    )
+                    ),
+        'visualization_update':(
+                        """
+                        UPDATE runs
+                        SET explainability_report_path=%s
+                        WHERE run_id=%s
+                        """
+                        ),
+        'message_update':(
+                        """
+                        UPDATE runs
+                        SET message=%s
+                        WHERE run_id=%s
+                        """
+                        ),
+        'status_select':(
+                        """
+                        SELECT status
+                        FROM runs
+                        WHERE run_id=%s
+                        """
+                        )
     }
     return mapping.get(type,None)
 
-def update_status(mysql_cursor, mysql_conn, query,values):
-    mysql_cursor.execute(query,values)
-    mysql_conn.commit()
+def update_status(query,values):
+    execute_query(query,values)
+
+def publish_run_update(values, run_ids=None):
+    """
+    Pushes the outcome written by a 'run_update' query to the frontend.
+
+    Args:
+        values (tuple): Values of the 'run_update' query.
+        run_ids (list): Runs sharing the outcome, the run of `values` by default.
+
+    Returns:
+        None
+    """
+    status, audit_report_path, visualization_path, _, _, message, run_id = values
+    for outcome_run_id in run_ids or [run_id]:
+        publish_status(outcome_run_id, status, audit_report_path=audit_report_path,
+                       explainability_report_path=visualization_path, message=message)
+
+def share_run_outcome(inflight_runs, result_key, run_id, values):
+    """
+    Releases the claim of a leading run and gives its outcome to the runs attached to it.
+
+    Args:
+        inflight_runs (InflightRuns): Claims of the runs in progress.
+        result_key (str): Key claimed by the run.
+        run_id (str): Leading run.
+        values (tuple): Values of the 'run_update' query of the leading run.
+
+    Returns:
+        list: run_ids of the attached runs.
+    """
+    try:
+        follower_run_ids = inflight_runs.release(result_key, run_id)
+    except Exception as e:
+        logging.error(f"Releasing the claim of run {run_id} failed: {e}")
+        return []
+    if follower_run_ids:
+        execute_batch([(get_query("run_update"), [values[:-1] + (follower_run_id,) for follower_run_id in follower_run_ids])])
+        publish_run_update(values, follower_run_ids)
+    return follower_run_ids
+
+def get_run_status(run_id):
+    row = execute_query(get_query('status_select'), (run_id,), fetch='one')
+    return row[0] if row else None
+
+def get_retry_backoff(delivery_attempt, base_delay=30, max_delay=600):
+    """
+    Computes how long a failed message stays invisible before it is redelivered.
+
+    Args:
+        delivery_attempt (int or None): Failed attempts so far, None if unknown. Pub/Sub only reports
+            the delivery attempt of subscriptions with a dead-letter policy.
+        base_delay (int): Delay in seconds after the first failed attempt.
+        max_delay (int): Upper bound in seconds, Pub/Sub rejects ack deadlines above 600.
+
+    Returns:
+        int: Seconds until the message should be redelivered.
+    """
+    attempt = max(1, delivery_attempt or 1)
+    return int(min(max_delay, base_delay * 2 ** (attempt - 1)))
 
 def update_collection(db_client, collection_name, document_name, updated_collection):
     """
@@ -126,6 +353,21 @@ def update_collection(db_client, collection_name, document_name, updated_collect
     policy_collection = db_client.collection(collection_name).document(document_name)
     policy_collection.update(updated_collection)
 
+def get_policy_version(deployment_config):
+    """
+    Identifies the active policy of a deployment.
+
+    Args:
+        deployment_config (dict): The Firestore deployment document.
+
+    Returns:
+        str: The 'active_policy_version' field if present, else the file name of the active policy.
+    """
+    version = deployment_config.get('active_policy_version')
+    if not version:
+        version = os.path.splitext(os.path.basename(deployment_config.get('active_policy_path', '')))[0]
+    return version or 'local'
+
 def download_from_gcp(bucket, gcp_file_path, local_file_path):
     # if os.path.exists(local_file_path):
     #     return
@@ -151,37 +393,45 @@ def upload_to_gcp(bucket, gcp_file_path, local_file_path):
     blob = bucket.blob(gcp_file_path)
     blob.upload_from_filename(local_file_path)
 
-def clean_markdown(content):
-    content = re.sub(r'^```\w*\s*\n', '', content)
-    content = re.sub(r'^```\s*\n', '', content)
-    content = re.sub(r'\n```\s*$', '', content)
-    content = re.sub(r'```markdown', '', content)
-    return content
-
-def compile_report(base_path, final_report_path):
-    if not os.path.exists(os.path.dirname(final_report_path)):
-        os.makedirs(os.path.dirname(final_report_path),exist_ok=True)
-    phase_task_mapping = {
-                        'client_acceptance':['client_background_task.md', 'financial_risk_task.md', 'engagement_scope_task.md'],
-                        'audit_planning':['preliminary_engagement_task.md','business_risk_task.md','internal_control_task.md','audit_strategy_task.md'],
-                        'testing_evidence':['control_testing_task.md','financial_statement_analysis_task.md','significant_transaction_testing_task.md','fraud_risk_assessment_task.md'],
-                        'evaluation_reporting':['evidence_evaluation_task.md','financial_statement_compliance_task.md','going_concern_task.md','audit_opinion_task.md']
-                        }
-    
-    with open(final_report_path, 'w') as final_report_file:
-        for phase in phase_task_mapping.keys():
-            for task_file in phase_task_mapping[phase]:
-                file = os.path.join(base_path, phase, task_file)
-                if not os.path.exists(file):
-                    raise ValueError(f"Missing phase: {phase}. File: {file}")
-                with open(file, 'r') as task_report_file:
-                    content = task_report_file.read().lstrip('```markdown').lstrip('```').rstrip('```')
-                    content = clean_markdown(content)
-                    final_report_file.write(content)
-                    final_report_file.write(f'\n')
-
-def compile_visualization(base_path, logs_path, final_visualization_path):
-    createVisualizations(logs_path, final_visualization_path)
+def upload_log_to_gcp(bucket, gcp_file_path, local_file_path, chunk_size=8*1024*1024):
+    """
+    Uploads a log file gzip compressed, in resumable chunks.
+
+    The segments `LogSink` rotated out of the file, local_file_path.1, .2, ..., are uploaded
+    next to it as gcp_file_path.1, .2, ... and removed once uploaded. GCS serves the objects
+    decompressed to clients that do not accept gzip.
+
+    Args:
+        bucket (google.cloud.storage.Bucket): GCP Storage bucket instance.
+        gcp_file_path (str): Destination path in GCP Cloud Storage.
+        local_file_path (str): Local file path of the log file.
+        chunk_size (int): Size of the resumable upload chunks in bytes.
+
+    Returns:
+        None
+    """
+    rotated_files = [path for path in glob.glob(glob.escape(local_file_path) + '.*')
+                     if path[len(local_file_path) + 1:].isdigit()]
+    rotated_files.sort(key=lambda path: int(path[len(local_file_path) + 1:]))
+    for log_file_path in [local_file_path] + rotated_files:
+        if not os.path.exists(log_file_path):
+            continue
+        compressed_file_path = log_file_path + '.gz'
+        with open(log_file_path, 'rb') as log_file, gzip.open(compressed_file_path, 'wb') as compressed_file:
+            shutil.copyfileobj(log_file, compressed_file)
+        try:
+            blob = bucket.blob(gcp_file_path + log_file_path[len(local_file_path):], chunk_size=chunk_size)
+            blob.content_encoding = 'gzip'
+            blob.upload_from_filename(compressed_file_path, content_type='text/plain')
+        finally:
+            os.remove(compressed_file_path)
+        if log_file_path != local_file_path:
+            os.remove(log_file_path)
+
+def compile_visualization(base_path, events_path, final_visualization_path):
+    # Plotting libraries are only needed here, keep them off the worker's startup path.
+    from log_visualization.vizCreator import createVisualizations
+    createVisualizations(events_path, final_visualization_path)
 
 def setup_dirs(output_path):
     phases = [
@@ -197,23 +447,32 @@ def cleanup_dirs(temp_dir):
     if os.path.exists(temp_dir):
         shutil.rmtree(temp_dir)
 
-def subscriber(process_idx, gcp_prompt_path):
-    from auditpulse_flow.main import kickoff
-    import agentops
-    def generate_audit_report(envelope, bucket, mysql_cursor, mysql_conn):
+def subscriber(process_idx, gcp_prompt_path, runs_per_worker=1, max_inflight_llm_calls=8, idle_timeout=float('inf'), max_lease_duration=2*60*60, max_run_attempts=3):
+    subscriber_start_time = time.perf_counter()
+    from auditpulse_flow.backpressure import llm_call_tracker
+    def generate_audit_report(envelope, bucket):
+        # crewai, the crews and agentops load on the first run, not before the first pull.
+        from auditpulse_flow.main import kickoff
+        import agentops
+        claimed_key = None
+        attempt = None
+        logs_handed_off = False
         try:
             start_time = time.time()
             run_id, company_name, central_index_key, company_ticker, year = get_input_data(envelope)
             timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
             run_log_file = f"logs/run_{run_id}_{timestamp}.txt"
             debug_log_file =f"logs/debug_{run_id}_{timestamp}.log"
+            events_file = f"logs/events_{run_id}_{timestamp}.jsonl"
 
             setup_logging(run_log_file, debug_log_file)
+            start_event_log(events_file, run_id)
             logging.info("Report generation called"+"-"*75)
 
             gcp_audit_report_path = f'generated_reports/audit_report/audit_report_{run_id}_{timestamp}.md'
             gcp_visualization_path = f'generated_reports/visualization_report/visualization_{run_id}_{timestamp}.html'
             gcp_logs_path = f'generated_reports/logs/log_{run_id}_{timestamp}'
+            gcp_partial_report_path = f'generated_reports/partial_report/audit_report_{run_id}.md'
 
             visualization_file = f'output/visualization/visualization_{run_id}_{timestamp}.html'
             audit_report_file = f'output/final_report/audit_report_{run_id}_{timestamp}.md'
@@ -224,42 +483,115 @@ def subscriber(process_idx, gcp_prompt_path):
             if status:
                 validated_inputs = data_validator.auditpulse_validated_inputs
                 company_name = validated_inputs.company_name
-                central_index_key = validated_inputs.company_name
+                central_index_key = validated_inputs.central_index_key
                 company_ticker = validated_inputs.company_ticker
                 year = validated_inputs.year
+                result_store = get_result_store(bucket)
+                result_key = make_result_key(central_index_key, year, gcp_prompt_path,
+                                             os.getenv('AUDITPULSE_POLICY_VERSION', 'local'), LLM_MODEL)
+                cached_result = None if get_force_refresh(envelope) else result_store.get(result_key)
+                if cached_result:
+                    logging.info(f"Serving the report of run {cached_result['run_id']}.")
+                    if cached_result.get('visualization_pending'):
+                        # The visualization is still being built, the upload pool of the run shares it with this run.
+                        cached_result = result_store.wait_for_visualization(result_key, run_id) or cached_result
+                    flush_logging()
+                    upload_log_to_gcp(bucket,gcp_logs_path, debug_log_file)
+                    query = get_query("run_update")
+                    values = (
+                            "completed",
+                            cached_result['audit_report_path'],
+                            cached_result['visualization_path'],
+                            gcp_logs_path,
+                            gcp_prompt_path,
+                            f"Report reused from run {cached_result['run_id']}.",
+                            run_id
+                            )
+                    update_status(query, values)
+                    publish_run_update(values)
+                    if not cached_result['visualization_path'] and not cached_result.get('visualization_pending'):
+                        publish_status(run_id, 'visualization_failed')
+                    return 'completed'
+                # A request for a report that another run is already generating attaches to that
+                # run and frees its slot, the leader updates its row when it finishes.
+                try:
+                    leader_run_id = inflight_runs.claim(result_key, run_id)
+                except Exception as e:
+                    logging.error(f"Claiming the report failed, generating it without coalescing: {e}")
+                    leader_run_id = None
+                if leader_run_id:
+                    logging.info(f"Attached to run {leader_run_id}, which is generating the same report.")
+                    update_status(get_query("status_update"), ("running", run_id))
+                    publish_status(run_id, 'running', message=f"Waiting for run {leader_run_id}, which is generating the same report.")
+                    return 'attached'
+                claimed_key = result_key
+                # Failures from here on are retried, the checkpoint lets the retry resume at the first missing task.
+                attempt = RunCheckpoint(run_id, base_output_path).count_attempt()
                 query = get_query("status_update")
                 values = (
                         "running",
                         run_id
                         )
-                update_status(mysql_cursor, mysql_conn, query, values)
+                update_status(query, values)
+                publish_status(run_id, 'running')
                 setup_dirs(base_output_path)
+
+                def publish_progress(phase, report_text):
+                    # The report is assembled while the tasks run, each finished phase is published for the frontend.
+                    try:
+                        message = f"Completed the {phase.replace('_', ' ')} phase."
+                        bucket.blob(gcp_partial_report_path).upload_from_string(report_text, content_type='text/markdown')
+                        update_status(get_query("message_update"), (message, run_id))
+                        publish_status(run_id, 'phase_completed', phase=phase, message=message, partial_report_path=gcp_partial_report_path)
+                    except Exception as e:
+                        logging.error(f"Publishing the progress of run {run_id} failed: {e}")
+
+                total_tasks = sum(len(task_files) for task_files in REPORT_SECTIONS.values())
+                completed_tasks = []
+
+                def publish_task_progress(phase, task_name):
+                    completed_tasks.append(task_name)
+                    publish_status(run_id, 'task_completed', phase=phase, task=task_name,
+                                   completed_tasks=len(completed_tasks), total_tasks=total_tasks)
+
                 session = agentops.init()
                 kickoff(run_id,
                         company_name,
                         central_index_key,
                         company_ticker,
-                        year)
+                        year,
+                        report_path=audit_report_file,
+                        on_phase_complete=publish_progress,
+                        on_task_complete=publish_task_progress)
                 session.end_session()
                 end_time = time.time()
                 duration = round(end_time - start_time, 2)
-                compile_report(base_output_path, audit_report_file)
-                compile_visualization(base_output_path, run_log_file, visualization_file)
-                logging.info(f"Report generation completed successfully in {duration} seconds.")
+                # The run completes as soon as the audit report is in GCS. The visualization
+                # and the logs follow from the upload pool, which frees this slot sooner.
                 upload_to_gcp(bucket,gcp_audit_report_path, audit_report_file)
-                upload_to_gcp(bucket,gcp_visualization_path, visualization_file)
-                upload_to_gcp(bucket,gcp_logs_path, debug_log_file)
+                # Recorded before the claim is released, so a duplicate request arriving in between
+                # reuses the report. The visualization path is added once it is uploaded.
+                result_store.put(result_key, run_id, gcp_audit_report_path)
+                logging.info(f"Report generation completed successfully in {duration} seconds.")
                 query = get_query("run_update")
                 values = (
                         "completed",
                         gcp_audit_report_path,
-                        gcp_visualization_path,
+                        '',
                         gcp_logs_path,
                         gcp_prompt_path,
                         f"Report generation completed successfully in {duration} seconds.",
                         run_id
                         )
-                update_status(mysql_cursor, mysql_conn, query, values)
+                update_status(query, values)
+                publish_run_update(values)
+                follower_run_ids = share_run_outcome(inflight_runs, claimed_key, run_id, values)
+                logs_handed_off = True
+                upload_executor.submit(contextvars.copy_context().run, publish_artifacts,
+                                       [run_id] + follower_run_ids, result_key,
+                                       base_output_path, events_file, visualization_file, gcp_visualization_path,
+                                       debug_log_file, gcp_logs_path)
+                return 'completed'
             else:
                 raise ValueError(f"Inputs not valid.\nDetails: {message}")
         except Exception as e:
@@ -269,7 +601,18 @@ def subscriber(process_idx, gcp_prompt_path):
             logging.error(f"Report generation failed after {duration} seconds.")
             logging.error(f"Error: {str(e)}")
             logging.error(f"Stack Trace:\n{stack_trace}")
-            upload_to_gcp(bucket,gcp_logs_path, debug_log_file)
+            flush_logging()
+            upload_log_to_gcp(bucket,gcp_logs_path, debug_log_file)
+            if attempt is not None and attempt < max_run_attempts:
+                # The row stays running and the claim held, the redelivered message resumes the run.
+                retry_message = f"Attempt {attempt} of {max_run_attempts} failed, retrying."
+                update_status(get_query("message_update"), (retry_message, run_id))
+                publish_status(run_id, 'running', message=retry_message)
+                raise RunRetry(str(e), attempt) from e
+            if attempt is not None:
+                # Abandoned for good, nothing resumes from the checkpoint anymore.
+                RunCheckpoint(run_id, base_output_path).delete()
+                cleanup_dirs(base_output_path)
             query = get_query("run_update")
             fail_message = str(e)[:50]
             values = (
@@ -281,59 +624,169 @@ def subscriber(process_idx, gcp_prompt_path):
                     fail_message,
                     run_id
                     )
-            update_status(mysql_cursor, mysql_conn, query, values)
+            update_status(query, values)
+            publish_run_update(values)
+            if claimed_key:
+                share_run_outcome(inflight_runs, claimed_key, run_id, values)
+            return 'failed'
+        finally:
+            # The upload pool closes the logs of a completed run once they are uploaded.
+            if not logs_handed_off:
+                teardown_logging()
+
+    def publish_artifacts(run_ids, result_key, base_output_path, events_file,
+                          visualization_file, gcp_visualization_path, debug_log_file, gcp_logs_path):
+        # Runs on the upload pool after the audit report of a run is durable and its row completed.
+        leader_run_id = run_ids[0]
+        flush_logging()
+        visualization_path = ''
+        try:
+            compile_visualization(base_output_path, events_file, visualization_file)
+            upload_to_gcp(bucket,gcp_visualization_path, visualization_file)
+            visualization_path = gcp_visualization_path
+        except Exception as e:
+            logging.error(f"Building the visualization of run {leader_run_id} failed: {e}")
+        # Runs that reused the report while the visualization was built share it as well.
+        run_ids = run_ids + get_result_store(bucket).set_visualization(result_key, visualization_path)
+        try:
+            if visualization_path:
+                execute_batch([(get_query("visualization_update"), [(visualization_path, run_id) for run_id in run_ids])])
+                for run_id in run_ids:
+                    publish_status(run_id, 'visualization_ready', explainability_report_path=visualization_path)
+            else:
+                # The frontend stops waiting for the explainability report instead of timing out.
+                for run_id in run_ids:
+                    publish_status(run_id, 'visualization_failed')
+        except Exception as e:
+            logging.error(f"Publishing the visualization of run {leader_run_id} failed: {e}")
+        try:
+            RunCheckpoint(leader_run_id, base_output_path).delete()
+            flush_logging()
+            upload_log_to_gcp(bucket,gcp_logs_path, debug_log_file)
+        except Exception as e:
+            logging.error(f"Uploading the logs of run {leader_run_id} failed: {e}")
+        finally:
+            teardown_logging()
 
     subscriber_path = 'projects/auditpulse/subscriptions/deployment-request-queue-sub'
     storage_client = storage.Client(project='auditpulse')
     bucket = storage_client.bucket('auditpulse-data')
-    mysql_conn = mysql.connector.connect(
-        host='34.46.191.121',
-        port=3306,
-        user='root',
-        database='auditpulse',
-        password=os.getenv('MYSQL_GCP_PASS')
-    )
-    mysql_cursor = mysql_conn.cursor()
-    subscriber = pubsub_v1.SubscriberClient()
-    timeout = float('inf')
-    start_time = 0
-    while True:
+    inflight_runs = InflightRuns(bucket, max_lease_duration)
+    # Pub/Sub rejects ack deadlines above 600 seconds.
+    attached_recheck_delay = 600
+    upload_executor = ThreadPoolExecutor(max_workers=max(2, runs_per_worker))
+    stop_event = threading.Event()
+    activity_lock = threading.Lock()
+    activity = {'active_runs': 0, 'last_activity': time.perf_counter()}
+    # Crashes per message, Pub/Sub only reports delivery attempts with a dead-letter policy.
+    crash_attempts = {}
+
+    def drain(signum, frame):
+        print(f"Process {process_idx+1} received signal {signum}. Draining in-flight runs.")
+        stop_event.set()
+
+    signal.signal(signal.SIGTERM, drain)
+    signal.signal(signal.SIGINT, drain)
+
+    def callback(message):
+        # Hold the message (and with it the flow control slot) until the LLM calls
+        # already in flight leave room for another run. The client library keeps
+        # extending the ack deadline of every message it holds, up to max_lease_duration.
+        if not llm_call_tracker.wait_for_capacity(max_inflight_llm_calls, stop_event):
+            message.nack()
+            return
+        with activity_lock:
+            activity['active_runs'] += 1
+        print(f"Process {process_idx+1} picked up a task.")
         try:
-            response = subscriber.pull(
-                            request={
-                                "subscription": subscriber_path,
-                                "max_messages": 1,
-                                "return_immediately": True,
-                            },
-                        )
-            subscriber.acknowledge({"subscription": subscriber_path, "ack_ids": [response.received_messages[0].ack_id]})
-            start_time = 0
-            print(f"Process {process_idx+1} picked up a task.")
-            generate_audit_report(response.received_messages[0].message, bucket, mysql_cursor, mysql_conn)
-            print(f"Process {process_idx+1} completed the task.")
-        except:
-            if start_time==0:
-                start_time = time.perf_counter()
-            elif time.perf_counter() - start_time > timeout:
-                print(f"Timeout. Process {process_idx+1} exiting.")
-                break
+            run_id = get_input_data(message)[0]
+            status = get_run_status(run_id)
+            if status not in ('completed', 'failed'):
+                status = generate_audit_report(message, bucket)
             else:
-                pass
+                print(f"Process {process_idx+1} skipped run {run_id}, already {status}.")
+            # Only a terminal runs row releases the message, anything else is redelivered.
+            if status == 'attached':
+                # The leader writes the outcome of an attached run. Until then its message comes back
+                # every few minutes, and takes over the claim once the leader was lost for max_age.
+                print(f"Process {process_idx+1} attached run {run_id}, rechecking in {attached_recheck_delay} seconds.")
+                message.modify_ack_deadline(attached_recheck_delay)
+                message.drop()
+            else:
+                message.ack()
+                with activity_lock:
+                    crash_attempts.pop(message.message_id, None)
+                print(f"Process {process_idx+1} completed the task.")
+        except RunRetry as e:
+            backoff = get_retry_backoff(e.attempt)
+            print(f"Process {process_idx+1} failed attempt {e.attempt} of the run, redelivering in {backoff} seconds: {e}")
+            message.modify_ack_deadline(backoff)
+            message.drop()
+        except Exception as e:
+            with activity_lock:
+                crash_attempts[message.message_id] = crash_attempts.get(message.message_id, 0) + 1
+                attempt = message.delivery_attempt or crash_attempts[message.message_id]
+            backoff = get_retry_backoff(attempt)
+            print(f"Process {process_idx+1} crashed on the task, redelivering in {backoff} seconds: {e}")
+            message.modify_ack_deadline(backoff)
+            message.drop()
+        finally:
+            with activity_lock:
+                activity['active_runs'] -= 1
+                activity['last_activity'] = time.perf_counter()
+
+    subscriber = pubsub_v1.SubscriberClient()
+    flow_control = pubsub_v1.types.FlowControl(max_messages=runs_per_worker, max_lease_duration=max_lease_duration)
+    scheduler = ThreadScheduler(executor=ThreadPoolExecutor(max_workers=runs_per_worker))
+    streaming_pull_future = subscriber.subscribe(
+                                subscriber_path,
+                                callback=callback,
+                                flow_control=flow_control,
+                                scheduler=scheduler,
+                                await_callbacks_on_shutdown=True,
+                            )
+    time_to_first_pull = round(time.perf_counter() - subscriber_start_time, 2)
+    print(f"Process {process_idx+1} listening with {runs_per_worker} concurrent runs. Time to first pull: {time_to_first_pull} seconds.")
+    with subscriber:
+        # The streaming pull blocks server side, so the worker only wakes up to check for idleness.
+        while not stop_event.wait(timeout=min(idle_timeout, 60)):
+            if streaming_pull_future.done():
+                break
+            with activity_lock:
+                idle_for = time.perf_counter() - activity['last_activity']
+                if activity['active_runs']==0 and idle_for > idle_timeout:
+                    print(f"Timeout. Process {process_idx+1} exiting.")
+                    break
+        streaming_pull_future.cancel()
+        try:
+            streaming_pull_future.result()
+        except Exception as e:
+            print(f"Process {process_idx+1} stopped pulling: {e}")
+    # Let the artifacts of completed runs finish uploading before the process exits.
+    upload_executor.shutdown(wait=True)
+    print(f"Process {process_idx+1} drained.")
 
-def start_worker(num_workers, gcp_prompt_path):
+def start_worker(num_workers, gcp_prompt_path, runs_per_worker=1, max_inflight_llm_calls=8, idle_timeout=float('inf'), max_lease_duration=2*60*60, max_run_attempts=3):
     workers = []
     for i in range(num_workers):
         print(f'Process {i+1} started.')
-        p = Process(target=subscriber, args=(i, gcp_prompt_path))
+        p = Process(target=subscriber, args=(i, gcp_prompt_path, runs_per_worker, max_inflight_llm_calls, idle_timeout, max_lease_duration, max_run_attempts))
         p.start()
         workers.append(p)
+
+    def forward_signal(signum, frame):
+        for p in workers:
+            if p.is_alive():
+                p.terminate()
+
+    signal.signal(signal.SIGTERM, forward_signal)
     for i, p in enumerate(workers):
         p.join()
         print(f'Process {i+1} completed.')
 
 
 def main():
-    num_workers = 2
+    worker_config = get_worker_config()
     log_dir = 'logs'
     local_policy_path = 'auditpulse_flow/data/compliance.json'
     gcp_policy_path = 'configs/policy'
@@ -352,16 +805,10 @@ def main():
         db_client = firestore.Client(project='auditpulse')
         storage_client = storage.Client(project='auditpulse')
         bucket = storage_client.bucket(bucket_name)
-        mysql_conn = mysql.connector.connect(
-            host='34.46.191.121',
-            port=3306,
-            user='root',
-            database='auditpulse',
-            password=os.getenv('MYSQL_GCP_PASS')
-        )
-        mysql_cursor = mysql_conn.cursor()
         deployment_config = get_document(db_client, collection_name, document_name)
         gcp_policy_path = deployment_config.get('active_policy_path')
+        # Versions the shared RAG index over the policy, inherited by the worker processes.
+        os.environ['AUDITPULSE_POLICY_VERSION'] = get_policy_version(deployment_config)
         gcp_prompt_path = deployment_config.get('active_prompts_path')
         phase_prompt_paths = [gcp_prompt_path+'/'+phase_name+'/'+yml_name for phase_name in phase_names for yml_name in ['agents.yaml','tasks.yaml']]
         
@@ -375,7 +822,13 @@ def main():
             except Exception as e:
                 print(f"Error at {local_phase_prompt_path}")
                 print(str(e))
-        start_worker(num_workers, gcp_prompt_path)
+        start_worker(worker_config['num_workers'],
+                     gcp_prompt_path,
+                     worker_config['runs_per_worker'],
+                     worker_config['max_inflight_llm_calls'],
+                     worker_config['idle_timeout'],
+                     worker_config['max_lease_duration'],
+                     worker_config['max_run_attempts'])
         cleanup_dirs('output')
         cleanup_dirs('logs')
     except Exception as e:
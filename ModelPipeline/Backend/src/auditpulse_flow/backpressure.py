@@ -0,0 +1,39 @@
+import threading
+
+
+class LLMCallTracker:
+    """Counts the LLM calls in flight across all runs of this process."""
+    def __init__(self):
+        self.in_flight = 0
+        self._condition = threading.Condition()
+
+    def started(self):
+        with self._condition:
+            self.in_flight += 1
+
+    def finished(self):
+        with self._condition:
+            self.in_flight = max(0, self.in_flight - 1)
+            self._condition.notify_all()
+
+    def wait_for_capacity(self, max_in_flight, stop_event=None, poll_interval=5):
+        """
+        Blocks until fewer than `max_in_flight` LLM calls are running.
+
+        Args:
+            max_in_flight (int): Number of concurrent LLM calls allowed before new runs are held back.
+            stop_event (threading.Event): Optional event that aborts the wait when set.
+            poll_interval (float): Seconds between checks of the stop event.
+
+        Returns:
+            bool: True if there is capacity, False if the wait was aborted.
+        """
+        with self._condition:
+            while self.in_flight >= max_in_flight:
+                if stop_event is not None and stop_event.is_set():
+                    return False
+                self._condition.wait(timeout=poll_interval)
+        return True
+
+
+llm_call_tracker = LLMCallTracker()
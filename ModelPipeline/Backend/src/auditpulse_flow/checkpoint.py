@@ -0,0 +1,118 @@
+import os
+import json
+import threading
+
+
+class RunCheckpoint:
+    """
+    Persists the flow state and task output files of a run so a retry can resume it.
+
+    The checkpoint lives next to the task outputs in output/{run_id} and is mirrored
+    to GCS under checkpoints/{run_id}, so it survives the loss of the worker. GCS
+    errors are logged and never fail the run.
+
+    Attributes:
+        run_id (str): Identifier of the run.
+        local_dir (str): Directory holding the task outputs of the run.
+        gcp_prefix (str): GCS prefix the checkpoint is mirrored to.
+    """
+
+    state_file = 'state.json'
+    attempts_file = 'attempts'
+
+    def __init__(self, run_id, local_dir, bucket_name='auditpulse-data'):
+        self.run_id = run_id
+        self.local_dir = local_dir
+        self.gcp_prefix = f'checkpoints/{run_id}'
+        self.bucket_name = bucket_name
+        self._bucket = None
+        self._synced_mtimes = {}
+        self._lock = threading.Lock()
+
+    @property
+    def bucket(self):
+        if self._bucket is None:
+            from google.cloud import storage
+            self._bucket = storage.Client(project='auditpulse').bucket(self.bucket_name)
+        return self._bucket
+
+    def save(self, state):
+        """
+        Writes the state and uploads it with every task output file changed since the last save.
+
+        Args:
+            state (dict): Serializable flow state.
+
+        Returns:
+            None
+        """
+        with self._lock:
+            os.makedirs(self.local_dir, exist_ok=True)
+            state_path = os.path.join(self.local_dir, self.state_file)
+            temp_path = state_path + '.tmp'
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump(state, f)
+            os.replace(temp_path, state_path)
+            try:
+                for root, _, files in os.walk(self.local_dir):
+                    for file_name in files:
+                        local_path = os.path.join(root, file_name)
+                        mtime = os.path.getmtime(local_path)
+                        if file_name.endswith('.tmp') or self._synced_mtimes.get(local_path) == mtime:
+                            continue
+                        relative_path = os.path.relpath(local_path, self.local_dir).replace(os.sep, '/')
+                        self.bucket.blob(f'{self.gcp_prefix}/{relative_path}').upload_from_filename(local_path)
+                        self._synced_mtimes[local_path] = mtime
+            except Exception as e:
+                print(f"Checkpoint sync to GCS failed for run {self.run_id}: {e}")
+
+    def load(self):
+        """
+        Restores the checkpoint of the run, downloading it from GCS when it is not on disk.
+
+        Returns:
+            dict or None: The saved state, or None if the run has no checkpoint.
+        """
+        state_path = os.path.join(self.local_dir, self.state_file)
+        if not os.path.exists(state_path):
+            try:
+                for blob in self.bucket.list_blobs(prefix=f'{self.gcp_prefix}/'):
+                    if blob.name == f'{self.gcp_prefix}/{self.attempts_file}':
+                        continue
+                    local_path = os.path.join(self.local_dir, *blob.name[len(self.gcp_prefix)+1:].split('/'))
+                    os.makedirs(os.path.dirname(local_path), exist_ok=True)
+                    blob.download_to_filename(local_path)
+                    self._synced_mtimes[local_path] = os.path.getmtime(local_path)
+            except Exception as e:
+                print(f"Checkpoint restore from GCS failed for run {self.run_id}: {e}")
+        if not os.path.exists(state_path):
+            return None
+        with open(state_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def count_attempt(self):
+        """
+        Counts an attempt of the run, kept in GCS next to the checkpoint.
+
+        Pub/Sub only reports delivery attempts on subscriptions with a dead-letter policy,
+        this count bounds the retries of a failing run without one.
+
+        Returns:
+            int: Attempts so far including this one, 1 if GCS can't be reached.
+        """
+        try:
+            blob = self.bucket.blob(f'{self.gcp_prefix}/{self.attempts_file}')
+            attempts = int(blob.download_as_text()) + 1 if blob.exists() else 1
+            blob.upload_from_string(str(attempts))
+            return attempts
+        except Exception as e:
+            print(f"Counting the attempt of run {self.run_id} failed: {e}")
+            return 1
+
+    def delete(self):
+        """Removes the GCS copy of the checkpoint and the attempt count once the run no longer needs to resume."""
+        try:
+            for blob in self.bucket.list_blobs(prefix=f'{self.gcp_prefix}/'):
+                blob.delete()
+        except Exception as e:
+            print(f"Checkpoint cleanup failed for run {self.run_id}: {e}")
@@ -2,10 +2,10 @@ import os
 
 from crewai import Agent, Crew, Process, Task
 from crewai.project import CrewBase, agent, crew, task
-from crewai_tools import SerperDevTool, ScrapeWebsiteTool, WebsiteSearchTool, JSONSearchTool, TXTSearchTool
 
-from crewai.llm import LLM
-from ...tools.custom_tool import WrappedScrapeWebsiteTool
+from ...tools.custom_tool import WrappedScrapeWebsiteTool, CachedSerperDevTool
+from ...llm_config import get_llm
+from ...tools.rag_tools import get_website_search_tool, get_pcaob_guidelines_tool, get_auditpulse_file_tool
 
 @CrewBase
 class AuditPlanningCrew():
@@ -13,87 +13,29 @@ class AuditPlanningCrew():
 
     agents_config = 'config/agents.yaml'
     tasks_config = 'config/tasks.yaml'
-    compliance_file_path = './auditpulse_flow/data/compliance.json'
-    auditpulse_file_path = './auditpulse_flow/data/AuditPulseInfo.md'
     output_dir = "./output/{run_id}/audit_planning"
+    run_id = None
     log_path = './logs/audit_planning.txt'
 
-    pcaob_guidlines_tool = JSONSearchTool(config={
-        "llm": {
-            "provider": "vertexai",
-            "config": {
-                "model": "gemini-2.0-flash-lite-001",
-            },
-        },
-        "embedder": {
-            "provider": "vertexai",
-            "config": {
-                "model": "text-embedding-004",
-            },
-        },
-    }, json_path=compliance_file_path)
-
-    website_search_tool = WebsiteSearchTool(config={
-        "llm": {
-            "provider": "vertexai",
-            "config": {
-                "model": "gemini-2.0-flash-lite-001",
-            },
-        },
-        "embedder": {
-            "provider": "vertexai",
-            "config": {
-                "model": "text-embedding-004",
-            },
-        },
-    })
-
-    auditpulse_file_tool = TXTSearchTool(config={
-        "llm": {
-            "provider": "vertexai",
-            "config": {
-                "model": "gemini-2.0-flash-lite-001",
-            },
-        },
-        "embedder": {
-            "provider": "vertexai",
-            "config": {
-                "model": "text-embedding-004",
-            },
-		}},
-        file_path=auditpulse_file_path)
-
-    llm = LLM(
-        model="vertex_ai/gemini-2.0-flash-lite-001",
-        max_tokens=3072,
-        context_window_size=1000000,
-    )
-    task_counter = 0
-
-    task_mapping = {
-        0: "preliminary_engagement_task",
-        1: "business_risk_task",
-        2: "internal_control_task",
-        3: "audit_strategy_task"
-    }
-
-    def task_limit_context(self, task_output):
-        context_len = 1_000_000
-        n_tasks = 2
-        max_chars = int((context_len*3.3)/n_tasks)
-        
-        os.makedirs(self.output_dir, exist_ok=True)
-        
-        full_output_path = os.path.join(self.output_dir, f"{self.task_mapping.get(self.task_counter,'Unknown')}.md")
-        with open(full_output_path, 'w', encoding='utf-8') as f:
-            f.write(task_output.raw)
-        
-        if len(task_output.raw) > max_chars:
-            beginning = task_output.raw[:int(max_chars/2)]
-            ending = task_output.raw[-int(max_chars/2):]
-            task_output.raw = beginning + "\n\n...Truncated...\n\n" + ending
-        self.task_counter+=1
-        return True, task_output
+    def task_limit_context(self, task_name):
+        """Builds a guardrail that saves the full output of `task_name` and truncates what is passed on."""
+        def guardrail(task_output):
+            context_len = 1_000_000
+            n_tasks = 2
+            max_chars = int((context_len*3.3)/n_tasks)
+            
+            os.makedirs(self.output_dir, exist_ok=True)
+            
+            full_output_path = os.path.join(self.output_dir, f"{task_name}.md")
+            with open(full_output_path, 'w', encoding='utf-8') as f:
+                f.write(task_output.raw)
+            
+            if len(task_output.raw) > max_chars:
+                beginning = task_output.raw[:int(max_chars/2)]
+                ending = task_output.raw[-int(max_chars/2):]
+                task_output.raw = beginning + "\n\n...Truncated...\n\n" + ending
+            return True, task_output
+        return guardrail
 
     @agent
     def audit_planning_agent(self) -> Agent:
@@ -101,15 +43,14 @@ class AuditPlanningCrew():
             config=self.agents_config['audit_planning_agent'],
             verbose=True,
             tools=[
-                SerperDevTool(n_results=5),
+                CachedSerperDevTool(n_results=5),
                 WrappedScrapeWebsiteTool(),
-                self.website_search_tool,
-                self.pcaob_guidlines_tool,
-                self.auditpulse_file_tool
+                get_website_search_tool(self.run_id),
+                get_pcaob_guidelines_tool(),
+                get_auditpulse_file_tool()
             ],
-            llm=self.llm,
+            llm=get_llm(),
             respect_context_window=True,
-            max_rpm=45,
             cache=True,
 			max_iter=5,
             max_retry_limit=20
@@ -122,7 +63,7 @@ class AuditPlanningCrew():
             config=self.tasks_config['preliminary_engagement_review'],
             async_execution=False,
             agent=self.audit_planning_agent(),
-            guardrail=self.task_limit_context,
+            guardrail=self.task_limit_context('preliminary_engagement_task'),
             # output_file=os.path.join(self.output_dir, 'preliminary_engagement_task.md'),
         )
 
@@ -133,7 +74,7 @@ class AuditPlanningCrew():
             config=self.tasks_config['business_risk_and_fraud_assessment'],
             async_execution=False,
             agent=self.audit_planning_agent(),
-            guardrail=self.task_limit_context,
+            guardrail=self.task_limit_context('business_risk_task'),
             # output_file=os.path.join(self.output_dir, 'business_risk_task.md'),
         )
 
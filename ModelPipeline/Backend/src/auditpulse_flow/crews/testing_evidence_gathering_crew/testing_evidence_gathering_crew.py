@@ -2,10 +2,10 @@ import os
 
 from crewai import Agent, Crew, Process, Task
 from crewai.project import CrewBase, agent, crew, task
-from crewai_tools import SerperDevTool, ScrapeWebsiteTool, WebsiteSearchTool, JSONSearchTool, TXTSearchTool
 
-from crewai.llm import LLM
-from ...tools.custom_tool import WrappedScrapeWebsiteTool
+from ...tools.custom_tool import WrappedScrapeWebsiteTool, CachedSerperDevTool
+from ...llm_config import get_llm
+from ...tools.rag_tools import get_website_search_tool, get_pcaob_guidelines_tool, get_auditpulse_file_tool
 
 @CrewBase
 class TestingEvidenceGatheringCrew():
@@ -13,76 +13,24 @@ class TestingEvidenceGatheringCrew():
 
     agents_config = 'config/agents.yaml'
     tasks_config = 'config/tasks.yaml'
-    compliance_file_path = './auditpulse_flow/data/compliance.json'
-    auditpulse_file_path = './auditpulse_flow/data/AuditPulseInfo.md'
     output_dir = "./output/{run_id}/testing_evidence"
+    run_id = None
     log_path = "./logs/testing_evidence.txt"
 
-    pcaob_guidlines_tool = JSONSearchTool(config={
-        "llm": {
-            "provider": "vertexai",
-            "config": {
-                "model": "gemini-2.0-flash-lite-001",
-            },
-        },
-        "embedder": {
-            "provider": "vertexai",
-            "config": {
-                "model": "text-embedding-004",
-            },
-        },
-    },json_path=compliance_file_path)
-
-    website_search_tool = WebsiteSearchTool(config={
-            "llm": {
-                "provider": "vertexai",
-                "config": {
-                    "model": "gemini-2.0-flash-lite-001",
-                },
-            },
-            "embedder": {
-                "provider": "vertexai",
-                "config": {
-                    "model": "text-embedding-004",
-                },
-            },
-        })
-    auditpulse_file_tool = TXTSearchTool(config={
-            "llm": {
-                "provider": "vertexai",
-                "config": {
-                    "model": "gemini-2.0-flash-lite-001",
-                },
-            },
-            "embedder": {
-                "provider": "vertexai",
-                "config": {
-                    "model": "text-embedding-004",
-                },
-            },
-        },
-        file_path=auditpulse_file_path)
-
-    llm = LLM(
-            model="vertex_ai/gemini-2.0-flash-lite-001",
-            max_tokens=3072,
-            context_window_size=1000000,
-        )
     @agent
     def testing_and_evidence_agent(self) -> Agent:
         return Agent(
             config=self.agents_config['testing_and_evidence_agent'],
             verbose=True,
             tools=[
-                SerperDevTool(n_results=5),
+                CachedSerperDevTool(n_results=5),
                 WrappedScrapeWebsiteTool(),
-                self.website_search_tool,
-                self.pcaob_guidlines_tool,
-                self.auditpulse_file_tool
+                get_website_search_tool(self.run_id),
+                get_pcaob_guidelines_tool(),
+                get_auditpulse_file_tool()
             ],
-            llm=self.llm,
+            llm=get_llm(),
             respect_context_window=True,
-            max_rpm=45,
             cache=True,
             max_iter=5,
             max_retry_limit=20
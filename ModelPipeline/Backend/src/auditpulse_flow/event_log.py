@@ -0,0 +1,117 @@
+import os
+import json
+import uuid
+import threading
+import contextvars
+from datetime import datetime
+
+_event_log = contextvars.ContextVar('event_log', default=None)
+_task_context = contextvars.ContextVar('task_context', default=None)
+# LLM and tool calls are synchronous, so the open calls of a thread form a stack.
+_open_calls = threading.local()
+
+
+class EventLog:
+    """
+    Typed events of a run written as JSON lines.
+
+    Every record holds the event type, an ISO timestamp, the run_id and the phase,
+    task and agent of the task that emitted it, plus the fields of the event.
+
+    Attributes:
+        path (str): Path of the JSONL file.
+        run_id (str): Run the events belong to.
+    """
+
+    def __init__(self, path, run_id):
+        self.path = path
+        self.run_id = run_id
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self._file = open(path, 'a', encoding='utf-8')
+
+    def write(self, event_type, **fields):
+        record = {'type': event_type, 'timestamp': datetime.now().isoformat(), 'run_id': self.run_id}
+        record.update(_task_context.get() or {})
+        record.update(fields)
+        line = json.dumps(record, default=str) + '\n'
+        with self._lock:
+            if self._file is not None:
+                self._file.write(line)
+
+    def flush(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.flush()
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+def start_event_log(path, run_id):
+    """Opens the event log of a run and makes it the log of the current context."""
+    event_log = EventLog(path, run_id)
+    _event_log.set(event_log)
+    return event_log
+
+def get_event_log():
+    """Returns the event log of the run active in the current context, if any."""
+    return _event_log.get()
+
+def close_event_log():
+    """Closes the event log of the current context."""
+    event_log = _event_log.get()
+    if event_log:
+        event_log.close()
+        _event_log.set(None)
+
+def set_task_context(**fields):
+    """Tags the events emitted from the current context, e.g. with the phase, task and agent."""
+    _task_context.set(fields)
+
+def get_task_context():
+    """Returns the fields set by `set_task_context` for the current context."""
+    return _task_context.get() or {}
+
+def log_event(event_type, **fields):
+    """Writes an event to the log of the current run, it is a no-op outside of a run."""
+    event_log = _event_log.get()
+    if event_log:
+        event_log.write(event_type, **fields)
+
+def start_call(kind):
+    """Opens an LLM or tool call on the current thread and returns its call_id."""
+    stack = getattr(_open_calls, kind, None)
+    if stack is None:
+        stack = []
+        setattr(_open_calls, kind, stack)
+    call_id = uuid.uuid4().hex
+    stack.append(call_id)
+    return call_id
+
+def end_call(kind):
+    """Closes the latest open LLM or tool call of the current thread and returns its call_id."""
+    stack = getattr(_open_calls, kind, None)
+    return stack.pop() if stack else None
+
+def read_events(path):
+    """
+    Reads an event log.
+
+    Args:
+        path (str): Path of the JSONL file.
+
+    Returns:
+        list[dict]: The events in the order they were written, malformed lines are skipped.
+    """
+    events = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                events.append(json.loads(line))
+            except json.JSONDecodeError:
+                continue
+    return events
@@ -0,0 +1,20 @@
+import threading
+
+LLM_MODEL = "vertex_ai/gemini-2.0-flash-lite-001"
+
+_llm = None
+_llm_lock = threading.Lock()
+
+
+def get_llm():
+    """Returns the LLM shared by every crew, created on first use instead of at import time."""
+    global _llm
+    with _llm_lock:
+        if _llm is None:
+            from crewai.llm import LLM
+            _llm = LLM(
+                model=LLM_MODEL,
+                max_tokens=3072,
+                context_window_size=1000000,
+            )
+        return _llm
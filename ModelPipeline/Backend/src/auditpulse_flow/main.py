@@ -1,22 +1,105 @@
+import os
+import re
 import time
+import importlib
 from datetime import datetime
 from typing import Any
 
 from pydantic import BaseModel, Field
 
-from crewai.flow import Flow, listen, start
-from crewai.utilities.events import crewai_event_bus, LLMCallCompletedEvent
+from crewai.flow import Flow, start
+from crewai.utilities.events import (
+    crewai_event_bus,
+    LLMCallStartedEvent, LLMCallCompletedEvent, LLMCallFailedEvent,
+    ToolUsageStartedEvent, ToolUsageFinishedEvent, ToolUsageErrorEvent,
+    TaskStartedEvent, TaskCompletedEvent, TaskFailedEvent,
+    AgentExecutionStartedEvent, AgentExecutionCompletedEvent,
+)
 
-from auditpulse_flow.crews.client_acceptance_crew.client_acceptance_crew import ClientAcceptanceCrew
-from auditpulse_flow.crews.audit_planning_crew.audit_planning_crew import AuditPlanningCrew
-from auditpulse_flow.crews.testing_evidence_gathering_crew.testing_evidence_gathering_crew import TestingEvidenceGatheringCrew
-from auditpulse_flow.crews.evaluation_reporting_crew.evaluation_reporting_crew import EvaluationReportingCrew
+from auditpulse_flow.task_graph import kickoff_pipeline
+from auditpulse_flow.backpressure import llm_call_tracker
+from auditpulse_flow.checkpoint import RunCheckpoint
+from auditpulse_flow.report_assembler import ReportAssembler
+from auditpulse_flow.rate_limiter import get_rate_limiter, estimate_tokens
+from auditpulse_flow.event_log import log_event, start_call, end_call
+from auditpulse_flow import telemetry
+from auditpulse_flow.tools.rag_tools import release_website_search_tool
+
+
+llm_rate_limiter = get_rate_limiter()
+THOUGHT_PATTERN = re.compile(r"Thought:\s*(.*?)(?:\n\s*(?:Action|Final Answer)|\Z)", re.DOTALL)
+
+@crewai_event_bus.on(LLMCallStartedEvent)
+def on_llm_call_start(source: Any, event):
+    llm_call_tracker.started()
+    # Handlers run synchronously before the request is sent, so waiting here throttles the call.
+    model = getattr(source, 'model', None)
+    prompt_tokens = estimate_tokens(event.messages)
+    waited = llm_rate_limiter.acquire(model, prompt_tokens)
+    if waited > 0:
+        print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}][🕒 LLM DELAY]: Waited {round(waited, 2)} seconds for {model} quota.")
+    call_id = start_call('llm')
+    telemetry.call_started(call_id, prompt_tokens, waited)
+    log_event('llm_call_started', call_id=call_id, model=model, prompt_tokens=prompt_tokens, rate_limit_wait=waited)
+
+@crewai_event_bus.on(LLMCallFailedEvent)
+def on_llm_call_failed(source: Any, event):
+    llm_call_tracker.finished()
+    call_id = end_call('llm')
+    telemetry.call_finished('llm', call_id, failed=True, model=getattr(source, 'model', None))
+    log_event('llm_call_failed', call_id=call_id, model=getattr(source, 'model', None), error=str(event.error))
 
 @crewai_event_bus.on(LLMCallCompletedEvent)
 def on_llm_call_complete(source: Any, event):
-    sleeptime = 3
-    print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}][🕒 LLM DELAY]: Sleeping for {sleeptime} seconds before next call...")
-    time.sleep(sleeptime)
+    llm_call_tracker.finished()
+    completion_tokens = estimate_tokens(event.response if isinstance(event.response, str) else str(event.response))
+    llm_rate_limiter.consume(getattr(source, 'model', None), completion_tokens)
+    thought = THOUGHT_PATTERN.search(event.response) if isinstance(event.response, str) else None
+    call_id = end_call('llm')
+    telemetry.call_finished('llm', call_id, model=getattr(source, 'model', None), completion_tokens=completion_tokens)
+    log_event('llm_call_completed', call_id=call_id, model=getattr(source, 'model', None),
+              completion_tokens=completion_tokens, thought=thought.group(1).strip() if thought else None)
+
+@crewai_event_bus.on(ToolUsageStartedEvent)
+def on_tool_usage_start(source: Any, event):
+    call_id = start_call('tool')
+    telemetry.call_started(call_id)
+    log_event('tool_usage_started', call_id=call_id, tool_name=event.tool_name)
+
+@crewai_event_bus.on(ToolUsageFinishedEvent)
+def on_tool_usage_finished(source: Any, event):
+    call_id = end_call('tool')
+    telemetry.call_finished('tool', call_id)
+    log_event('tool_usage_finished', call_id=call_id, tool_name=event.tool_name, from_cache=getattr(event, 'from_cache', None))
+
+@crewai_event_bus.on(ToolUsageErrorEvent)
+def on_tool_usage_error(source: Any, event):
+    call_id = end_call('tool')
+    telemetry.call_finished('tool', call_id, failed=True)
+    log_event('tool_usage_failed', call_id=call_id, tool_name=event.tool_name, error=str(event.error))
+
+@crewai_event_bus.on(TaskStartedEvent)
+def on_task_start(source: Any, event):
+    telemetry.task_started()
+    log_event('task_started')
+
+@crewai_event_bus.on(TaskCompletedEvent)
+def on_task_complete(source: Any, event):
+    telemetry.task_finished()
+    log_event('task_completed')
+
+@crewai_event_bus.on(TaskFailedEvent)
+def on_task_failed(source: Any, event):
+    telemetry.task_finished()
+    log_event('task_failed', error=str(event.error))
+
+@crewai_event_bus.on(AgentExecutionStartedEvent)
+def on_agent_execution_start(source: Any, event):
+    log_event('agent_started', agent_role=event.agent.role)
+
+@crewai_event_bus.on(AgentExecutionCompletedEvent)
+def on_agent_execution_complete(source: Any, event):
+    log_event('agent_completed', agent_role=event.agent.role)
 
 class AuditPulseState(BaseModel):
     """Validated and sanitized inputs."""
@@ -57,7 +140,7 @@ class AuditPulseState(BaseModel):
 
 
 class AuditPulseFlow(Flow[AuditPulseState]):
-    # Phase task mapping defines the order of tasks in each phase
+    # Phase task mapping defines the state field filled by each task of a phase, in declaration order
     phase_task_mapping = {
         'client_acceptance': [
             'client_background_and_integrity_assessment',
@@ -84,115 +167,83 @@ class AuditPulseFlow(Flow[AuditPulseState]):
         ]
     }
 
+    # Crew modules are imported when the pipeline starts, not when the flow module is imported
+    phase_crews = {
+        'client_acceptance': ('auditpulse_flow.crews.client_acceptance_crew.client_acceptance_crew', 'ClientAcceptanceCrew'),
+        'audit_planning': ('auditpulse_flow.crews.audit_planning_crew.audit_planning_crew', 'AuditPlanningCrew'),
+        'testing_evidence': ('auditpulse_flow.crews.testing_evidence_gathering_crew.testing_evidence_gathering_crew', 'TestingEvidenceGatheringCrew'),
+        'evaluation_reporting': ('auditpulse_flow.crews.evaluation_reporting_crew.evaluation_reporting_crew', 'EvaluationReportingCrew')
+    }
+
+    phase_result_mapping = {
+        'client_acceptance': 'client_acceptance_result',
+        'audit_planning': 'audit_planning_result',
+        'testing_evidence': 'testing_evidence_gathering_result',
+        'evaluation_reporting': 'evaluation_reporting_result'
+    }
+
+    # Tasks of a run executed at once, tune against AUDITPULSE_MAX_INFLIGHT_LLM_CALLS of the worker.
+    max_parallel_tasks = int(os.getenv('AUDITPULSE_MAX_PARALLEL_TASKS', 4))
+
+    # Set by the caller to assemble the report while the tasks run
+    report_path = None
+    on_phase_complete = None
+    on_task_complete = None
+
     @start()
-    def client_acceptance_crew(self):
-        client_acceptance = ClientAcceptanceCrew()
-        client_acceptance.output_dir = client_acceptance.output_dir.format(run_id=self.state.run_id)
-        crew_output = client_acceptance.crew().kickoff(
-            inputs={
-                'audit_firm': self.state.audit_firm,
-                'company_name': self.state.company_name,
-                'central_index_key': self.state.central_index_key,
-                'company_ticker': self.state.company_ticker,
-                'year': self.state.year,
-                'current_date': self.state.current_date
-            }
-        )
-        
-        # Store individual task outputs based on their order of execution
-        for i, task_name in enumerate(self.phase_task_mapping['client_acceptance']):
-            if i < len(crew_output.tasks_output):
-                setattr(self.state, task_name, crew_output.tasks_output[i].raw)
-        
-        # Store overall crew output
-        self.state.client_acceptance_result = crew_output.raw
-
-    @listen(client_acceptance_crew)
-    def audit_planning_crew(self):
-        audit_planning = AuditPlanningCrew()
-        audit_planning.output_dir = audit_planning.output_dir.format(run_id=self.state.run_id)
-        crew_output = audit_planning.crew().kickoff(
-            inputs={
-                'audit_firm': self.state.audit_firm,
-                'company_name': self.state.company_name,
-                'central_index_key': self.state.central_index_key,
-                'company_ticker': self.state.company_ticker,
-                'year': self.state.year,
-                'current_date': self.state.current_date,
-                # Pass relevant outputs from previous phase
-                'engagement_scope_and_strategy': self.state.engagement_scope_and_strategy,
-                'client_background_and_integrity_assessment': self.state.client_background_and_integrity_assessment,
-                'financial_risk_and_independence_assessment': self.state.financial_risk_and_independence_assessment
-            }
-        )
-        
-        # Store individual task outputs based on their order of execution
-        for i, task_name in enumerate(self.phase_task_mapping['audit_planning']):
-            if i < len(crew_output.tasks_output):
-                setattr(self.state, task_name, crew_output.tasks_output[i].raw)
-        
-        # Store overall crew output
-        self.state.audit_planning_result = crew_output.raw
-
-    @listen(audit_planning_crew)
-    def testing_evidence_gathering_crew(self):
-        test_crew = TestingEvidenceGatheringCrew()
-        test_crew.output_dir = test_crew.output_dir.format(run_id=self.state.run_id)
-        crew_output = test_crew.crew().kickoff(
-            inputs={
-                'audit_firm': self.state.audit_firm,
-                'company_name': self.state.company_name,
-                'central_index_key': self.state.central_index_key,
-                'company_ticker': self.state.company_ticker,
-                'year': self.state.year,
-                'current_date': self.state.current_date,
-                # Pass relevant outputs from previous phases
-                'internal_control_system_evaluation': self.state.internal_control_system_evaluation,
-                'audit_strategy_and_team_allocation': self.state.audit_strategy_and_team_allocation,
-                'business_risk_and_fraud_assessment': self.state.business_risk_and_fraud_assessment
-            }
-        )
-        
-        # Store individual task outputs based on their order of execution
-        for i, task_name in enumerate(self.phase_task_mapping['testing_evidence']):
-            if i < len(crew_output.tasks_output):
-                setattr(self.state, task_name, crew_output.tasks_output[i].raw)
-        
-        # Store overall crew output
-        self.state.testing_evidence_gathering_result = crew_output.raw
-
-    @listen(testing_evidence_gathering_crew)
-    def evaluation_reporting_crew(self):
-        eval_crew = EvaluationReportingCrew()
-        eval_crew.output_dir = eval_crew.output_dir.format(run_id=self.state.run_id)
-        crew_output = eval_crew.crew().kickoff(
-            inputs={
-                'audit_firm': self.state.audit_firm,
-                'company_name': self.state.company_name,
-                'central_index_key': self.state.central_index_key,
-                'company_ticker': self.state.company_ticker,
-                'year': self.state.year,
-                'current_date': self.state.current_date,
-                # Pass relevant outputs from previous phases
-                'control_testing_assessment': self.state.control_testing_assessment,
-                'financial_statement_analysis': self.state.financial_statement_analysis,
-                'significant_transaction_testing': self.state.significant_transaction_testing,
-                'fraud_risk_assessment': self.state.fraud_risk_assessment,
-                'financial_risk_and_independence_assessment': self.state.financial_risk_and_independence_assessment
-            }
-        )
-        
-        # Store individual task outputs based on their order of execution
-        for i, task_name in enumerate(self.phase_task_mapping['evaluation_reporting']):
-            if i < len(crew_output.tasks_output):
-                setattr(self.state, task_name, crew_output.tasks_output[i].raw)
-        
-        # Store overall crew output
-        self.state.evaluation_reporting_result = crew_output.raw
-
-
-def kickoff(run_id, company_name, central_index_key, company_ticker, year):
+    def audit_pipeline(self):
+        # Every task starts once the state fields it reads are filled, so downstream
+        # phases begin before the previous crew has finished all of its tasks.
+        crews = {}
+        for phase, (module_name, class_name) in self.phase_crews.items():
+            phase_crew = getattr(importlib.import_module(module_name), class_name)()
+            phase_crew.output_dir = phase_crew.output_dir.format(run_id=self.state.run_id)
+            phase_crew.run_id = self.state.run_id
+            crews[phase] = phase_crew.crew()
+
+        # Resume from the outputs a previous attempt of this run saved, and save after every task.
+        checkpoint = RunCheckpoint(self.state.run_id, f'./output/{self.state.run_id}')
+        saved_state = checkpoint.load()
+        if saved_state:
+            for task_name in (name for names in self.phase_task_mapping.values() for name in names):
+                setattr(self.state, task_name, saved_state.get(task_name, ''))
+            print(f"Resuming run {self.state.run_id} from its checkpoint.")
+
+        assembler = None
+        if self.report_path:
+            assembler = ReportAssembler(f'./output/{self.state.run_id}', self.report_path, self.on_phase_complete)
+            for phase, task_names in self.phase_task_mapping.items():
+                for idx, task_name in enumerate(task_names):
+                    if getattr(self.state, task_name):
+                        assembler.add(phase, idx)
+
+        def on_task_output(phase, idx, task_output):
+            checkpoint.save(self.state.model_dump())
+            if assembler:
+                assembler.add(phase, idx)
+            if self.on_task_complete:
+                self.on_task_complete(phase, self.phase_task_mapping[phase][idx])
+
+        # Latency, tokens and cost per task and phase land in the run_telemetry table, also when the run fails.
+        telemetry.start_telemetry(self.state.run_id)
+        log_event('run_started')
+        try:
+            phase_outputs = kickoff_pipeline(crews, self.phase_task_mapping, self.state, self.max_parallel_tasks, on_task_output)
+        finally:
+            telemetry.finish_telemetry()
+            release_website_search_tool(self.state.run_id)
+        log_event('run_completed')
+
+        # Store overall crew output, which is the output of its last task
+        for phase, tasks_output in phase_outputs.items():
+            setattr(self.state, self.phase_result_mapping[phase], tasks_output[-1].raw)
+
+
+def kickoff(run_id, company_name, central_index_key, company_ticker, year, report_path=None, on_phase_complete=None, on_task_complete=None):
     auditpulse_flow = AuditPulseFlow()
+    auditpulse_flow.report_path = report_path
+    auditpulse_flow.on_phase_complete = on_phase_complete
+    auditpulse_flow.on_task_complete = on_task_complete
     print(f'Date: {auditpulse_flow.state.current_date}')
     auditpulse_flow.state.run_id = run_id
     auditpulse_flow.state.company_name = company_name
@@ -0,0 +1,140 @@
+import os
+import json
+import time
+import tempfile
+import threading
+
+try:
+    import fcntl
+except ImportError:
+    # Windows development machines only get the in-process lock.
+    fcntl = None
+
+# Vertex AI quota per model, shared by every worker process on the host.
+DEFAULT_QUOTAS = {
+    'vertex_ai/gemini-2.0-flash-lite-001': {'rpm': 200, 'tpm': 4_000_000},
+}
+DEFAULT_QUOTA = {'rpm': 60, 'tpm': 1_000_000}
+
+
+def estimate_tokens(messages):
+    """
+    Roughly estimates the number of tokens in a prompt or completion.
+
+    Args:
+        messages (str or list): A string or a list of chat messages with a 'content' key.
+
+    Returns:
+        int: Estimated token count, assuming about four characters per token.
+    """
+    if messages is None:
+        return 0
+    if isinstance(messages, str):
+        return len(messages) // 4
+    return sum(len(str(message.get('content', '') if isinstance(message, dict) else message)) for message in messages) // 4
+
+
+class SharedRateLimiter:
+    """
+    Token bucket rate limiter for LLM calls shared across processes.
+
+    Each model has a requests-per-minute and a tokens-per-minute bucket. The bucket
+    levels live in a small JSON state file guarded by an exclusive file lock, so every
+    worker process on the host draws from the same quota. Calls only wait when a bucket
+    is empty.
+
+    Attributes:
+        state_path (str): Path of the shared bucket state file.
+        quotas (dict): Maps a model to its {'rpm': int, 'tpm': int} quota.
+        default_quota (dict): Quota used for models missing from `quotas`.
+    """
+
+    def __init__(self, state_path, quotas=None, default_quota=None):
+        self.state_path = state_path
+        self.quotas = quotas or {}
+        self.default_quota = default_quota or DEFAULT_QUOTA
+        self._lock = threading.Lock()
+
+    def acquire(self, model, tokens=0):
+        """
+        Blocks until the model's buckets hold one request and `tokens` tokens, then takes them.
+
+        Args:
+            model (str): Model identifier the call is made against.
+            tokens (int): Estimated prompt tokens of the call.
+
+        Returns:
+            float: Seconds spent waiting for quota.
+        """
+        waited = 0.0
+        while True:
+            wait = self._update(model, requests=1, tokens=tokens, block=True)
+            if wait <= 0:
+                return waited
+            time.sleep(wait)
+            waited += wait
+
+    def consume(self, model, tokens):
+        """
+        Charges tokens that were only known after the call, e.g. the completion, without waiting.
+
+        Args:
+            model (str): Model identifier the call was made against.
+            tokens (int): Tokens to take from the bucket, it may go negative.
+
+        Returns:
+            None
+        """
+        self._update(model, requests=0, tokens=tokens, block=False)
+
+    def _update(self, model, requests, tokens, block):
+        model = model or 'default'
+        quota = self.quotas.get(model, self.default_quota)
+        # A call larger than the whole bucket would otherwise wait forever.
+        tokens = min(tokens, quota['tpm'])
+        with self._lock, open(self.state_path, 'a+', encoding='utf-8') as f:
+            if fcntl:
+                fcntl.flock(f, fcntl.LOCK_EX)
+            f.seek(0)
+            raw_state = f.read()
+            try:
+                state = json.loads(raw_state) if raw_state else {}
+            except json.JSONDecodeError:
+                state = {}
+
+            now = time.time()
+            bucket = state.get(model, {'requests': quota['rpm'], 'tokens': quota['tpm'], 'updated_at': now})
+            elapsed = max(0.0, now - bucket['updated_at'])
+            available_requests = min(quota['rpm'], bucket['requests'] + elapsed * quota['rpm'] / 60)
+            available_tokens = min(quota['tpm'], bucket['tokens'] + elapsed * quota['tpm'] / 60)
+
+            wait = 0.0
+            if block and (available_requests < requests or available_tokens < tokens):
+                wait = max((requests - available_requests) * 60 / quota['rpm'],
+                           (tokens - available_tokens) * 60 / quota['tpm'])
+            else:
+                available_requests -= requests
+                available_tokens -= tokens
+
+            state[model] = {'requests': available_requests, 'tokens': available_tokens, 'updated_at': now}
+            f.seek(0)
+            f.truncate()
+            json.dump(state, f)
+            f.flush()
+        return wait
+
+
+def get_rate_limiter():
+    """
+    Builds the limiter used by the flow from the environment.
+
+    Returns:
+        SharedRateLimiter: Limiter backed by AUDITPULSE_RATE_LIMIT_STATE, with the default
+                           model quota overridable through AUDITPULSE_LLM_RPM and AUDITPULSE_LLM_TPM.
+    """
+    quotas = {model: dict(quota) for model, quota in DEFAULT_QUOTAS.items()}
+    for quota in quotas.values():
+        quota['rpm'] = int(os.getenv('AUDITPULSE_LLM_RPM', quota['rpm']))
+        quota['tpm'] = int(os.getenv('AUDITPULSE_LLM_TPM', quota['tpm']))
+    state_path = os.getenv('AUDITPULSE_RATE_LIMIT_STATE', os.path.join(tempfile.gettempdir(), 'auditpulse_rate_limits.json'))
+    return SharedRateLimiter(state_path, quotas)
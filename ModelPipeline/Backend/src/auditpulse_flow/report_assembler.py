@@ -0,0 +1,86 @@
+import os
+import re
+import threading
+
+# Task output files of each phase, in the order they appear in the audit report.
+# The order matches the task declaration order of the crews.
+REPORT_SECTIONS = {
+    'client_acceptance': ['client_background_task.md', 'financial_risk_task.md', 'engagement_scope_task.md'],
+    'audit_planning': ['preliminary_engagement_task.md', 'business_risk_task.md', 'internal_control_task.md', 'audit_strategy_task.md'],
+    'testing_evidence': ['control_testing_task.md', 'financial_statement_analysis_task.md', 'significant_transaction_testing_task.md', 'fraud_risk_assessment_task.md'],
+    'evaluation_reporting': ['evidence_evaluation_task.md', 'financial_statement_compliance_task.md', 'going_concern_task.md', 'audit_opinion_task.md']
+}
+
+# Opening fence with an optional language, closing fence, and stray ```markdown markers.
+CODE_FENCE_PATTERN = re.compile(r'\A\s*```[\w-]*[ \t]*\n?|\n?```\s*\Z|```markdown')
+
+
+def clean_markdown(content):
+    """Removes the code fences the LLM wraps its markdown in, in a single pass."""
+    return CODE_FENCE_PATTERN.sub('', content)
+
+
+class ReportAssembler:
+    """
+    Builds the audit report while the tasks run.
+
+    A finished task's section is appended as soon as every section before it in the
+    report has been appended, sections finishing out of order wait in memory. Once
+    the last section of a phase is written, `on_phase_complete` is called with the
+    phase name and the report assembled up to it, e.g. to upload the partial report.
+    It is called under the lock of the assembler, so partial reports are published
+    one at a time and in report order.
+
+    Attributes:
+        base_path (str): Directory holding the task outputs of the run, one subdirectory per phase.
+        report_path (str): Path of the report being assembled.
+        on_phase_complete (callable): Optional callback invoked with (phase, report_text).
+    """
+
+    def __init__(self, base_path, report_path, on_phase_complete=None):
+        self.base_path = base_path
+        self.report_path = report_path
+        self.on_phase_complete = on_phase_complete
+        self.sections = [(phase, task_file) for phase, task_files in REPORT_SECTIONS.items() for task_file in task_files]
+        self._pending = {}
+        self._report_parts = []
+        self._written = 0
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(report_path) or '.', exist_ok=True)
+        open(report_path, 'w').close()
+
+    @property
+    def complete(self):
+        return self._written == len(self.sections)
+
+    def add(self, phase, idx):
+        """
+        Adds the output of a finished task to the report.
+
+        Args:
+            phase (str): Phase of the task.
+            idx (int): Index of the task in its phase.
+
+        Returns:
+            None
+        """
+        section = (phase, REPORT_SECTIONS[phase][idx])
+        with open(os.path.join(self.base_path, *section), 'r') as task_report_file:
+            content = clean_markdown(task_report_file.read())
+        with self._lock:
+            if self.sections.index(section) < self._written:
+                return
+            self._pending[section] = content
+            completed_phases = []
+            with open(self.report_path, 'a') as report_file:
+                while not self.complete and self.sections[self._written] in self._pending:
+                    written_phase = self.sections[self._written][0]
+                    section_text = self._pending.pop(self.sections[self._written]) + '\n'
+                    report_file.write(section_text)
+                    self._report_parts.append(section_text)
+                    self._written += 1
+                    if self.complete or self.sections[self._written][0] != written_phase:
+                        completed_phases.append((written_phase, ''.join(self._report_parts)))
+            if self.on_phase_complete:
+                for completed_phase, report_text in completed_phases:
+                    self.on_phase_complete(completed_phase, report_text)
@@ -0,0 +1,241 @@
+import os
+import json
+import time
+import hashlib
+
+
+def make_result_key(central_index_key, year, prompt_path, policy_version, model):
+    """
+    Builds the key of a report, made of everything that determines its content.
+
+    Args:
+        central_index_key (int or str): Validated central index key of the company.
+        year (int or str): Validated audit year.
+        prompt_path (str): GCS path of the active prompts.
+        policy_version (str): Version of the active PCAOB policy.
+        model (str): Identifier of the LLM generating the report.
+
+    Returns:
+        str: SHA-256 hex digest of the inputs.
+    """
+    payload = json.dumps({
+        'central_index_key': str(central_index_key),
+        'year': str(year),
+        'prompt_path': prompt_path,
+        'policy_version': policy_version,
+        'model': model,
+    }, sort_keys=True)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class ResultStore:
+    """
+    Compiled reports of previous runs, stored in GCS next to the reports themselves.
+
+    Each entry points at the uploaded audit and visualization reports of the run that
+    produced it. Lookups and writes never fail a run, errors are logged and treated as a miss.
+
+    Attributes:
+        bucket (google.cloud.storage.Bucket): Bucket holding the entries.
+        max_age (float): Seconds an entry stays fresh.
+        prefix (str): GCS prefix of the entries.
+    """
+
+    def __init__(self, bucket, max_age, prefix='result_cache'):
+        self.bucket = bucket
+        self.max_age = max_age
+        self.prefix = prefix
+
+    def get(self, key):
+        """
+        Looks up a fresh report.
+
+        Args:
+            key (str): Key from `make_result_key`.
+
+        Returns:
+            dict or None: The entry, or None if there is none or it is older than `max_age`.
+        """
+        try:
+            blob = self.bucket.blob(f'{self.prefix}/{key}.json')
+            if not blob.exists():
+                return None
+            entry = json.loads(blob.download_as_text())
+        except Exception as e:
+            print(f"Result store lookup failed for {key}: {e}")
+            return None
+        if time.time() - entry.get('created_at', 0) > self.max_age:
+            return None
+        return entry
+
+    def put(self, key, run_id, audit_report_path):
+        """
+        Records the audit report of a completed run, its visualization follows with `set_visualization`.
+
+        Args:
+            key (str): Key from `make_result_key`.
+            run_id (str): Run that generated the reports.
+            audit_report_path (str): GCS path of the audit report.
+
+        Returns:
+            None
+        """
+        entry = {
+            'run_id': run_id,
+            'audit_report_path': audit_report_path,
+            'visualization_path': '',
+            'visualization_pending': True,
+            'waiting_run_ids': [],
+            'created_at': time.time(),
+        }
+        try:
+            self.bucket.blob(f'{self.prefix}/{key}.json').upload_from_string(json.dumps(entry), content_type='application/json')
+        except Exception as e:
+            print(f"Result store write failed for {key}: {e}")
+
+    def _update(self, key, change):
+        # Applies change(entry) with a generation precondition, so concurrent updates are never lost.
+        from google.api_core.exceptions import NotFound, PreconditionFailed
+        blob = self.bucket.blob(f'{self.prefix}/{key}.json')
+        while True:
+            try:
+                blob.reload()
+                entry = json.loads(blob.download_as_text(if_generation_match=blob.generation))
+                change(entry)
+                blob.upload_from_string(json.dumps(entry), content_type='application/json', if_generation_match=blob.generation)
+                return entry
+            except NotFound:
+                return None
+            except PreconditionFailed:
+                continue
+
+    def wait_for_visualization(self, key, run_id):
+        """
+        Registers a run reusing an entry whose visualization is still being built.
+
+        Args:
+            key (str): Key from `make_result_key`.
+            run_id (str): Run reusing the entry, `set_visualization` returns it.
+
+        Returns:
+            dict or None: The entry, with the visualization path if it was set meanwhile. None on errors.
+        """
+        def register(entry):
+            if entry.get('visualization_pending') and run_id not in entry['waiting_run_ids']:
+                entry['waiting_run_ids'].append(run_id)
+        try:
+            return self._update(key, register)
+        except Exception as e:
+            print(f"Result store write failed for {key}: {e}")
+            return None
+
+    def set_visualization(self, key, visualization_path):
+        """
+        Completes an entry with the visualization of its run, keeping its creation time.
+
+        Args:
+            key (str): Key from `make_result_key`.
+            visualization_path (str): GCS path of the visualization report, '' if it could not be built.
+
+        Returns:
+            list: run_ids that reused the entry while the visualization was pending.
+        """
+        waiting_run_ids = []
+        def complete(entry):
+            waiting_run_ids[:] = entry.get('waiting_run_ids', [])
+            entry.update(visualization_path=visualization_path, visualization_pending=False, waiting_run_ids=[])
+        try:
+            self._update(key, complete)
+        except Exception as e:
+            print(f"Result store write failed for {key}: {e}")
+        return waiting_run_ids
+
+
+def get_result_store(bucket):
+    """Builds the result store, entries stay fresh for AUDITPULSE_RESULT_MAX_AGE seconds (7 days by default)."""
+    return ResultStore(bucket, float(os.getenv('AUDITPULSE_RESULT_MAX_AGE', 7*24*60*60)))
+
+
+class InflightRuns:
+    """
+    Tracks the run generating each report, so duplicate requests attach to it instead of running again.
+
+    A claim is a GCS object per key holding the leading run and the runs attached to it.
+    Every change is written with a generation precondition, which makes claiming and
+    attaching atomic across worker processes and instances.
+
+    Attributes:
+        bucket (google.cloud.storage.Bucket): Bucket holding the claims.
+        max_age (float): Seconds after which the claim of a lost leader can be taken over.
+        prefix (str): GCS prefix of the claims.
+    """
+
+    def __init__(self, bucket, max_age, prefix='result_cache/inflight'):
+        self.bucket = bucket
+        self.max_age = max_age
+        self.prefix = prefix
+
+    def _read(self, key):
+        from google.api_core.exceptions import NotFound, PreconditionFailed
+        blob = self.bucket.blob(f'{self.prefix}/{key}.json')
+        while True:
+            try:
+                blob.reload()
+                return blob, blob.generation, json.loads(blob.download_as_text(if_generation_match=blob.generation))
+            except NotFound:
+                return blob, 0, None
+            except PreconditionFailed:
+                # The claim changed between reading its generation and its content.
+                continue
+
+    def claim(self, key, run_id):
+        """
+        Makes the run the leader of the key, or attaches it to the run already leading it.
+
+        Args:
+            key (str): Key from `make_result_key`.
+            run_id (str): Run asking for the report.
+
+        Returns:
+            str or None: None if the run leads the key, else the run_id of the leader it was attached to.
+        """
+        from google.api_core.exceptions import PreconditionFailed
+        while True:
+            blob, generation, claim = self._read(key)
+            if claim and claim['leader'] != run_id and time.time() - claim['started_at'] <= self.max_age:
+                if run_id in claim['followers']:
+                    return claim['leader']
+                leader = claim['leader']
+                claim['followers'].append(run_id)
+            else:
+                # No claim, a redelivery of the leader, or a leader that was lost.
+                leader = None
+                followers = [follower for follower in (claim or {}).get('followers', []) if follower != run_id]
+                claim = {'leader': run_id, 'followers': followers, 'started_at': time.time()}
+            try:
+                blob.upload_from_string(json.dumps(claim), content_type='application/json', if_generation_match=generation)
+                return leader
+            except PreconditionFailed:
+                continue
+
+    def release(self, key, run_id):
+        """
+        Removes the claim of a leader once its run reached a terminal status.
+
+        Args:
+            key (str): Key from `make_result_key`.
+            run_id (str): Leading run.
+
+        Returns:
+            list: run_ids attached to the leader, they share its outcome.
+        """
+        from google.api_core.exceptions import PreconditionFailed
+        while True:
+            blob, generation, claim = self._read(key)
+            if not claim or claim['leader'] != run_id:
+                return []
+            try:
+                blob.delete(if_generation_match=generation)
+                return claim['followers']
+            except PreconditionFailed:
+                continue
@@ -0,0 +1,148 @@
+import re
+import contextvars
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from crewai import Crew, Process
+from crewai.tasks.task_output import TaskOutput
+
+from auditpulse_flow.event_log import set_task_context
+
+
+def get_context_dependencies(tasks):
+    """
+    Builds the dependency graph of a crew from the context= declarations of its tasks.
+
+    Args:
+        tasks (list[Task]): Tasks of the crew, in declaration order.
+
+    Returns:
+        dict: Maps the index of each task to the indices of the tasks it needs as context.
+    """
+    task_indices = {id(task): idx for idx, task in enumerate(tasks)}
+    dependencies = {}
+    for idx, task in enumerate(tasks):
+        context = task.context if isinstance(task.context, list) else []
+        dependencies[idx] = [task_indices[id(context_task)] for context_task in context if id(context_task) in task_indices]
+    return dependencies
+
+def run_task_graph(nodes, dependencies, execute, max_workers=4, results=None):
+    """
+    Executes every node as soon as all of the nodes it depends on have finished.
+
+    Nodes run on a thread pool. Each one runs in a copy of the caller's context so
+    per-run state kept in context variables (e.g. the run log file) follows it.
+
+    Args:
+        nodes (list): Hashable node identifiers, independent nodes are started in this order.
+        dependencies (dict): Maps a node to the list of nodes it waits for.
+        execute (callable): Called with a node, returns the result of that node.
+        max_workers (int): Maximum number of nodes executing at the same time.
+        results (dict): Results of nodes that are already done, they are not executed again.
+
+    Returns:
+        dict: Maps every node to the value returned by `execute`.
+    """
+    results = dict(results or {})
+    pending = [node for node in nodes if node not in results]
+    running = {}
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        while pending or running:
+            ready = [node for node in pending if all(dep in results for dep in dependencies.get(node, []))]
+            for node in ready:
+                pending.remove(node)
+                context = contextvars.copy_context()
+                running[executor.submit(context.run, execute, node)] = node
+            if not running:
+                raise ValueError(f"Unresolvable task dependencies for: {pending}")
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                node = running.pop(future)
+                results[node] = future.result()
+    return results
+
+def get_template_fields(task):
+    """
+    Finds the input placeholders a task interpolates into its description and expected output.
+
+    Args:
+        task (Task): A task that has not been interpolated yet.
+
+    Returns:
+        set[str]: Names of the referenced inputs.
+    """
+    template = f"{task.description}\n{task.expected_output}"
+    return set(re.findall(r"\{([A-Za-z_][A-Za-z0-9_]*)\}", template))
+
+def kickoff_pipeline(crews, output_fields, state, max_workers=4, on_task_output=None):
+    """
+    Runs the tasks of several sequential crews as a single dependency graph.
+
+    A task starts as soon as the tasks in its context= have finished and every state
+    field referenced by its templates has been filled, whichever crew produces it.
+    Each task runs in a single-task crew with the current state as inputs, and its raw
+    output is written to its state field on completion. crewai agents keep per-task
+    executor state, so every task gets its own copy of a shared agent.
+
+    Tasks whose state field is already filled, e.g. restored from a checkpoint, are
+    not run again. Their saved output is handed to the tasks that use them as context.
+
+    Args:
+        crews (dict): Maps a phase name to its Crew.
+        output_fields (dict): Maps a phase name to the state fields filled by its tasks, in declaration order.
+        state (BaseModel): Flow state holding the run inputs and the task outputs.
+        max_workers (int): Maximum number of tasks executing at the same time.
+        on_task_output (callable): Optional callback invoked with (phase, task index, TaskOutput) after each task.
+
+    Returns:
+        dict: Maps a phase name to the outputs of its tasks, in declaration order.
+    """
+    tasks = {}
+    producers = {}
+    for phase, crew in crews.items():
+        for idx, (task, field) in enumerate(zip(crew.tasks, output_fields[phase])):
+            tasks[(phase, idx)] = task
+            producers[field] = (phase, idx)
+
+    dependencies = {}
+    for phase, crew in crews.items():
+        context_dependencies = get_context_dependencies(crew.tasks)
+        for idx, task in enumerate(crew.tasks):
+            node = (phase, idx)
+            dependencies[node] = [(phase, dep) for dep in context_dependencies[idx]]
+            dependencies[node] += [producers[field] for field in sorted(get_template_fields(task))
+                                   if field in producers and producers[field] != node]
+
+    completed = {}
+    for node, task in tasks.items():
+        saved_output = getattr(state, output_fields[node[0]][node[1]])
+        if saved_output:
+            task.output = TaskOutput(description=task.description, raw=saved_output, agent=task.agent.role)
+            completed[node] = task.output
+
+    agents_in_use = set()
+    for task in tasks.values():
+        if id(task.agent) in agents_in_use:
+            task.agent = task.agent.copy()
+        agents_in_use.add(id(task.agent))
+
+    def execute(node):
+        phase, idx = node
+        task = tasks[node]
+        # Every node runs in its own context, so the events it emits are tagged with its task.
+        set_task_context(phase=phase, task=output_fields[phase][idx], agent=task.agent.role)
+        inputs = {key: value for key, value in state.model_dump().items() if value is not None}
+        task_crew = Crew(
+            agents=[task.agent],
+            tasks=[task],
+            process=Process.sequential,
+            verbose=crews[phase].verbose,
+            output_log_file=crews[phase].output_log_file
+        )
+        task_output = task_crew.kickoff(inputs=inputs).tasks_output[0]
+        setattr(state, output_fields[phase][idx], task_output.raw)
+        if on_task_output:
+            on_task_output(phase, idx, task_output)
+        return task_output
+
+    results = run_task_graph(list(tasks), dependencies, execute, max_workers, completed)
+    return {phase: [results[(phase, idx)] for idx in range(len(crew.tasks))] for phase, crew in crews.items()}
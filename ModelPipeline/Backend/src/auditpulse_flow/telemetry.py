@@ -0,0 +1,261 @@
+import os
+import time
+import sqlite3
+import threading
+import contextvars
+from contextlib import contextmanager
+from datetime import datetime
+
+from auditpulse_flow.event_log import get_task_context
+
+# List prices in USD per million tokens.
+MODEL_PRICES = {
+    'vertex_ai/gemini-2.0-flash-lite-001': {'prompt': 0.075, 'completion': 0.30},
+}
+
+COUNTERS = ['llm_calls', 'llm_time', 'prompt_tokens', 'completion_tokens', 'llm_retries',
+            'tool_calls', 'tool_time', 'tool_errors', 'rate_limit_wait', 'cost']
+COLUMNS = ['run_id', 'phase', 'task', 'wall_time'] + COUNTERS + ['recorded_at']
+
+_run_telemetry = contextvars.ContextVar('run_telemetry', default=None)
+
+
+class RunTelemetry:
+    """
+    Performance counters of a run, per task.
+
+    LLM and tool calls are attributed to the task active in the context that started
+    them, as set by `set_task_context`. Failed LLM calls are counted as retries, the
+    agent sends the request again.
+
+    Attributes:
+        run_id (str): Identifier of the run.
+    """
+
+    def __init__(self, run_id):
+        self.run_id = run_id
+        self.started_at = time.perf_counter()
+        self.finished_at = None
+        self._tasks = {}
+        self._open_calls = {}
+        self._lock = threading.Lock()
+
+    def _task(self, key):
+        if key not in self._tasks:
+            self._tasks[key] = dict(dict.fromkeys(COUNTERS, 0), wall_time=0.0, started=[], spans=[])
+        return self._tasks[key]
+
+    def _current_key(self):
+        context = get_task_context()
+        return context.get('phase'), context.get('task')
+
+    def task_started(self):
+        with self._lock:
+            self._task(self._current_key())['started'].append(time.perf_counter())
+
+    def task_finished(self):
+        now = time.perf_counter()
+        with self._lock:
+            task = self._task(self._current_key())
+            if task['started']:
+                start = task['started'].pop()
+                task['wall_time'] += now - start
+                task['spans'].append((start, now))
+
+    def call_started(self, call_id, prompt_tokens=0, rate_limit_wait=0):
+        with self._lock:
+            self._open_calls[call_id] = (self._current_key(), time.perf_counter(), prompt_tokens)
+            self._task(self._open_calls[call_id][0])['rate_limit_wait'] += rate_limit_wait or 0
+
+    def call_finished(self, kind, call_id, failed=False, model=None, completion_tokens=0):
+        now = time.perf_counter()
+        with self._lock:
+            key, start, prompt_tokens = self._open_calls.pop(call_id, (self._current_key(), now, 0))
+            task = self._task(key)
+            if kind == 'llm':
+                prices = MODEL_PRICES.get(model, {'prompt': 0, 'completion': 0})
+                task['llm_calls'] += 1
+                task['llm_time'] += now - start
+                task['prompt_tokens'] += prompt_tokens
+                task['completion_tokens'] += completion_tokens
+                task['llm_retries'] += int(failed)
+                task['cost'] += (prompt_tokens * prices['prompt'] + completion_tokens * prices['completion']) / 1e6
+            else:
+                task['tool_calls'] += 1
+                task['tool_time'] += now - start
+                task['tool_errors'] += int(failed)
+
+    def rows(self):
+        """
+        Summarizes the run.
+
+        Returns:
+            list[dict]: One row per task, one per phase with task None, and one for the whole
+                        run with phase and task None. Phase wall time spans its first task start
+                        to its last task end, so tasks running in parallel are not added up.
+        """
+        recorded_at = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        finished_at = self.finished_at or time.perf_counter()
+
+        def make_row(phase, task_name, wall_time, tasks):
+            row = {'run_id': self.run_id, 'phase': phase, 'task': task_name, 'wall_time': round(wall_time, 3), 'recorded_at': recorded_at}
+            for counter in COUNTERS:
+                row[counter] = sum(task[counter] for task in tasks)
+            for counter in ['llm_time', 'tool_time', 'rate_limit_wait']:
+                row[counter] = round(row[counter], 3)
+            row['cost'] = round(row['cost'], 6)
+            return row
+
+        with self._lock:
+            rows = []
+            phases = {}
+            for (phase, task_name), task in self._tasks.items():
+                if phase is None:
+                    continue
+                rows.append(make_row(phase, task_name, task['wall_time'], [task]))
+                phases.setdefault(phase, []).append(task)
+            for phase, tasks in phases.items():
+                spans = [span for task in tasks for span in task['spans']]
+                wall_time = max(end for _, end in spans) - min(start for start, _ in spans) if spans else 0.0
+                rows.append(make_row(phase, None, wall_time, tasks))
+            rows.append(make_row(None, None, finished_at - self.started_at, list(self._tasks.values())))
+        return rows
+
+
+class TelemetryStore:
+    """
+    Writes run telemetry to the run_telemetry table, in MySQL or in a local SQLite file.
+
+    A run's rows replace the ones of its previous attempts.
+
+    Attributes:
+        sqlite_path (str): Path of the SQLite database, None to write to MySQL.
+    """
+
+    create_table = """
+        CREATE TABLE IF NOT EXISTS run_telemetry (
+            run_id VARCHAR(64) NOT NULL,
+            phase VARCHAR(64),
+            task VARCHAR(128),
+            wall_time DOUBLE NOT NULL,
+            llm_calls INTEGER NOT NULL,
+            llm_time DOUBLE NOT NULL,
+            prompt_tokens INTEGER NOT NULL,
+            completion_tokens INTEGER NOT NULL,
+            llm_retries INTEGER NOT NULL,
+            tool_calls INTEGER NOT NULL,
+            tool_time DOUBLE NOT NULL,
+            tool_errors INTEGER NOT NULL,
+            rate_limit_wait DOUBLE NOT NULL,
+            cost DOUBLE NOT NULL,
+            recorded_at DATETIME NOT NULL
+        )
+    """
+
+    def __init__(self, sqlite_path=None):
+        self.sqlite_path = sqlite_path
+        self._table_created = False
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.sqlite_path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def write(self, rows):
+        """
+        Stores the telemetry rows of a run.
+
+        Args:
+            rows (list[dict]): Rows from `RunTelemetry.rows`, all of the same run.
+
+        Returns:
+            None
+        """
+        if not rows:
+            return
+        values = [tuple(row[column] for column in COLUMNS) for row in rows]
+        if self.sqlite_path:
+            with self._connect() as conn:
+                conn.execute(self.create_table)
+                conn.execute("DELETE FROM run_telemetry WHERE run_id=?", (rows[0]['run_id'],))
+                conn.executemany(f"INSERT INTO run_telemetry ({', '.join(COLUMNS)}) VALUES ({', '.join('?' * len(COLUMNS))})", values)
+            return
+        from database import execute_batch
+        statements = [] if self._table_created else [(self.create_table, None)]
+        statements += [
+            ("DELETE FROM run_telemetry WHERE run_id=%s", (rows[0]['run_id'],)),
+            (f"INSERT INTO run_telemetry ({', '.join(COLUMNS)}) VALUES ({', '.join(['%s'] * len(COLUMNS))})", values),
+        ]
+        execute_batch(statements)
+        self._table_created = True
+
+
+_telemetry_store = None
+
+def get_telemetry_store():
+    """Returns the process-wide store, a SQLite file at AUDITPULSE_TELEMETRY_SQLITE_PATH if set (development), else MySQL."""
+    global _telemetry_store
+    if _telemetry_store is None:
+        _telemetry_store = TelemetryStore(os.getenv('AUDITPULSE_TELEMETRY_SQLITE_PATH'))
+    return _telemetry_store
+
+def start_telemetry(run_id):
+    """Starts collecting the telemetry of a run in the current context."""
+    telemetry = RunTelemetry(run_id)
+    _run_telemetry.set(telemetry)
+    return telemetry
+
+def get_telemetry():
+    """Returns the telemetry of the run active in the current context, if any."""
+    return _run_telemetry.get()
+
+def finish_telemetry():
+    """
+    Stops collecting the telemetry of the current run and stores it. Storage errors are
+    logged and never fail the run.
+
+    Returns:
+        list[dict]: The telemetry rows, empty outside of a run.
+    """
+    telemetry = _run_telemetry.get()
+    if telemetry is None:
+        return []
+    _run_telemetry.set(None)
+    telemetry.finished_at = time.perf_counter()
+    rows = telemetry.rows()
+    for row in rows:
+        if row['task'] is None:
+            print(f"[TELEMETRY] {row['phase'] or 'run'}: {row['wall_time']}s, {row['llm_calls']} LLM calls "
+                  f"({row['llm_time']}s, {row['prompt_tokens']}+{row['completion_tokens']} tokens, "
+                  f"{row['rate_limit_wait']}s rate limited), {row['tool_calls']} tool calls ({row['tool_time']}s), ${row['cost']}")
+    try:
+        get_telemetry_store().write(rows)
+    except Exception as e:
+        print(f"Storing the telemetry of run {telemetry.run_id} failed: {e}")
+    return rows
+
+def task_started():
+    telemetry = _run_telemetry.get()
+    if telemetry:
+        telemetry.task_started()
+
+def task_finished():
+    telemetry = _run_telemetry.get()
+    if telemetry:
+        telemetry.task_finished()
+
+def call_started(call_id, prompt_tokens=0, rate_limit_wait=0):
+    """Records the start of an LLM or tool call, it is a no-op outside of a run."""
+    telemetry = _run_telemetry.get()
+    if telemetry:
+        telemetry.call_started(call_id, prompt_tokens, rate_limit_wait)
+
+def call_finished(kind, call_id, failed=False, model=None, completion_tokens=0):
+    """Records the end of an 'llm' or 'tool' call, it is a no-op outside of a run."""
+    telemetry = _run_telemetry.get()
+    if telemetry:
+        telemetry.call_finished(kind, call_id, failed, model, completion_tokens)
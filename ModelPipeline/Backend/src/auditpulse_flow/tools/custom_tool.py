@@ -2,25 +2,67 @@ from typing import Type, Optional
 
 from crewai.tools import BaseTool
 from pydantic import BaseModel, Field
-from crewai_tools import ScrapeWebsiteTool
+from crewai_tools import ScrapeWebsiteTool, SerperDevTool
 
-import io
+import os
+import re
 import fitz
+import tempfile
 import requests
-
-
-def pdf2text(url):
-    response = requests.request(url)
-    text = ''
-    if response.status_code==200:
-        bytes_data = io.BytesIO(response.content)
-        pdf_doc = fitz.open(stream=bytes_data, filetype='pdf')
-
-        for page_no in range(len(pdf_doc)):
-            page = pdf_doc.pages[page_no]
-            text+=page.get_text()
-
-    return text
+from bs4 import BeautifulSoup
+
+from .tool_cache import ToolRunError, cached_tool_run
+
+SEARCH_CACHE_TTL = 24*60*60
+SCRAPE_CACHE_TTL = 7*24*60*60
+
+
+def pdf2text(url, max_chars=3_000_000, max_bytes=256*1024*1024, chunk_size=1024*1024):
+    """
+    Extracts the text of a PDF without holding the document in memory.
+
+    The PDF is streamed to a temporary file in chunks, then parsed page by page until
+    `max_chars` characters have been collected.
+
+    Args:
+        url (str): URL of the PDF.
+        max_chars (int): Character budget, pages past it are not parsed.
+        max_bytes (int): Largest download accepted, bigger documents return no text.
+        chunk_size (int): Bytes read from the network at a time.
+
+    Returns:
+        str: Text of the PDF, at most `max_chars` characters.
+    """
+    pages = []
+    n_chars = 0
+    pdf_file = tempfile.NamedTemporaryFile(suffix='.pdf', delete=False)
+    try:
+        with pdf_file, requests.get(url, stream=True, timeout=60) as response:
+            if response.status_code!=200:
+                return ''
+            n_bytes = 0
+            for chunk in response.iter_content(chunk_size=chunk_size):
+                n_bytes += len(chunk)
+                if n_bytes > max_bytes:
+                    return ''
+                pdf_file.write(chunk)
+
+        with fitz.open(pdf_file.name) as pdf_doc:
+            for page in pdf_doc:
+                page_text = page.get_text()[:max_chars-n_chars]
+                pages.append(page_text)
+                n_chars += len(page_text)
+                if n_chars >= max_chars:
+                    break
+    finally:
+        os.remove(pdf_file.name)
+    return ''.join(pages)
+
+def html2text(html):
+    """Extracts the text of a web page, as crewai's ScrapeWebsiteTool does."""
+    text = BeautifulSoup(html, 'html.parser').get_text(' ')
+    text = re.sub('[ \t]+', ' ', text)
+    return re.sub('\\s+\n\\s+', '\n', text)
 
 
 class MyCustomToolInput(BaseModel):
@@ -41,28 +83,41 @@ class MyCustomTool(BaseTool):
         return "this is an example of a tool output, ignore it and move along."
 
 
+class CachedSerperDevTool(SerperDevTool):
+    """SerperDevTool whose results are shared through the disk tool cache."""
+    def _run(self, **kwargs):
+        search = super()._run
+        arguments = dict(kwargs, n_results=self.n_results, search_type=getattr(self, 'search_type', None))
+        return cached_tool_run(self.name, arguments, lambda: search(**kwargs), SEARCH_CACHE_TTL)
+
+
 class WrappedScrapeWebsiteTool(ScrapeWebsiteTool):
     def __init__(self, website_url: Optional[str]=None):
         super().__init__(website_url=website_url)
 
     def _run(self, **kwargs):
+        website_url = kwargs.get('website_url', None) or self.website_url
+        return cached_tool_run(self.name, {'website_url': website_url}, lambda: self._scrape(**kwargs), SCRAPE_CACHE_TTL)
+
+    def _scrape(self, **kwargs):
+        # Failures raise ToolRunError, so a page that could not be read is not cached as its content.
         context_len = 1_000_000
         max_chars = context_len*3
-        website_url = kwargs.get('website_url', None)
-        if website_url and website_url.endswith('.pdf'):
-            result = self.pdf2text(website_url)
-        else:
-            result = super()._run(**kwargs)
+        website_url = kwargs.get('website_url', None) or self.website_url
+        try:
+            if website_url and website_url.endswith('.pdf'):
+                result = self.pdf2text(website_url, max_chars)
+                if not result:
+                    raise ToolRunError(f"Failed to read the PDF at {website_url}.")
+            else:
+                page = requests.get(website_url, timeout=15, headers=self.headers, cookies=self.cookies or {})
+                if page.status_code != 200:
+                    raise ToolRunError(f"Failed to read {website_url}, the server responded with status {page.status_code}.")
+                page.encoding = page.apparent_encoding
+                result = html2text(page.text)
+        except requests.RequestException as e:
+            raise ToolRunError(f"Failed to read {website_url}: {e}")
         return result[:max_chars]
 
-    def pdf2text(self, url):
-        response = requests.request(url)
-        text = ''
-        if response.status_code==200:
-            bytes_data = io.BytesIO(response.content)
-            pdf_doc = fitz.open(stream=bytes_data, filetype='pdf')
-
-            for page_no in range(len(pdf_doc)):
-                page = pdf_doc.pages[page_no]
-                text+=page.get_text()
-        return text
+    def pdf2text(self, url, max_chars=3_000_000):
+        return pdf2text(url, max_chars)
@@ -0,0 +1,120 @@
+import os
+import copy
+import uuid
+import shutil
+import hashlib
+import threading
+
+try:
+    import fcntl
+except ImportError:
+    # Windows development machines only get the in-process lock.
+    fcntl = None
+
+COMPLIANCE_FILE_PATH = './auditpulse_flow/data/compliance.json'
+AUDITPULSE_FILE_PATH = './auditpulse_flow/data/AuditPulseInfo.md'
+
+RAG_CONFIG = {
+    "llm": {
+        "provider": "vertexai",
+        "config": {
+            "model": "gemini-2.0-flash-lite-001",
+        },
+    },
+    "embedder": {
+        "provider": "vertexai",
+        "config": {
+            "model": "text-embedding-004",
+        },
+    },
+}
+
+_tools = {}
+_website_search_tools = {}
+_tools_lock = threading.Lock()
+
+
+def get_policy_version():
+    """Returns the active policy version, set by app.py from the Firestore deployment document."""
+    return os.getenv('AUDITPULSE_POLICY_VERSION', 'local')
+
+def get_file_version(file_path):
+    """Returns a short content hash of a file, used to version indexes of static files."""
+    with open(file_path, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()[:12]
+
+def get_rag_config(collection_name):
+    """
+    Builds the Vertex AI backed RAG config with a persistent vector store.
+
+    Args:
+        collection_name (str): Name of the collection, it also names the on-disk index directory.
+
+    Returns:
+        dict: Config for crewai_tools RAG tools.
+    """
+    config = copy.deepcopy(RAG_CONFIG)
+    config["vectordb"] = {
+        "provider": "chroma",
+        "config": {
+            "collection_name": collection_name,
+            "dir": get_index_dir(collection_name),
+        },
+    }
+    return config
+
+def get_index_dir(collection_name):
+    """Returns the on-disk directory of a collection, under AUDITPULSE_RAG_INDEX_DIR (./db/rag by default)."""
+    return os.path.join(os.getenv('AUDITPULSE_RAG_INDEX_DIR', './db/rag'), collection_name)
+
+def _get_shared_tool(collection_name, build):
+    """
+    Returns the process-wide instance of a RAG tool, building its index on first use.
+
+    The index lives on disk per collection, and embedchain skips chunks that are
+    already stored, so only the first process to build a collection pays for embedding.
+    A file lock keeps worker processes from writing the same collection concurrently.
+    """
+    with _tools_lock:
+        if collection_name not in _tools:
+            config = get_rag_config(collection_name)
+            index_dir = config["vectordb"]["config"]["dir"]
+            os.makedirs(index_dir, exist_ok=True)
+            with open(os.path.join(index_dir, '.lock'), 'w') as lock_file:
+                if fcntl:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX)
+                _tools[collection_name] = build(config)
+        return _tools[collection_name]
+
+def get_pcaob_guidelines_tool():
+    """Search tool over the active PCAOB compliance policy."""
+    from crewai_tools import JSONSearchTool
+    return _get_shared_tool(f"policy_{get_policy_version()}",
+                            lambda config: JSONSearchTool(config=config, json_path=COMPLIANCE_FILE_PATH))
+
+def get_auditpulse_file_tool():
+    """Search tool over the AuditPulse firm information."""
+    from crewai_tools import TXTSearchTool
+    return _get_shared_tool(f"auditpulse_info_{get_file_version(AUDITPULSE_FILE_PATH)}",
+                            lambda config: TXTSearchTool(config=config, file_path=AUDITPULSE_FILE_PATH))
+
+def get_website_search_tool(run_id=None):
+    """
+    Semantic search tool over the websites read by a run, shared by the crews of the run.
+
+    Pages go to a collection of the run only, so an audit never retrieves pages read for
+    another company. `release_website_search_tool` deletes the collection when the run
+    ends. Without a run_id the tool gets a collection of its own.
+    """
+    from crewai_tools import WebsiteSearchTool
+    run_id = run_id or uuid.uuid4().hex
+    with _tools_lock:
+        if run_id not in _website_search_tools:
+            _website_search_tools[run_id] = WebsiteSearchTool(config=get_rag_config(f"website_search_{run_id}"))
+        return _website_search_tools[run_id]
+
+def release_website_search_tool(run_id):
+    """Drops the website search tool of a finished run and deletes its collection."""
+    with _tools_lock:
+        _website_search_tools.pop(run_id, None)
+    shutil.rmtree(get_index_dir(f"website_search_{run_id}"), ignore_errors=True)
@@ -0,0 +1,174 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import tempfile
+from contextlib import contextmanager
+
+
+def normalize_arguments(arguments):
+    """
+    Normalizes tool arguments so equivalent calls share a cache entry.
+
+    Args:
+        arguments (dict): Keyword arguments the tool was called with.
+
+    Returns:
+        dict: Arguments without empty values and with whitespace collapsed in strings.
+    """
+    normalized = {}
+    for key, value in arguments.items():
+        if value is None:
+            continue
+        if isinstance(value, str):
+            value = ' '.join(value.split())
+        normalized[key] = value
+    return normalized
+
+def make_cache_key(tool_name, arguments):
+    """
+    Builds the content address of a tool call.
+
+    Args:
+        tool_name (str): Name of the tool.
+        arguments (dict): Keyword arguments the tool was called with.
+
+    Returns:
+        str: SHA-256 hex digest of the tool name and its normalized arguments.
+    """
+    payload = json.dumps({'tool': tool_name, 'arguments': normalize_arguments(arguments)}, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class ToolResultCache:
+    """
+    Disk-backed cache of tool results with per-entry TTL and LRU eviction.
+
+    Entries live in a SQLite database, which serializes writers across processes, so
+    every worker process on the host shares the same cache file.
+
+    Attributes:
+        db_path (str): Path of the SQLite cache file.
+        max_bytes (int): Total size of cached values above which the least recently used entries are evicted.
+    """
+
+    def __init__(self, db_path, max_bytes=256 * 1024 * 1024):
+        self.db_path = db_path
+        self.max_bytes = max_bytes
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS tool_results (
+                    key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    expires_at REAL NOT NULL,
+                    last_accessed REAL NOT NULL
+                )
+                """
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_tool_results_last_accessed ON tool_results (last_accessed)")
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def get(self, key):
+        """
+        Looks up a cached result.
+
+        Args:
+            key (str): Cache key from `make_cache_key`.
+
+        Returns:
+            Any: The cached result, or None if it is missing or expired.
+        """
+        now = time.time()
+        with self._connect() as conn:
+            row = conn.execute("SELECT value, expires_at FROM tool_results WHERE key=?", (key,)).fetchone()
+            if row is None:
+                return None
+            value, expires_at = row
+            if expires_at < now:
+                conn.execute("DELETE FROM tool_results WHERE key=?", (key,))
+                return None
+            conn.execute("UPDATE tool_results SET last_accessed=? WHERE key=?", (now, key))
+        return json.loads(value)
+
+    def set(self, key, value, ttl_seconds):
+        """
+        Stores a result and evicts the least recently used entries beyond `max_bytes`.
+
+        Args:
+            key (str): Cache key from `make_cache_key`.
+            value (Any): JSON serializable tool result.
+            ttl_seconds (float): How long the result stays valid.
+
+        Returns:
+            None
+        """
+        now = time.time()
+        serialized = json.dumps(value, default=str)
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO tool_results (key, value, size, expires_at, last_accessed) VALUES (?, ?, ?, ?, ?)",
+                (key, serialized, len(serialized), now + ttl_seconds, now)
+            )
+            conn.execute("DELETE FROM tool_results WHERE expires_at < ?", (now,))
+            total_size = conn.execute("SELECT COALESCE(SUM(size), 0) FROM tool_results").fetchone()[0]
+            if total_size > self.max_bytes:
+                evicted_keys = []
+                for old_key, size in conn.execute("SELECT key, size FROM tool_results ORDER BY last_accessed ASC").fetchall():
+                    if total_size <= self.max_bytes:
+                        break
+                    evicted_keys.append((old_key,))
+                    total_size -= size
+                conn.executemany("DELETE FROM tool_results WHERE key=?", evicted_keys)
+
+class ToolRunError(Exception):
+    """Raised by a tool run that failed, e.g. a page that could not be fetched. Its message goes to the agent and is never cached."""
+
+
+_tool_cache = None
+
+def get_tool_cache():
+    """Returns the process-wide tool cache, located by AUDITPULSE_TOOL_CACHE_PATH."""
+    global _tool_cache
+    if _tool_cache is None:
+        db_path = os.getenv('AUDITPULSE_TOOL_CACHE_PATH', os.path.join(tempfile.gettempdir(), 'auditpulse_tool_cache.sqlite'))
+        max_bytes = int(os.getenv('AUDITPULSE_TOOL_CACHE_MAX_BYTES', 256 * 1024 * 1024))
+        _tool_cache = ToolResultCache(db_path, max_bytes)
+    return _tool_cache
+
+def cached_tool_run(tool_name, arguments, run, ttl_seconds):
+    """
+    Returns a cached result of a tool call, running the tool on a miss.
+
+    Args:
+        tool_name (str): Name of the tool.
+        arguments (dict): Keyword arguments of the call.
+        run (callable): Runs the tool when the result is not cached.
+        ttl_seconds (float): How long a fresh result stays valid.
+
+    Returns:
+        Any: The tool result. Empty results and the messages of a `ToolRunError` are returned but not cached.
+    """
+    cache = get_tool_cache()
+    key = make_cache_key(tool_name, arguments)
+    result = cache.get(key)
+    if result is not None:
+        return result
+    try:
+        result = run()
+    except ToolRunError as e:
+        return str(e)
+    if result:
+        cache.set(key, result, ttl_seconds)
+    return result
@@ -1,5 +1,12 @@
+import os
+import sys
 import json
 
+if __name__ == '__main__':
+    # Run as a script, company_resolver lives in src next to this package.
+    sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from company_resolver import CompanyResolver, normalize_company_name
+
 def load_company_tickers(file_path):
     """
     Load the JSON file containing company tickers.
@@ -19,7 +26,86 @@ def build_cik_index(data):
         index[cik] = record
     return index
 
-data = load_company_tickers("us_public_companies.json")
-cik_index = build_cik_index(data)
-with open("cik_index.json", "w") as f:
-    json.dump(cik_index, f, indent=2)
\ No newline at end of file
+def normalize_cik(central_index_key):
+    """
+    Converts a central index key to the integer used by the index.
+
+    Args:
+        central_index_key (int or str): Central index key, possibly zero padded.
+
+    Returns:
+        int or None: The central index key, or None if it is not a number.
+    """
+    try:
+        return int(str(central_index_key).strip())
+    except ValueError:
+        return None
+
+
+class CompanyIndex:
+    """
+    Lookup tables of the SEC public company list by CIK, ticker and normalized name.
+
+    The company records are saved to disk as JSON with the GCS generation of the list
+    they came from, so a new process rebuilds the index from them instead of
+    downloading the list again. The fuzzy resolver over the titles and tickers is built
+    on first use and not persisted.
+
+    Attributes:
+        generation (int or None): GCS generation of the company list.
+        by_cik (dict): Maps the integer CIK to its company record.
+        by_ticker (dict): Maps the upper case ticker to its company record.
+        by_name (dict): Maps the normalized company name to its company record.
+    """
+
+    def __init__(self, data, generation=None):
+        self.generation = generation
+        self._resolver = None
+        self.by_cik = build_cik_index(data)
+        self.by_ticker = {}
+        self.by_name = {}
+        for record in self.by_cik.values():
+            if record.get('ticker'):
+                self.by_ticker.setdefault(record['ticker'].upper(), record)
+            if record.get('title'):
+                self.by_name.setdefault(normalize_company_name(record['title']), record)
+
+    def lookup_cik(self, central_index_key):
+        return self.by_cik.get(normalize_cik(central_index_key))
+
+    def lookup_ticker(self, ticker):
+        return self.by_ticker.get(str(ticker).strip().upper())
+
+    def lookup_name(self, company_name):
+        return self.by_name.get(normalize_company_name(company_name))
+
+    @property
+    def resolver(self):
+        if self._resolver is None:
+            self._resolver = CompanyResolver(self.by_cik.values())
+        return self._resolver
+
+    def save(self, index_path):
+        """Writes the index atomically, so concurrent readers never see a partial file."""
+        os.makedirs(os.path.dirname(index_path) or '.', exist_ok=True)
+        temp_path = f'{index_path}.{os.getpid()}.tmp'
+        with open(temp_path, 'w') as f:
+            json.dump({'generation': self.generation, 'companies': list(self.by_cik.values())}, f)
+        os.replace(temp_path, index_path)
+
+    @classmethod
+    def load(cls, index_path):
+        """Reads a saved index, returns None if it is missing or unreadable."""
+        try:
+            with open(index_path, 'r') as f:
+                state = json.load(f)
+            return cls(dict(enumerate(state['companies'])), state['generation'])
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+
+
+if __name__ == '__main__':
+    data = load_company_tickers("us_public_companies.json")
+    cik_index = build_cik_index(data)
+    with open("cik_index.json", "w") as f:
+        json.dump(cik_index, f, indent=2)
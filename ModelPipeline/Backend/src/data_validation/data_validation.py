@@ -1,30 +1,39 @@
 from datetime import datetime
 import os
 import json
+import time
+import threading
 from pydantic import BaseModel, Field
 import re
 from google.cloud import storage
 
-def download_companies_data(gcp_file_path='configs/us_public_companies/us_public_companies.json', local_file_path='inputs/us_public_companies.json'):
+from data_validation.create_cik_index import CompanyIndex
+from company_resolver import normalize_company_name, strip_legal_suffixes
+
+COMPANIES_GCP_PATH = 'configs/us_public_companies/us_public_companies.json'
+COMPANIES_LOCAL_PATH = 'inputs/us_public_companies.json'
+
+def download_companies_data(gcp_file_path=COMPANIES_GCP_PATH, local_file_path=COMPANIES_LOCAL_PATH, blob=None):
     """
     Downloads the public companies data file from the specified GCP bucket if not already present locally.
 
     Args:
-        bucket (str): Name of the GCP bucket containing the data.
         gcp_file_path (str): Path to the file in the GCP bucket.
         local_file_path (str): Path where the file should be stored locally.
+        blob (google.cloud.storage.Blob): Blob to download even if the file is present, e.g. a newer generation.
 
     Returns:
         None
     """
-    if os.path.exists(local_file_path):
+    if os.path.exists(local_file_path) and blob is None:
         return
     if not os.path.exists(os.path.dirname(local_file_path)):
         os.makedirs(os.path.dirname(local_file_path))
 
-    storage_client = storage.Client(project='auditpulse')
-    bucket = storage_client.bucket(bucket_name='auditpulse-data')
-    blob = bucket.blob(gcp_file_path)
+    if blob is None:
+        storage_client = storage.Client(project='auditpulse')
+        bucket = storage_client.bucket(bucket_name='auditpulse-data')
+        blob = bucket.blob(gcp_file_path)
     blob.download_to_filename(local_file_path)
 
 def load_company_data(file_path):
@@ -41,6 +50,57 @@ def load_company_data(file_path):
         data = json.load(f)
     return data
 
+_company_index = None
+_company_index_checked_at = 0
+_company_index_lock = threading.Lock()
+
+def get_company_blob(gcp_file_path=COMPANIES_GCP_PATH):
+    """Returns the blob of the company list in GCS with its metadata loaded, or None if it can't be reached."""
+    try:
+        storage_client = storage.Client(project='auditpulse')
+        return storage_client.bucket(bucket_name='auditpulse-data').get_blob(gcp_file_path)
+    except Exception as e:
+        print(f"Checking the company list in GCS failed: {e}")
+        return None
+
+def get_company_index(gcp_file_path=COMPANIES_GCP_PATH, local_file_path=COMPANIES_LOCAL_PATH):
+    """
+    Returns the process-wide company index, built on first use.
+
+    The GCS generation of the company list is checked at most every
+    AUDITPULSE_COMPANY_INDEX_REFRESH seconds (10 minutes by default). The index is
+    rebuilt only when the generation changed, and is persisted at
+    AUDITPULSE_COMPANY_INDEX_PATH (company_index.json next to the local company list
+    by default) so new worker processes load it without downloading the list. When
+    GCS can't be reached the current or persisted index is kept.
+
+    Args:
+        gcp_file_path (str): Path to the company list in the GCP bucket.
+        local_file_path (str): Path where the company list is stored locally.
+
+    Returns:
+        CompanyIndex: Lookups by CIK, ticker and normalized name.
+    """
+    global _company_index, _company_index_checked_at
+    refresh_interval = float(os.getenv('AUDITPULSE_COMPANY_INDEX_REFRESH', 10*60))
+    index_path = os.getenv('AUDITPULSE_COMPANY_INDEX_PATH', os.path.join(os.path.dirname(local_file_path), 'company_index.json'))
+    with _company_index_lock:
+        if _company_index is not None and time.time() - _company_index_checked_at < refresh_interval:
+            return _company_index
+        _company_index_checked_at = time.time()
+        blob = get_company_blob(gcp_file_path)
+        generation = blob.generation if blob is not None else None
+        if _company_index is not None and (generation is None or _company_index.generation == generation):
+            return _company_index
+        saved_index = CompanyIndex.load(index_path)
+        if saved_index is not None and (generation is None or saved_index.generation == generation):
+            _company_index = saved_index
+            return _company_index
+        download_companies_data(gcp_file_path, local_file_path, blob)
+        _company_index = CompanyIndex(load_company_data(local_file_path), generation)
+        _company_index.save(index_path)
+        return _company_index
+
 class AuditPulseInputs(BaseModel):
     """Validated and sanitized inputs."""
     company_name: str = Field(..., description="Name of the company to audit.")
@@ -79,8 +139,7 @@ class DataValidator:
         self.company_data = None
         self.central_index_key = central_index_key
         self.year = year
-        self._companies_data_path = 'inputs/us_public_companies.json'
-        download_companies_data(local_file_path=self._companies_data_path)
+        self._companies_data_path = COMPANIES_LOCAL_PATH
 
     def run_validation(self):
         """
@@ -93,8 +152,8 @@ class DataValidator:
         if not is_validated:
            return is_validated, message
         is_validated, message = self._validate_company_name()
-        # if not is_validated:
-        #     return is_validated, message
+        if not is_validated:
+            return is_validated, message
         is_validated, message = self._validate_year()
         if not is_validated:
             return is_validated, message
@@ -108,8 +167,7 @@ class DataValidator:
         Returns:
             tuple: (bool, str) indicating whether validation was successful and a corresponding message.
         """
-        companies_data = load_company_data(self._companies_data_path)
-        company_data = companies_data.get(str(self.central_index_key), None)
+        company_data = get_company_index(local_file_path=self._companies_data_path).lookup_cik(self.central_index_key)
         if not company_data:
             return False, "Invalid central index key."
         self.company_data = company_data  
@@ -117,7 +175,10 @@ class DataValidator:
 
     def _validate_company_name(self, name_length_threshold: int = 150):
         """
-        Validates the company name.
+        Validates that the company name refers to the company of the central index key.
+
+        The name may differ from the SEC title in case, punctuation, legal suffixes and
+        small typos, e.g. "Nvidia Corporation" for "NVIDIA CORP".
 
         Args:
             name_length_threshold (int): Maximum allowable length for a company name. Default is 150.
@@ -125,10 +186,17 @@ class DataValidator:
         Returns:
             tuple: (bool, str) indicating whether validation was successful and a corresponding message.
         """
-        if not self.company_name.isalnum():
-            return False, "Company name must be alphanumeric."
+        name = normalize_company_name(self.company_name)
+        if not name:
+            return False, "Company name must contain letters or digits."
         elif len(self.company_name) > name_length_threshold:
             return False, f"Company name must be less than {name_length_threshold} characters."
+        title = normalize_company_name(self.company_data.get('title', ''))
+        if strip_legal_suffixes(name) == strip_legal_suffixes(title):
+            return True, "Company name is valid."
+        resolved = get_company_index(local_file_path=self._companies_data_path).resolver.resolve(self.company_name)
+        if resolved is None or int(resolved['cik_str']) != int(self.company_data['cik_str']):
+            return False, "Company name does not match the central index key."
         return True, "Company name is valid."
     
     def _validate_year(self):
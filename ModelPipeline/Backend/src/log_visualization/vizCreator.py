@@ -1,79 +1,97 @@
 import os
+import numpy as np
 import pandas as pd
-import re
-import matplotlib.pyplot as plt
-from datetime import datetime
-import seaborn as sns
-from io import BytesIO
-import base64
-sns.set(style='whitegrid')
 import plotly.graph_objects as go
 import plotly.express as px
+from plotly.offline import get_plotlyjs_version
+
+from auditpulse_flow.event_log import read_events
+
+# The figures are rendered without plotly.js, the page loads it once from this CDN.
+PLOTLY_JS_URL = f"https://cdn.plot.ly/plotly-{get_plotlyjs_version()}.min.js"
+# Above this many events the timeline shows event counts per time bucket instead of every event.
+MAX_TIMELINE_POINTS = 2000
+TIMELINE_BUCKETS = 400
+# Longer runs show evenly spaced thoughts in the reasoning graph, each cut to a readable length.
+MAX_GRAPH_THOUGHTS = 150
+MAX_THOUGHT_CHARS = 600
 
 def createVisualizations(path, final_visualization_path):
-    with open(path, 'r', encoding='utf-8') as f:
-        raw_log = f.read()
+    events = load_events(path)
+
+    html_durations = plotAverageDuration(events)
+    html_timeline = plot_interactive_timeline(events)
+    html_graph = makeGraph(events)
+    makeHTML(final_visualization_path,html_timeline, html_graph, html_durations)
+
 
-    chart1_b64 = plotAverageDuration(raw_log)
-    html_timeline = plot_interactive_timeline(raw_log)
-    html_graph = makeGraph(raw_log)
-    makeHTML(final_visualization_path,html_timeline, html_graph, chart1_b64)
+def load_events(path):
+    """
+    Loads the JSONL event log of a run written by auditpulse_flow.event_log.
+
+    Args:
+        path (str): Path of the event log.
 
+    Returns:
+        pd.DataFrame: One row per event, with the timestamp parsed and every column
+                      used by the plots present.
+    """
+    events = pd.DataFrame(read_events(path))
+    for column in ['type', 'timestamp', 'call_id', 'tool_name', 'agent_role', 'thought']:
+        if column not in events.columns:
+            events[column] = None
+    events['timestamp'] = pd.to_datetime(events['timestamp'])
+    return events.sort_values('timestamp', kind='stable').reset_index(drop=True)
 
-def fig_to_base64(fig):
-    buf = BytesIO()
-    fig.savefig(buf, format='png', bbox_inches='tight')
-    buf.seek(0)
-    encoded = base64.b64encode(buf.read()).decode('utf-8')
-    plt.close(fig)
-    return f"data:image/png;base64,{encoded}"
 
+def fig_to_html(fig):
+    # plotly.js is included once by makeHTML
+    return fig.to_html(full_html=False, include_plotlyjs=False)
 
-def plot_interactive_timeline(raw_log):
+
+def downsample_timeline(df):
+    """
+    Aggregates the timeline of long runs into time buckets.
+
+    Args:
+        df (pd.DataFrame): Timeline rows with Label, Type, Timestamp and Details.
+
+    Returns:
+        pd.DataFrame: The rows unchanged if there are at most MAX_TIMELINE_POINTS, else one
+                      row per label and bucket holding the first timestamp and the event count.
+    """
+    if len(df) <= MAX_TIMELINE_POINTS:
+        return df
+    span = df["Timestamp"].max() - df["Timestamp"].min()
+    bucket = (df["Timestamp"] - df["Timestamp"].min()) // (span / TIMELINE_BUCKETS)
+    df = df.assign(Label=df["Label"].astype(str), Bucket=bucket)
+    aggregated = df.groupby(["Type", "Label", "Bucket"], sort=False).agg(
+        Timestamp=("Timestamp", "first"), Count=("Timestamp", "size")).reset_index()
+    details = {"Tool": "Tool used", "LLM": "LLM Call", "Agent": "Agent active"}
+    aggregated["Details"] = (aggregated["Type"].map(details) + ": " + aggregated["Label"] + ", "
+                             + aggregated["Count"].astype(str) + " events from " + aggregated["Timestamp"].astype(str))
+    return aggregated.drop(columns=["Bucket", "Count"]).sort_values("Timestamp")
+
+
+def plot_interactive_timeline(events):
 
     # Extract events
-    tool_events = re.findall(r"\[(.*?)\]\[🤖 TOOL USAGE STARTED: '(.*?)'\]", raw_log)
-    llm_events = re.findall(r"\[🤖 LLM CALL STARTED\]: (\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}\.\d+)", raw_log)
-    agent_mentions = re.findall(r"\[(.*?)\]# Agent: (.*?)$", raw_log, re.MULTILINE)
-
-    event_log = []
-
-    # Add tool usage events
-    for ts, tool in tool_events:
-        timestamp = datetime.strptime(ts, "%Y-%m-%d %H:%M:%S")
-        event_log.append({
-            "Label": tool,
-            "Type": "Tool",
-            "Timestamp": timestamp,
-            "Details": f"Tool used: {tool} at {timestamp}"
-        })
-
-    # Add LLM call events
-    for ts in llm_events:
-        timestamp = datetime.strptime(ts, "%Y-%m-%d %H:%M:%S.%f")
-        event_log.append({
-            "Label": "LLM",
-            "Type": "LLM",
-            "Timestamp": timestamp,
-            "Details": f"LLM Call at {timestamp}"
-        })
-
-    # Add agent activations
-    for ts, agent in agent_mentions:
-        timestamp = datetime.strptime(ts, "%Y-%m-%d %H:%M:%S")
-        event_log.append({
-            "Label": agent,
-            "Type": "Agent",
-            "Timestamp": timestamp,
-            "Details": f"Agent active: {agent} at {timestamp}"
-        })
-
-    # Create DataFrame
-    df = pd.DataFrame(event_log).sort_values("Timestamp")
+    tool_events = events[events['type'] == 'tool_usage_started']
+    llm_events = events[events['type'] == 'llm_call_started']
+    agent_events = events[events['type'] == 'agent_started']
+
+    df = pd.concat([
+        pd.DataFrame({"Label": tool_events['tool_name'], "Type": "Tool", "Timestamp": tool_events['timestamp']}),
+        pd.DataFrame({"Label": "LLM", "Type": "LLM", "Timestamp": llm_events['timestamp']}),
+        pd.DataFrame({"Label": agent_events['agent_role'], "Type": "Agent", "Timestamp": agent_events['timestamp']}),
+    ]).sort_values("Timestamp")
+    details = {"Tool": "Tool used", "LLM": "LLM Call", "Agent": "Agent active"}
+    df["Details"] = df["Type"].map(details) + ": " + df["Label"].astype(str) + " at " + df["Timestamp"].astype(str)
 
     if df.empty:
         print("⚠️ No events to display in the timeline.")
-        return
+        return ""
+    df = downsample_timeline(df)
 
     # Create Plotly scatter plot
     fig = px.scatter(
@@ -94,82 +112,119 @@ def plot_interactive_timeline(raw_log):
         xaxis_title="Timestamp"
     )
 
-    html_str = fig.to_html(full_html=False, include_plotlyjs='cdn')
+    html_str = fig_to_html(fig)
     return html_str
 
 
-def plotAverageDuration(raw_log):
+# Call kinds plotted, with the event types that end a call of that kind
+CALL_KINDS = {
+    'LLM CALL': ('llm_call_started', ['llm_call_completed', 'llm_call_failed']),
+    'TOOL USAGE': ('tool_usage_started', ['tool_usage_finished', 'tool_usage_failed']),
+}
+
 
-    pattern = r"\[(.*?)\]\[(.*?)\]: (.*?)$"
-    matches = re.findall(pattern, raw_log, re.MULTILINE)
+def pair_durations(events):
+    """
+    Pairs every started LLM or tool call with the event that ended it.
 
-    log_df = pd.DataFrame(matches, columns=['timestamp', 'event', 'event_time'])
-    log_df['timestamp'] = pd.to_datetime(log_df['timestamp'])
-    log_df['event_time'] = pd.to_datetime(log_df['event_time'], errors='coerce')
-    log_df['event_type'] = log_df['event'].str.extract(r'(✅|🤖|📋|🚀)')
-    log_df['event_desc'] = log_df['event'].str.replace(r'(✅|🤖|📋|🚀)', '', regex=True).str.strip()
+    Calls are matched on their call_id. Events without one are matched, in time order,
+    to the first unused end of the same kind after them: end index m_i of the i-th start
+    is max(first end after it, m_{i-1} + 1), computed for all starts at once as a
+    running maximum over sorted timestamps.
 
-    duration_df = []
-    for event_prefix in ['LLM CALL', 'TOOL USAGE']:
-        start_mask = log_df['event_desc'].str.startswith(f"{event_prefix} STARTED")
-        end_mask = log_df['event_desc'].str.startswith(f"{event_prefix} COMPLETED") | \
-                   log_df['event_desc'].str.startswith(f"{event_prefix} FINISHED")
-        starts = log_df[start_mask].copy()
-        ends = log_df[end_mask].copy()
+    Args:
+        events (pd.DataFrame): Events from `load_events`, sorted by timestamp.
 
-        for _, start in starts.iterrows():
-            later_ends = ends[ends['timestamp'] > start['timestamp']]
-            if not later_ends.empty:
-                end = later_ends.iloc[0]
-                duration = (end['timestamp'] - start['timestamp']).total_seconds()
-                duration_df.append({
-                    'Type': event_prefix,
-                    'Start': start['timestamp'],
-                    'End': end['timestamp'],
-                    'Duration (s)': duration
-                })
-                ends.drop(end.name, inplace=True)
+    Returns:
+        pd.DataFrame: One row per matched call with its Type, Start, End and Duration (s).
+    """
+    duration_frames = []
+    for event_prefix, (start_type, end_types) in CALL_KINDS.items():
+        starts = events[events['type'] == start_type]
+        ends = events[events['type'].isin(end_types)]
+
+        # Calls with an id
+        matched = starts[starts['call_id'].notna()].merge(
+            ends.loc[ends['call_id'].notna(), ['call_id', 'timestamp']], on='call_id', suffixes=('_start', '_end'))
+        duration_frames.append(pd.DataFrame({
+            'Type': event_prefix,
+            'Start': matched['timestamp_start'].values,
+            'End': matched['timestamp_end'].values,
+        }))
+
+        # Calls without an id
+        start_times = starts.loc[starts['call_id'].isna(), 'timestamp'].values
+        end_times = ends.loc[ends['call_id'].isna(), 'timestamp'].values
+        if len(start_times) and len(end_times):
+            first_end = np.searchsorted(end_times, start_times, side='right')
+            positions = np.arange(len(start_times))
+            end_idx = np.maximum.accumulate(first_end - positions) + positions
+            has_end = end_idx < len(end_times)
+            duration_frames.append(pd.DataFrame({
+                'Type': event_prefix,
+                'Start': start_times[has_end],
+                'End': end_times[end_idx[has_end]],
+            }))
+
+    duration_df = pd.concat(duration_frames, ignore_index=True)
+    duration_df['Duration (s)'] = (duration_df['End'] - duration_df['Start']).dt.total_seconds()
+    return duration_df
+
+
+def summarize_durations(duration_df):
+    """
+    Computes duration statistics per call type.
 
-    duration_df = pd.DataFrame(duration_df)
+    Args:
+        duration_df (pd.DataFrame): Output of `pair_durations`.
 
-    fig1, ax1 = plt.subplots(figsize=(10, 5))
-    sns.barplot(data=duration_df, x='Type', y='Duration (s)', estimator='mean', ax=ax1)
-    ax1.set_title('Average Duration by Event Type')
-    ax1.set_ylabel('Seconds')
-    ax1.set_xlabel('Event Type')
-    chart1_b64 = fig_to_base64(fig1)
+    Returns:
+        pd.DataFrame: Count, mean, p50, p95 and max duration in seconds, indexed by Type.
+    """
+    grouped = duration_df.groupby('Type')['Duration (s)']
+    return pd.DataFrame({
+        'count': grouped.size(),
+        'mean': grouped.mean(),
+        'p50': grouped.quantile(0.5),
+        'p95': grouped.quantile(0.95),
+        'max': grouped.max(),
+    })
 
-    return chart1_b64
 
+def plotAverageDuration(events):
 
-def wrap_text(text, width=60):
-    # Break long text into lines of `width` characters using <br> for HTML
-    return "<br>".join([text[i:i + width] for i in range(0, len(text), width)])
+    summary = summarize_durations(pair_durations(events))
 
-def makeGraph(raw_log):
+    fig = go.Figure([
+        go.Bar(name=statistic, x=summary.index, y=summary[statistic].round(3),
+               customdata=summary['count'], hovertemplate='%{x}<br>' + statistic + ': %{y}s<br>%{customdata} calls<extra></extra>')
+        for statistic in ['mean', 'p50', 'p95', 'max']
+    ])
+    fig.update_layout(
+        barmode='group',
+        title='Duration by Event Type',
+        yaxis_title='Seconds',
+        xaxis_title='Event Type',
+        height=450
+    )
 
-    cleaned_log = re.sub(r'\x1b\[[0-9;]*m', '', raw_log)
+    return fig_to_html(fig)
 
-    # Extract timestamped log lines
-    log_pattern = r"\[(.*?)\]\[(.*?)\]: (.*?)$"
-    matches = re.findall(log_pattern, cleaned_log, re.MULTILINE)
 
-    thoughts = []
-    tools = []
+def wrap_text(text, width=60):
+    # Break long text into lines of `width` characters using <br> for HTML
+    return "<br>".join([text[i:i + width] for i in range(0, len(text), width)])
 
-    # 1. Extract structured TOOL events from timestamped logs
-    for ts, event, detail in matches:
-        event_lower = event.lower()
-        if 'tool usage started' in event_lower:
-            tool_name_match = re.search(r"tool usage started: ['\"]?(.*?)['\"]?$", event, re.IGNORECASE)
-            tools.append(tool_name_match.group(1).strip() if tool_name_match else "Tool Used")
+def makeGraph(events):
 
-    # 2. Extract thoughts from lines starting with "## Thought:"
-    thought_pattern = r"## Thought:\s*([\s\S]*?)(?:\n##|$)"
-    raw_thoughts = re.findall(thought_pattern, cleaned_log)
-    for t in raw_thoughts:
-        clean_t = re.sub(r"\x1b\[[0-9;]*m", "", t).strip()
-        thoughts.append(clean_t.replace("\n", " "))
+    # 1. Tools in the order they were used
+    tools = events.loc[events['type'] == 'tool_usage_started', 'tool_name'].fillna("Tool Used").tolist()
+
+    # 2. Thoughts of the agents, taken from the LLM responses
+    thoughts = events.loc[(events['type'] == 'llm_call_completed') & events['thought'].notna(), 'thought']
+    thoughts = thoughts.str.replace("\n", " ").str.slice(0, MAX_THOUGHT_CHARS).tolist()
+    # Keep every n-th thought and the tool used after it, numbered as in the full run
+    step = -(-len(thoughts) // MAX_GRAPH_THOUGHTS) if thoughts else 1
 
     # Build graph nodes
     nodes = ["Start"]
@@ -180,7 +235,7 @@ def makeGraph(raw_log):
 
     last_node = "Start"
 
-    for i in range(len(thoughts)):
+    for i in range(0, len(thoughts), step):
         t_node = f"T{i + 1}"
         nodes.append(t_node)
         node_labels.append(f"Thought {i + 1}")
@@ -203,6 +258,7 @@ def makeGraph(raw_log):
     x_coords, y_coords = [], []
     items_per_row, x_gap, y_gap = 6, 1.5, 1.2
 
+    rows = -(-len(nodes) // items_per_row)
     for i in range(len(nodes)):
         row = i // items_per_row
         col = i % items_per_row
@@ -229,7 +285,7 @@ def makeGraph(raw_log):
     fig.update_layout(
         title="Agent Reasoning Graph",
         # width=1500,
-        height=2000,
+        height=min(2000, max(400, int(rows * y_gap * 100))),
         showlegend=False,
         hovermode="closest",
         xaxis=dict(showgrid=False, zeroline=False, showticklabels=False),
@@ -238,17 +294,18 @@ def makeGraph(raw_log):
     )
 
     # fig.write_html("crew_ai_graph.html")
-    html_str = fig.to_html(full_html=False, include_plotlyjs='cdn')
+    html_str = fig_to_html(fig)
 
     return html_str
 
-def makeHTML(final_visualization_path, html_str_timeline, html_str_graph, chart1_b64):
+def makeHTML(final_visualization_path, html_str_timeline, html_str_graph, html_str_durations):
     html_content = f"""
     <!DOCTYPE html>
     <html lang="en">
     <head>
         <meta charset="UTF-8">
         <title>Agent Log Visualizations</title>
+        <script src="{PLOTLY_JS_URL}" charset="utf-8"></script>
         <style>
         body {{
             font-family: 'Roboto', sans-serif;
@@ -288,13 +345,6 @@ def makeHTML(final_visualization_path, html_str_timeline, html_str_graph, chart1
             color: #4a5568;
             margin-bottom: 1rem;
         }}
-
-        img {{
-            max-width: 100%;
-            height: auto;
-            border-radius: 6px;
-            border: 1px solid #e2e8f0;
-        }}
     </style>
     </head>
     <body>
@@ -302,9 +352,9 @@ def makeHTML(final_visualization_path, html_str_timeline, html_str_graph, chart1
         <h1>Agent Log Visualizations</h1>
 
         <div class="plot">
-            <h2>Average Duration by Event Type</h2>
-            <p>This bar chart shows the average duration (in seconds) of key event types like LLM calls and tool usage.</p>
-            <img src="{chart1_b64}" alt="Average Duration by Event Type">
+            <h2>Duration by Event Type</h2>
+            <p>This bar chart shows the mean, median (p50), p95 and maximum duration (in seconds) of key event types like LLM calls and tool usage.</p>
+            {html_str_durations}
         </div>
         
         <div class="plot">
@@ -327,4 +377,4 @@ def makeHTML(final_visualization_path, html_str_timeline, html_str_graph, chart1
     with open(final_visualization_path, "w", encoding="utf-8") as f:
         f.write(html_content)
 
-    print("✅ HTML report created without saving any images to disk")
+    print("✅ HTML report created")
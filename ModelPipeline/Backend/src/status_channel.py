@@ -0,0 +1,195 @@
+import os
+import json
+import time
+import uuid
+import queue
+import atexit
+import threading
+
+STATUS_TOPIC = 'projects/auditpulse/topics/run-status'
+STATUS_SUBSCRIPTION_PREFIX = 'projects/auditpulse/subscriptions/run-status-'
+
+
+def make_status_event(run_id, event, **fields):
+    """
+    Builds a status event of a run.
+
+    Args:
+        run_id (str): Run the event belongs to.
+        event (str): 'running', 'task_completed', 'phase_completed', 'completed', 'visualization_ready', 'visualization_failed' or 'failed'.
+        **fields: Details of the event, e.g. the phase or the report path.
+
+    Returns:
+        dict: The event with its run_id and a timestamp.
+    """
+    return {'run_id': run_id, 'event': event, 'timestamp': time.time(), **fields}
+
+
+class PubSubStatusPublisher:
+    """Publishes status events to the run-status topic without waiting for them to be sent."""
+
+    def __init__(self, topic=STATUS_TOPIC):
+        from google.cloud import pubsub_v1
+        self.topic = topic
+        self._publisher = pubsub_v1.PublisherClient()
+
+    def publish(self, run_id, event, **fields):
+        data = json.dumps(make_status_event(run_id, event, **fields), default=str).encode('utf-8')
+        future = self._publisher.publish(self.topic, data, run_id=run_id)
+
+        def log_failure(future):
+            if future.exception():
+                print(f"Publishing the {event} status of run {run_id} failed: {future.exception()}")
+        future.add_done_callback(log_failure)
+
+
+class LocalStatusPublisher:
+    """Stand-in for local development, appends the events of each run to {status_dir}/{run_id}.jsonl."""
+
+    def __init__(self, status_dir):
+        self.status_dir = status_dir
+        self._lock = threading.Lock()
+        os.makedirs(status_dir, exist_ok=True)
+
+    def publish(self, run_id, event, **fields):
+        line = json.dumps(make_status_event(run_id, event, **fields), default=str) + '\n'
+        with self._lock:
+            with open(os.path.join(self.status_dir, f'{run_id}.jsonl'), 'a', encoding='utf-8') as f:
+                f.write(line)
+
+
+class StatusListener:
+    """
+    Delivers the status events of watched runs to the threads waiting for them.
+
+    Events of runs nobody watches are dropped, watchers fall back to the runs table
+    for the outcome of a run whose events they missed.
+    """
+
+    def __init__(self):
+        self._queues = {}
+        self._lock = threading.Lock()
+
+    def watch(self, run_id):
+        with self._lock:
+            self._queues.setdefault(run_id, queue.Queue())
+
+    def unwatch(self, run_id):
+        with self._lock:
+            self._queues.pop(run_id, None)
+
+    def _dispatch(self, event):
+        with self._lock:
+            events = self._queues.get(event.get('run_id'))
+        if events is not None:
+            events.put(event)
+
+    def get(self, run_id, timeout=1.0):
+        """
+        Waits for the next event of a watched run.
+
+        Args:
+            run_id (str): Watched run.
+            timeout (float): Seconds to wait.
+
+        Returns:
+            dict or None: The event, or None if none arrived in time.
+        """
+        with self._lock:
+            events = self._queues.get(run_id)
+        if events is None:
+            return None
+        try:
+            return events.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+
+class PubSubStatusListener(StatusListener):
+    """
+    Receives the run-status topic through a subscription of its own.
+
+    Every server process needs all events, so each one creates a subscription that
+    expires a day after it was last used and is deleted when the process exits.
+    """
+
+    def __init__(self, topic=STATUS_TOPIC):
+        super().__init__()
+        from google.cloud import pubsub_v1
+        self._subscriber = pubsub_v1.SubscriberClient()
+        self.subscription = f'{STATUS_SUBSCRIPTION_PREFIX}{uuid.uuid4().hex[:12]}'
+        self._subscriber.create_subscription(request={
+            'name': self.subscription,
+            'topic': topic,
+            'ack_deadline_seconds': 10,
+            'message_retention_duration': {'seconds': 10 * 60},
+            'expiration_policy': {'ttl': {'seconds': 24 * 60 * 60}},
+        })
+        self._streaming_pull = self._subscriber.subscribe(self.subscription, callback=self._on_message)
+        atexit.register(self.close)
+
+    def _on_message(self, message):
+        try:
+            self._dispatch(json.loads(message.data))
+        except json.JSONDecodeError:
+            pass
+        message.ack()
+
+    def close(self):
+        self._streaming_pull.cancel()
+        try:
+            self._subscriber.delete_subscription(request={'subscription': self.subscription})
+        except Exception as e:
+            print(f"Deleting the status subscription {self.subscription} failed: {e}")
+
+
+class LocalStatusListener(StatusListener):
+    """Counterpart of `LocalStatusPublisher`, tails the event files of the watched runs."""
+
+    def __init__(self, status_dir, poll_interval=0.2):
+        super().__init__()
+        self.status_dir = status_dir
+        self.poll_interval = poll_interval
+        self._offsets = {}
+        threading.Thread(target=self._tail, daemon=True).start()
+
+    def _tail(self):
+        while True:
+            with self._lock:
+                run_ids = list(self._queues)
+            self._offsets = {run_id: offset for run_id, offset in self._offsets.items() if run_id in run_ids}
+            for run_id in run_ids:
+                path = os.path.join(self.status_dir, f'{run_id}.jsonl')
+                if not os.path.exists(path):
+                    continue
+                with open(path, 'r', encoding='utf-8') as f:
+                    f.seek(self._offsets.get(run_id, 0))
+                    for line in iter(f.readline, ''):
+                        if not line.endswith('\n'):
+                            break
+                        self._offsets[run_id] = f.tell()
+                        self._dispatch(json.loads(line))
+            time.sleep(self.poll_interval)
+
+
+_status_publisher = None
+
+def get_status_publisher():
+    """Returns the publisher of the process, writing to AUDITPULSE_STATUS_DIR if set (development), else to Pub/Sub."""
+    global _status_publisher
+    if _status_publisher is None:
+        status_dir = os.getenv('AUDITPULSE_STATUS_DIR')
+        _status_publisher = LocalStatusPublisher(status_dir) if status_dir else PubSubStatusPublisher()
+    return _status_publisher
+
+def publish_status(run_id, event, **fields):
+    """Publishes a status event of a run. Failures are logged and never fail the run."""
+    try:
+        get_status_publisher().publish(run_id, event, **fields)
+    except Exception as e:
+        print(f"Publishing the {event} status of run {run_id} failed: {e}")
+
+def create_status_listener():
+    """Creates a listener reading from AUDITPULSE_STATUS_DIR if set (development), else from Pub/Sub."""
+    status_dir = os.getenv('AUDITPULSE_STATUS_DIR')
+    return LocalStatusListener(status_dir) if status_dir else PubSubStatusListener()
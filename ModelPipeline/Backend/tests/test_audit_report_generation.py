@@ -1,4 +1,5 @@
 import os
+import tempfile
 import unittest
 from unittest.mock import MagicMock, patch, mock_open
 import json
@@ -40,41 +41,6 @@ class TestAuditReportGeneration(unittest.TestCase):
         with self.assertRaises(ValueError):
             app.get_document(db_client, collection_name, document_name)
 
-    def test_compile_report(self):
-        base_path = 'output/123'
-        final_report_path = 'output/final_report/audit_report_123.md'
-        
-        with patch('os.path.exists', return_value=True), \
-             patch('os.makedirs') as mock_makedirs, \
-             patch('builtins.open', mock_open()) as mock_file:
-            
-            # Mock the file reads for each phase and task
-            mock_file.return_value.read.side_effect = [
-                '```markdown\nClient Background Content\n```',
-                '```\nFinancial Risk Content\n```',
-                '```\nEngagement Scope Content\n```',
-                '```\nPreliminary Engagement Content\n```',
-                '```\nBusiness Risk Content\n```',
-                '```\nInternal Control Content\n```',
-                '```\nAudit Strategy Content\n```',
-                '```\nControl Testing Content\n```',
-                '```\nFinancial Statement Analysis Content\n```',
-                '```\nSignificant Transaction Testing Content\n```',
-                '```\nFraud Risk Assessment Content\n```',
-                '```\nEvidence Evaluation Content\n```',
-                '```\nFinancial Statement Compliance Content\n```',
-                '```\nGoing Concern Content\n```',
-                '```\nAudit Opinion Content\n```'
-            ]
-            
-            app.compile_report(base_path, final_report_path)
-            
-            # Check that the directory was created
-            # mock_makedirs.assert_called_once()
-            
-            # Check that files were opened for reading and one for writing
-            self.assertEqual(mock_file.call_count, 16)  # 15 reads + 1 write
-
     def test_upload_to_gcp(self):
         bucket = MagicMock()
         gcp_file_path = 'generated_reports/audit_report/audit_report_123.md'
@@ -100,5 +66,107 @@ class TestAuditReportGeneration(unittest.TestCase):
             bucket.blob.assert_called_once_with(gcp_file_path)
             bucket.blob.return_value.upload_from_filename.assert_called_once_with(local_file_path)
 
+    def test_upload_log_to_gcp(self):
+        bucket = MagicMock()
+        gcp_file_path = 'generated_reports/logs/log_123'
+
+        # Case - 1: Log is uploaded gzip compressed
+        with tempfile.TemporaryDirectory() as temp_dir:
+            local_file_path = os.path.join(temp_dir, 'debug_123.log')
+            with open(local_file_path, 'w') as f:
+                f.write('Report generation called')
+            app.upload_log_to_gcp(bucket, gcp_file_path, local_file_path)
+            bucket.blob.assert_called_once_with(gcp_file_path, chunk_size=8*1024*1024)
+            self.assertEqual(bucket.blob.return_value.content_encoding, 'gzip')
+            bucket.blob.return_value.upload_from_filename.assert_called_once_with(local_file_path + '.gz', content_type='text/plain')
+            self.assertFalse(os.path.exists(local_file_path + '.gz'))
+
+        # Case - 2: Missing log is skipped
+        bucket = MagicMock()
+        app.upload_log_to_gcp(bucket, gcp_file_path, 'missing.log')
+        bucket.blob.assert_not_called()
+
+    def test_log_sink(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            log_path = os.path.join(temp_dir, 'run_123.txt')
+            log_sink = app.LogSink(log_path, max_bytes=100, backup_count=2)
+
+            # Case - 1: Buffered writes reach the file on flush
+            log_sink.write('Report generation called\n')
+            log_sink.flush()
+            with open(log_path) as f:
+                self.assertEqual(f.read(), 'Report generation called\n')
+
+            # Case - 2: Large logs are rotated
+            for idx in range(30):
+                log_sink.write(f'line {idx:03d}\n')
+            self.assertTrue(os.path.exists(log_path + '.1'))
+            self.assertTrue(os.path.exists(log_path + '.2'))
+            self.assertFalse(os.path.exists(log_path + '.3'))
+
+            # Case - 3: Writes after close are dropped
+            log_sink.close()
+            log_sink.write('late line\n')
+
+    def test_get_worker_config(self):
+        # Case - 1: Defaults
+        with patch.dict(os.environ, {}, clear=True):
+            config = app.get_worker_config()
+            self.assertEqual(config['num_workers'], 1)
+            self.assertEqual(config['runs_per_worker'], 4)
+            self.assertEqual(config['idle_timeout'], float('inf'))
+            self.assertEqual(config['max_run_attempts'], 3)
+
+        # Case - 2: Overrides from the environment
+        with patch.dict(os.environ, {'AUDITPULSE_RUNS_PER_WORKER': '8', 'AUDITPULSE_IDLE_TIMEOUT': '300'}, clear=True):
+            config = app.get_worker_config()
+            self.assertEqual(config['runs_per_worker'], 8)
+            self.assertEqual(config['idle_timeout'], 300.0)
+
+    def test_get_retry_backoff(self):
+        self.assertEqual(app.get_retry_backoff(None), 30)
+        self.assertEqual(app.get_retry_backoff(1), 30)
+        self.assertEqual(app.get_retry_backoff(3), 120)
+        self.assertEqual(app.get_retry_backoff(10), 600)
+
+    def test_get_run_status(self):
+        # Case - 1: Run exists
+        with patch('app.execute_query', return_value=('completed',)) as mock_execute:
+            self.assertEqual(app.get_run_status('123'), 'completed')
+            mock_execute.assert_called_once_with(app.get_query('status_select'), ('123',), fetch='one')
+
+        # Case - 2: Run does not exist
+        with patch('app.execute_query', return_value=None):
+            self.assertIsNone(app.get_run_status('123'))
+
+    def test_share_run_outcome(self):
+        values = ('completed', 'audit.md', 'visualization.html', 'logs', 'prompts', 'Done.', 'leader')
+
+        # Case - 1: Attached runs get the outcome of the leader in one batch
+        inflight_runs = MagicMock()
+        inflight_runs.release.return_value = ['follower_1', 'follower_2']
+        with patch('app.execute_batch') as mock_execute_batch, patch('app.publish_status') as mock_publish_status:
+            app.share_run_outcome(inflight_runs, 'key', 'leader', values)
+            inflight_runs.release.assert_called_once_with('key', 'leader')
+            mock_execute_batch.assert_called_once_with([(app.get_query('run_update'), [values[:-1] + ('follower_1',), values[:-1] + ('follower_2',)])])
+            self.assertEqual([call.args[:2] for call in mock_publish_status.call_args_list], [('follower_1', 'completed'), ('follower_2', 'completed')])
+
+        # Case - 2: A failed release does not fail the leader
+        inflight_runs = MagicMock()
+        inflight_runs.release.side_effect = Exception('unavailable')
+        with patch('app.execute_batch') as mock_execute_batch:
+            app.share_run_outcome(inflight_runs, 'key', 'leader', values)
+            mock_execute_batch.assert_not_called()
+
+    def test_get_policy_version(self):
+        # Case - 1: Explicit version
+        self.assertEqual(app.get_policy_version({'active_policy_version': 'v3', 'active_policy_path': 'configs/policy/policy_v2.json'}), 'v3')
+
+        # Case - 2: Version derived from the policy file name
+        self.assertEqual(app.get_policy_version({'active_policy_path': 'configs/policy/policy_v2.json'}), 'policy_v2')
+
+        # Case - 3: No policy information
+        self.assertEqual(app.get_policy_version({}), 'local')
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
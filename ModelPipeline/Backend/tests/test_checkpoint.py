@@ -0,0 +1,50 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import MagicMock
+import sys
+sys.path.append('./src')
+from auditpulse_flow.checkpoint import RunCheckpoint
+
+class TestRunCheckpoint(unittest.TestCase):
+
+    def test_save_and_load(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            # Case - 1: No checkpoint
+            checkpoint = RunCheckpoint('123', temp_dir)
+            checkpoint._bucket = MagicMock()
+            checkpoint._bucket.list_blobs.return_value = []
+            self.assertIsNone(checkpoint.load())
+
+            # Case - 2: Saved state is restored and mirrored to GCS
+            checkpoint.save({'run_id': '123', 'client_background_task': 'done'})
+            self.assertEqual(checkpoint.load(), {'run_id': '123', 'client_background_task': 'done'})
+            checkpoint._bucket.blob.assert_called_once_with('checkpoints/123/state.json')
+
+    def test_gcs_errors_do_not_fail(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            checkpoint = RunCheckpoint('123', temp_dir)
+            checkpoint._bucket = MagicMock()
+            checkpoint._bucket.blob.side_effect = Exception('unavailable')
+            checkpoint.save({'run_id': '123'})
+            self.assertTrue(os.path.exists(os.path.join(temp_dir, 'state.json')))
+
+    def test_count_attempt(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            checkpoint = RunCheckpoint('123', temp_dir)
+            checkpoint._bucket = MagicMock()
+            blob = checkpoint._bucket.blob.return_value
+
+            # Case - 1: First attempt
+            blob.exists.return_value = False
+            self.assertEqual(checkpoint.count_attempt(), 1)
+            blob.upload_from_string.assert_called_with('1')
+
+            # Case - 2: Attempts of earlier deliveries are counted
+            blob.exists.return_value = True
+            blob.download_as_text.return_value = '2'
+            self.assertEqual(checkpoint.count_attempt(), 3)
+            checkpoint._bucket.blob.assert_called_with('checkpoints/123/attempts')
+
+if __name__ == '__main__':
+    unittest.main()
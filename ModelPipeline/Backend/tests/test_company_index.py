@@ -0,0 +1,38 @@
+import os
+import tempfile
+import unittest
+import sys
+sys.path.append('./src')
+from data_validation.create_cik_index import CompanyIndex
+
+class TestCompanyIndex(unittest.TestCase):
+
+    def test_company_index(self):
+        data = {
+            "320193": {"cik_str": 320193, "ticker": "AAPL", "title": "Apple Inc."},
+            "1045810": {"cik_str": 1045810, "ticker": "NVDA", "title": "NVIDIA CORP"},
+        }
+        company_index = CompanyIndex(data, generation=7)
+
+        # Case - 1: Lookups by CIK, ticker and name ignore padding, case and punctuation
+        self.assertEqual(company_index.lookup_cik('0000320193')['ticker'], 'AAPL')
+        self.assertEqual(company_index.lookup_cik(1045810)['ticker'], 'NVDA')
+        self.assertEqual(company_index.lookup_ticker(' nvda ')['cik_str'], 1045810)
+        self.assertEqual(company_index.lookup_name('apple inc')['cik_str'], 320193)
+
+        # Case - 2: Unknown or malformed keys
+        self.assertIsNone(company_index.lookup_cik('abc'))
+        self.assertIsNone(company_index.lookup_cik('1'))
+        self.assertIsNone(company_index.lookup_ticker('MSFT'))
+
+        # Case - 3: The persisted index keeps its generation and lookups
+        with tempfile.TemporaryDirectory() as temp_dir:
+            index_path = os.path.join(temp_dir, 'company_index.json')
+            company_index.save(index_path)
+            saved_index = CompanyIndex.load(index_path)
+            self.assertEqual(saved_index.generation, 7)
+            self.assertEqual(saved_index.lookup_ticker('AAPL')['title'], 'Apple Inc.')
+            self.assertIsNone(CompanyIndex.load(os.path.join(temp_dir, 'missing.json')))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,39 @@
+import unittest
+import sys
+sys.path.append('./src')
+from company_resolver import CompanyResolver
+
+class TestCompanyResolver(unittest.TestCase):
+
+    def setUp(self):
+        self.resolver = CompanyResolver([
+            {"cik_str": 320193, "ticker": "AAPL", "title": "Apple Inc."},
+            {"cik_str": 1418121, "ticker": "APLE", "title": "Apple Hospitality REIT, Inc."},
+            {"cik_str": 1045810, "ticker": "NVDA", "title": "NVIDIA CORP"},
+            {"cik_str": 789019, "ticker": "MSFT", "title": "MICROSOFT CORP"},
+            {"cik_str": 1067983, "ticker": "BRK-B", "title": "BERKSHIRE HATHAWAY INC"},
+        ])
+
+    def test_search(self):
+        # Case - 1: Exact ticker and name matches rank before prefix matches
+        matches = self.resolver.search('apple')
+        self.assertEqual([record['ticker'] for record, _ in matches[:2]], ['AAPL', 'APLE'])
+        self.assertEqual(self.resolver.search('brk.b')[0][0]['title'], 'BERKSHIRE HATHAWAY INC')
+
+        # Case - 2: Misspelled names still find the company
+        self.assertEqual(self.resolver.search('micrsoft')[0][0]['ticker'], 'MSFT')
+
+        # Case - 3: Empty queries
+        self.assertEqual(self.resolver.search('  '), [])
+
+    def test_resolve(self):
+        # Case - 1: Free-text names ignore case, punctuation and legal suffixes
+        self.assertEqual(self.resolver.resolve('Nvidia Corporation')['cik_str'], 1045810)
+        self.assertEqual(self.resolver.resolve('apple')['cik_str'], 320193)
+        self.assertEqual(self.resolver.resolve('Microsft Corp')['cik_str'], 789019)
+
+        # Case - 2: Unrelated names don't resolve
+        self.assertIsNone(self.resolver.resolve('Tesla'))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,64 @@
+import unittest
+from unittest.mock import MagicMock, patch
+import sys
+sys.path.append('./src')
+import database
+
+class TestDatabase(unittest.TestCase):
+
+    def test_execute_batch(self):
+        # Case - 1: Statements run in one transaction
+        conn = MagicMock()
+        conn.cursor.return_value.rowcount = 2
+        with patch('database.get_pool') as mock_pool:
+            mock_pool.return_value.get_connection.return_value = conn
+            rowcount = database.execute_batch([('UPDATE runs SET status=%s WHERE run_id=%s', [('completed', '1'), ('completed', '2')])])
+            self.assertEqual(rowcount, 2)
+            conn.cursor.return_value.executemany.assert_called_once()
+            conn.commit.assert_called_once()
+            conn.close.assert_called_once()
+
+        # Case - 2: Transient errors are retried
+        conn = MagicMock()
+        conn.cursor.return_value.fetchone.return_value = ('completed',)
+        with patch('database.get_pool') as mock_pool, patch('time.sleep'):
+            mock_pool.return_value.get_connection.side_effect = [database.mysql.connector.errors.OperationalError('gone away'), conn]
+            row = database.execute_query('SELECT status FROM runs WHERE run_id=%s', ('1',), fetch='one')
+            self.assertEqual(row, ('completed',))
+
+        # Case - 3: Other errors roll back and are raised
+        conn = MagicMock()
+        conn.cursor.return_value.execute.side_effect = ValueError('bad query')
+        with patch('database.get_pool') as mock_pool:
+            mock_pool.return_value.get_connection.return_value = conn
+            with self.assertRaises(ValueError):
+                database.execute_query('SELECT 1')
+            conn.rollback.assert_called_once()
+
+    def test_blocking_connection_pool(self):
+        cnx = MagicMock(spec=database.pooling.MySQLConnection)
+        cnx.is_connected.return_value = True
+        with patch('database.pooling.connect', return_value=cnx):
+            pool = database.BlockingConnectionPool(timeout=0.1, pool_size=1, pool_name='test', pool_reset_session=False, **database.DB_CONFIG)
+        cnx.pool_config_version = pool._config_version
+
+        # Case - 1: Borrowers wait for a free connection, then give up with a PoolError
+        conn = pool.get_connection()
+        with self.assertRaises(database.mysql.connector.errors.PoolError):
+            pool.get_connection()
+
+        # Case - 2: Returning a connection frees it for the next borrower
+        conn.close()
+        pool.get_connection().close()
+
+    def test_get_pool_size(self):
+        # Case - 1: One connection per run, per upload thread and one for telemetry
+        with patch.dict('os.environ', {'AUDITPULSE_RUNS_PER_WORKER': '4'}, clear=True):
+            self.assertEqual(database.get_pool_size(), 9)
+
+        # Case - 2: Explicit sizes are capped at the mysql-connector maximum
+        with patch.dict('os.environ', {'AUDITPULSE_DB_POOL_SIZE': '50'}, clear=True):
+            self.assertEqual(database.get_pool_size(), 32)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,36 @@
+import os
+import tempfile
+import contextvars
+import unittest
+import sys
+sys.path.append('./src')
+from auditpulse_flow import event_log
+
+class TestEventLog(unittest.TestCase):
+
+    def test_log_event(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = os.path.join(temp_dir, 'events_123.jsonl')
+
+            def run():
+                event_log.start_event_log(path, '123')
+                event_log.set_task_context(phase='client_acceptance', task='client_background_and_integrity_assessment', agent='Auditor')
+                call_id = event_log.start_call('llm')
+                event_log.log_event('llm_call_started', call_id=call_id, prompt_tokens=10)
+                event_log.log_event('llm_call_completed', call_id=event_log.end_call('llm'), completion_tokens=5)
+                event_log.close_event_log()
+
+            # Case - 1: Events carry the run and task of the context that emitted them
+            contextvars.copy_context().run(run)
+            events = event_log.read_events(path)
+            self.assertEqual([event['type'] for event in events], ['llm_call_started', 'llm_call_completed'])
+            self.assertEqual(events[0]['run_id'], '123')
+            self.assertEqual(events[0]['phase'], 'client_acceptance')
+            self.assertEqual(events[0]['call_id'], events[1]['call_id'])
+
+            # Case - 2: Outside of a run events are dropped
+            event_log.log_event('llm_call_started')
+            self.assertEqual(len(event_log.read_events(path)), 2)
+
+if __name__ == '__main__':
+    unittest.main()
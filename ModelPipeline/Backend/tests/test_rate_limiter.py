@@ -0,0 +1,43 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+import sys
+sys.path.append('./src')
+from auditpulse_flow import rate_limiter
+
+class TestRateLimiter(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.state_path = os.path.join(self.temp_dir.name, 'rate_limits.json')
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_estimate_tokens(self):
+        self.assertEqual(rate_limiter.estimate_tokens(None), 0)
+        self.assertEqual(rate_limiter.estimate_tokens('a' * 40), 10)
+        self.assertEqual(rate_limiter.estimate_tokens([{'role': 'user', 'content': 'a' * 20}, {'content': 'b' * 20}]), 10)
+
+    def test_acquire_within_quota(self):
+        limiter = rate_limiter.SharedRateLimiter(self.state_path, {'model': {'rpm': 2, 'tpm': 1000}})
+        with patch('time.sleep') as mock_sleep:
+            self.assertEqual(limiter.acquire('model', 100), 0)
+            self.assertEqual(limiter.acquire('model', 100), 0)
+            mock_sleep.assert_not_called()
+
+    def test_acquire_waits_when_exhausted(self):
+        limiter = rate_limiter.SharedRateLimiter(self.state_path, {'model': {'rpm': 1, 'tpm': 1000}})
+        limiter.acquire('model', 10)
+        # A second limiter on the same state file shares the bucket.
+        other_limiter = rate_limiter.SharedRateLimiter(self.state_path, {'model': {'rpm': 1, 'tpm': 1000}})
+        self.assertGreater(other_limiter._update('model', requests=1, tokens=10, block=True), 0)
+
+    def test_consume_charges_tokens(self):
+        limiter = rate_limiter.SharedRateLimiter(self.state_path, {'model': {'rpm': 100, 'tpm': 1000}})
+        limiter.consume('model', 1000)
+        self.assertGreater(limiter._update('model', requests=1, tokens=500, block=True), 0)
+
+if __name__ == '__main__':
+    unittest.main()
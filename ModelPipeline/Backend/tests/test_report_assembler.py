@@ -0,0 +1,51 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import MagicMock
+import sys
+sys.path.append('./src')
+from auditpulse_flow.report_assembler import REPORT_SECTIONS, ReportAssembler, clean_markdown
+
+class TestReportAssembler(unittest.TestCase):
+
+    def test_clean_markdown(self):
+        self.assertEqual(clean_markdown('```markdown\n# Client Background\n```'), '# Client Background')
+        self.assertEqual(clean_markdown('```\nFinancial Risk Content\n```\n'), 'Financial Risk Content')
+        self.assertEqual(clean_markdown('# Title\n```markdown\nBody'), '# Title\n\nBody')
+        self.assertEqual(clean_markdown('markdown down payment'), 'markdown down payment')
+
+    def test_add(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            for phase, task_files in REPORT_SECTIONS.items():
+                os.makedirs(os.path.join(temp_dir, phase))
+                for task_file in task_files:
+                    with open(os.path.join(temp_dir, phase, task_file), 'w') as f:
+                        f.write(f'```markdown\n{task_file}\n```')
+            report_path = os.path.join(temp_dir, 'final_report', 'audit_report.md')
+            on_phase_complete = MagicMock()
+            assembler = ReportAssembler(temp_dir, report_path, on_phase_complete)
+
+            # Case - 1: Sections finishing out of order wait for the ones before them
+            assembler.add('client_acceptance', 1)
+            with open(report_path) as f:
+                self.assertEqual(f.read(), '')
+            assembler.add('client_acceptance', 0)
+            with open(report_path) as f:
+                self.assertEqual(f.read(), 'client_background_task.md\nfinancial_risk_task.md\n')
+
+            # Case - 2: Completing a phase publishes the partial report
+            assembler.add('client_acceptance', 2)
+            on_phase_complete.assert_called_once_with('client_acceptance', 'client_background_task.md\nfinancial_risk_task.md\nengagement_scope_task.md\n')
+
+            # Case - 3: All sections in report order
+            for phase, task_files in reversed(list(REPORT_SECTIONS.items())):
+                for idx in range(len(task_files)):
+                    assembler.add(phase, idx)
+            self.assertTrue(assembler.complete)
+            with open(report_path) as f:
+                expected = ''.join(f'{task_file}\n' for task_files in REPORT_SECTIONS.values() for task_file in task_files)
+                self.assertEqual(f.read(), expected)
+            self.assertEqual(on_phase_complete.call_count, len(REPORT_SECTIONS))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,64 @@
+import json
+import time
+import unittest
+from unittest.mock import MagicMock
+import sys
+sys.path.append('./src')
+from auditpulse_flow.result_store import ResultStore, make_result_key
+
+class TestResultStore(unittest.TestCase):
+
+    def test_make_result_key(self):
+        # Case - 1: Same inputs map to the same key
+        key = make_result_key(1045810, '2024', 'configs/prompts/v1', 'policy_v2', 'vertex_ai/gemini-2.0-flash-lite-001')
+        self.assertEqual(key, make_result_key('1045810', 2024, 'configs/prompts/v1', 'policy_v2', 'vertex_ai/gemini-2.0-flash-lite-001'))
+
+        # Case - 2: A new prompt version changes the key
+        self.assertNotEqual(key, make_result_key(1045810, '2024', 'configs/prompts/v2', 'policy_v2', 'vertex_ai/gemini-2.0-flash-lite-001'))
+
+    def test_get(self):
+        bucket = MagicMock()
+        store = ResultStore(bucket, max_age=60)
+        blob = bucket.blob.return_value
+
+        # Case - 1: Fresh entry
+        blob.exists.return_value = True
+        blob.download_as_text.return_value = json.dumps({'run_id': '123', 'created_at': time.time()})
+        self.assertEqual(store.get('key')['run_id'], '123')
+        bucket.blob.assert_called_with('result_cache/key.json')
+
+        # Case - 2: Stale entry
+        blob.download_as_text.return_value = json.dumps({'run_id': '123', 'created_at': time.time() - 120})
+        self.assertIsNone(store.get('key'))
+
+        # Case - 3: Missing entry
+        blob.exists.return_value = False
+        self.assertIsNone(store.get('key'))
+
+        # Case - 4: GCS errors are a miss
+        bucket.blob.side_effect = Exception('unavailable')
+        self.assertIsNone(store.get('key'))
+
+    def test_visualization(self):
+        bucket = MagicMock()
+        store = ResultStore(bucket, max_age=60)
+        blob = bucket.blob.return_value
+        uploads = []
+        blob.upload_from_string.side_effect = lambda data, **kwargs: uploads.append(json.loads(data))
+        blob.download_as_text.side_effect = lambda **kwargs: json.dumps(uploads[-1])
+
+        # Case - 1: The entry is written as soon as the audit report is uploaded
+        store.put('key', '123', 'audit_report.md')
+        self.assertTrue(uploads[-1]['visualization_pending'])
+
+        # Case - 2: Runs reusing it meanwhile are handed the visualization, the creation time is kept
+        self.assertTrue(store.wait_for_visualization('key', '456')['visualization_pending'])
+        self.assertEqual(store.set_visualization('key', 'visualization.html'), ['456'])
+        self.assertEqual(uploads[-1]['visualization_path'], 'visualization.html')
+        self.assertEqual(uploads[-1]['created_at'], uploads[0]['created_at'])
+
+        # Case - 3: Runs arriving after the visualization get its path
+        self.assertEqual(store.wait_for_visualization('key', '789')['visualization_path'], 'visualization.html')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,28 @@
+import tempfile
+import unittest
+import sys
+sys.path.append('./src')
+import status_channel
+
+class TestStatusChannel(unittest.TestCase):
+
+    def test_local_status_channel(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            publisher = status_channel.LocalStatusPublisher(temp_dir)
+            listener = status_channel.LocalStatusListener(temp_dir, poll_interval=0.01)
+            listener.watch('123')
+
+            # Case - 1: Events of a watched run are delivered in order
+            publisher.publish('123', 'running')
+            publisher.publish('456', 'running')
+            publisher.publish('123', 'task_completed', completed_tasks=1, total_tasks=15)
+            self.assertEqual(listener.get('123', timeout=2)['event'], 'running')
+            event = listener.get('123', timeout=2)
+            self.assertEqual((event['event'], event['completed_tasks']), ('task_completed', 1))
+
+            # Case - 2: Waiting times out without events, unwatched runs get none
+            self.assertIsNone(listener.get('123', timeout=0.05))
+            self.assertIsNone(listener.get('456', timeout=0.05))
+
+if __name__ == '__main__':
+    unittest.main()
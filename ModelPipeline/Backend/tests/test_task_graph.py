@@ -0,0 +1,46 @@
+import time
+import threading
+import unittest
+from unittest.mock import MagicMock
+import sys
+sys.path.append('./src')
+from auditpulse_flow import task_graph
+
+class TestTaskGraph(unittest.TestCase):
+
+    def test_get_context_dependencies(self):
+        first, second = MagicMock(context=None), MagicMock(context=None)
+        third = MagicMock(context=[first, second])
+        fourth = MagicMock(context=[third])
+
+        dependencies = task_graph.get_context_dependencies([first, second, third, fourth])
+        self.assertEqual(dependencies, {0: [], 1: [], 2: [0, 1], 3: [2]})
+
+    def test_get_template_fields(self):
+        task = MagicMock(description="Review {company_name} for {year} using {engagement_scope_and_strategy}.",
+                         expected_output="A memo for {company_name}.")
+        self.assertEqual(task_graph.get_template_fields(task), {'company_name', 'year', 'engagement_scope_and_strategy'})
+
+    def test_run_task_graph(self):
+        # Case - 1: Independent nodes run concurrently, dependent ones after them
+        intervals = {}
+        both_started = threading.Barrier(2, timeout=5)
+        def execute(node):
+            start = time.perf_counter()
+            if node in (0, 1):
+                # Each independent node waits for the other to start, which only happens if they overlap.
+                both_started.wait()
+            intervals[node] = (start, time.perf_counter())
+            return node * 2
+
+        results = task_graph.run_task_graph([0, 1, 2], {2: [0, 1]}, execute)
+        self.assertEqual(results, {0: 0, 1: 2, 2: 4})
+        self.assertLess(max(intervals[0][0], intervals[1][0]), min(intervals[0][1], intervals[1][1]))
+        self.assertGreaterEqual(intervals[2][0], max(intervals[0][1], intervals[1][1]))
+
+        # Case - 2: Cyclic dependencies
+        with self.assertRaises(ValueError):
+            task_graph.run_task_graph([0, 1], {0: [1], 1: [0]}, execute)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,65 @@
+import os
+import sqlite3
+import tempfile
+import contextvars
+import unittest
+from unittest import mock
+import sys
+sys.path.append('./src')
+from auditpulse_flow import telemetry
+from auditpulse_flow.event_log import set_task_context
+
+class TestTelemetry(unittest.TestCase):
+
+    def test_run_telemetry(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            sqlite_path = os.path.join(temp_dir, 'telemetry.sqlite')
+
+            def run_task(task_name, failed_llm_call):
+                set_task_context(phase='client_acceptance', task=task_name, agent='Auditor')
+                telemetry.task_started()
+                telemetry.call_started('llm-1' + task_name, prompt_tokens=1000, rate_limit_wait=0.5)
+                telemetry.call_finished('llm', 'llm-1' + task_name, failed=failed_llm_call, model='vertex_ai/gemini-2.0-flash-lite-001')
+                telemetry.call_started('llm-2' + task_name, prompt_tokens=1000)
+                telemetry.call_finished('llm', 'llm-2' + task_name, model='vertex_ai/gemini-2.0-flash-lite-001', completion_tokens=200)
+                telemetry.call_started('tool-1' + task_name)
+                telemetry.call_finished('tool', 'tool-1' + task_name)
+                telemetry.task_finished()
+
+            def run():
+                telemetry.start_telemetry('123')
+                contextvars.copy_context().run(run_task, 'client_background_and_integrity_assessment', True)
+                contextvars.copy_context().run(run_task, 'financial_risk_and_independence_assessment', False)
+                return telemetry.finish_telemetry()
+
+            with mock.patch.object(telemetry, '_telemetry_store', telemetry.TelemetryStore(sqlite_path)):
+                rows = contextvars.copy_context().run(run)
+
+            # Case - 1: Calls are attributed to the task that made them
+            task_row = rows[0]
+            self.assertEqual(task_row['task'], 'client_background_and_integrity_assessment')
+            self.assertEqual(task_row['llm_calls'], 2)
+            self.assertEqual(task_row['llm_retries'], 1)
+            self.assertEqual(task_row['prompt_tokens'], 2000)
+            self.assertEqual(task_row['tool_calls'], 1)
+            self.assertEqual(task_row['rate_limit_wait'], 0.5)
+            self.assertAlmostEqual(task_row['cost'], (2000 * 0.075 + 200 * 0.30) / 1e6)
+
+            # Case - 2: Phase and run rows add up the tasks
+            phase_row, run_row = rows[2], rows[3]
+            self.assertEqual((phase_row['phase'], phase_row['task']), ('client_acceptance', None))
+            self.assertEqual(phase_row['llm_calls'], 4)
+            self.assertEqual((run_row['phase'], run_row['task']), (None, None))
+            self.assertEqual(run_row['tool_calls'], 2)
+
+            # Case - 3: Rows land in the store and replace the ones of a previous attempt
+            with mock.patch.object(telemetry, '_telemetry_store', telemetry.TelemetryStore(sqlite_path)):
+                contextvars.copy_context().run(run)
+            with sqlite3.connect(sqlite_path) as conn:
+                self.assertEqual(conn.execute("SELECT COUNT(*) FROM run_telemetry WHERE run_id='123'").fetchone()[0], 4)
+
+            # Case - 4: Outside of a run nothing is recorded
+            self.assertEqual(telemetry.finish_telemetry(), [])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,61 @@
+import os
+import time
+import tempfile
+import unittest
+from unittest.mock import MagicMock, patch
+import sys
+sys.path.append('./src')
+from auditpulse_flow.tools import tool_cache
+
+class TestToolCache(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.temp_dir.name, 'tool_cache.sqlite')
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_make_cache_key(self):
+        key = tool_cache.make_cache_key('search', {'search_query': ' NVIDIA  10-K ', 'page': None})
+        self.assertEqual(key, tool_cache.make_cache_key('search', {'search_query': 'NVIDIA 10-K'}))
+        self.assertNotEqual(key, tool_cache.make_cache_key('scrape', {'search_query': 'NVIDIA 10-K'}))
+
+    def test_ttl_and_eviction(self):
+        cache = tool_cache.ToolResultCache(self.db_path, max_bytes=30)
+
+        # Case - 1: Expired entries are misses
+        cache.set('expired', 'value', ttl_seconds=-1)
+        self.assertIsNone(cache.get('expired'))
+
+        # Case - 2: Least recently used entry is evicted first
+        cache.set('a', 'x' * 10, ttl_seconds=60)
+        time.sleep(0.01)
+        cache.set('b', 'y' * 10, ttl_seconds=60)
+        cache.get('a')
+        time.sleep(0.01)
+        cache.set('c', 'z' * 10, ttl_seconds=60)
+        self.assertEqual(cache.get('a'), 'x' * 10)
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('c'), 'z' * 10)
+
+    def test_cached_tool_run(self):
+        run = MagicMock(return_value={'organic': []})
+        with patch.dict(os.environ, {'AUDITPULSE_TOOL_CACHE_PATH': self.db_path}), \
+             patch.object(tool_cache, '_tool_cache', None):
+            first = tool_cache.cached_tool_run('search', {'search_query': 'AAPL'}, run, ttl_seconds=60)
+            second = tool_cache.cached_tool_run('search', {'search_query': 'AAPL'}, run, ttl_seconds=60)
+        self.assertEqual(first, second)
+        run.assert_called_once()
+
+        # Case - 2: Failed runs return their message and are not cached
+        run = MagicMock(side_effect=[tool_cache.ToolRunError('Failed to read https://sec.gov'), 'page'])
+        with patch.dict(os.environ, {'AUDITPULSE_TOOL_CACHE_PATH': self.db_path}), \
+             patch.object(tool_cache, '_tool_cache', None):
+            failed = tool_cache.cached_tool_run('scrape', {'website_url': 'https://sec.gov'}, run, ttl_seconds=60)
+            retried = tool_cache.cached_tool_run('scrape', {'website_url': 'https://sec.gov'}, run, ttl_seconds=60)
+        self.assertEqual(failed, 'Failed to read https://sec.gov')
+        self.assertEqual(retried, 'page')
+
+if __name__ == '__main__':
+    unittest.main()
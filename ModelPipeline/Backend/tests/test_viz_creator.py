@@ -0,0 +1,58 @@
+import unittest
+import sys
+sys.path.append('./src')
+import pandas as pd
+from log_visualization.vizCreator import pair_durations, summarize_durations, downsample_timeline, MAX_TIMELINE_POINTS, TIMELINE_BUCKETS
+
+class TestVizCreator(unittest.TestCase):
+
+    def make_events(self, rows):
+        events = pd.DataFrame(rows, columns=['type', 'timestamp', 'call_id'])
+        events['timestamp'] = pd.to_datetime(events['timestamp'])
+        return events.sort_values('timestamp', kind='stable').reset_index(drop=True)
+
+    def test_pair_durations(self):
+        # Case - 1: Overlapping calls are paired on their call_id
+        events = self.make_events([
+            ('llm_call_started', '2025-01-01 00:00:00', 'a'),
+            ('llm_call_started', '2025-01-01 00:00:01', 'b'),
+            ('llm_call_completed', '2025-01-01 00:00:02', 'b'),
+            ('llm_call_failed', '2025-01-01 00:00:05', 'a'),
+            ('tool_usage_started', '2025-01-01 00:00:06', 'c'),
+            ('tool_usage_finished', '2025-01-01 00:00:09', 'c'),
+        ])
+        durations = pair_durations(events).sort_values('Start')
+        self.assertEqual(list(durations['Type']), ['LLM CALL', 'LLM CALL', 'TOOL USAGE'])
+        self.assertEqual(list(durations['Duration (s)']), [5.0, 1.0, 3.0])
+
+        # Case - 2: Calls without a call_id take the first unused end after them, unmatched starts are dropped
+        events = self.make_events([
+            ('llm_call_started', '2025-01-01 00:00:00', None),
+            ('llm_call_started', '2025-01-01 00:00:01', None),
+            ('llm_call_completed', '2025-01-01 00:00:02', None),
+            ('llm_call_completed', '2025-01-01 00:00:04', None),
+            ('llm_call_started', '2025-01-01 00:00:05', None),
+        ])
+        self.assertEqual(list(pair_durations(events)['Duration (s)']), [2.0, 3.0])
+
+        # Case - 3: Statistics per call type
+        summary = summarize_durations(pair_durations(events))
+        self.assertEqual(summary.loc['LLM CALL', 'count'], 2)
+        self.assertEqual(summary.loc['LLM CALL', 'p50'], 2.5)
+        self.assertEqual(summary.loc['LLM CALL', 'max'], 3.0)
+
+    def test_downsample_timeline(self):
+        timestamps = pd.date_range('2025-01-01', periods=2 * MAX_TIMELINE_POINTS, freq='s')
+        df = pd.DataFrame({'Label': 'LLM', 'Type': 'LLM', 'Timestamp': timestamps, 'Details': ''})
+
+        # Case - 1: Short runs keep every event
+        self.assertEqual(len(downsample_timeline(df.iloc[:MAX_TIMELINE_POINTS])), MAX_TIMELINE_POINTS)
+
+        # Case - 2: Long runs are aggregated into time buckets per label
+        downsampled = downsample_timeline(df)
+        self.assertLessEqual(len(downsampled), TIMELINE_BUCKETS + 1)
+        self.assertEqual(downsampled['Timestamp'].iloc[0], timestamps[0])
+        self.assertIn('events from', downsampled['Details'].iloc[0])
+
+if __name__ == '__main__':
+    unittest.main()
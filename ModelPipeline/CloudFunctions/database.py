@@ -0,0 +1,168 @@
+import os
+import time
+import threading
+from contextlib import contextmanager
+
+import mysql.connector
+from mysql.connector import pooling
+
+DB_CONFIG = {
+    'host': '34.46.191.121',
+    'port': 3306,
+    'user': 'root',
+    'database': 'auditpulse',
+}
+
+# Errors raised by dropped sockets, server restarts and a pool that stayed busy, they are retried.
+TRANSIENT_ERRORS = (
+    mysql.connector.errors.OperationalError,
+    mysql.connector.errors.InterfaceError,
+    mysql.connector.errors.PoolError,
+)
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+class BlockingConnectionPool(pooling.MySQLConnectionPool):
+    """
+    Connection pool whose borrowers wait for a free connection instead of failing.
+
+    mysql-connector raises PoolError as soon as every connection is borrowed. Here a
+    semaphore counts the free connections, `get_connection` waits up to `timeout`
+    seconds for one and returning a connection to the pool wakes the next borrower.
+
+    Attributes:
+        timeout (float): Seconds to wait for a free connection before PoolError is raised.
+    """
+
+    def __init__(self, timeout, pool_size, **kwargs):
+        self.timeout = timeout
+        self._free_connections = threading.BoundedSemaphore(pool_size)
+        super().__init__(pool_size=pool_size, **kwargs)
+
+    def get_connection(self):
+        if not self._free_connections.acquire(timeout=self.timeout):
+            raise mysql.connector.errors.PoolError(f"No connection of pool {self.pool_name} was free for {self.timeout} seconds")
+        try:
+            return super().get_connection()
+        except Exception:
+            self._free_connections.release()
+            raise
+
+    def add_connection(self, cnx=None):
+        # Called without a connection while the pool is filled, with one when a borrower returns it.
+        super().add_connection(cnx)
+        if cnx is not None:
+            self._free_connections.release()
+
+
+def get_pool_size():
+    """
+    Sizes the pool to the threads of a worker process that can hold a connection at once.
+
+    Every concurrent run and every thread of the upload pool (see `app.get_worker_config`)
+    may write a status, plus one connection for the telemetry of finishing runs.
+    AUDITPULSE_DB_POOL_SIZE overrides it.
+
+    Returns:
+        int: Number of connections, at most the 32 mysql-connector allows.
+    """
+    if os.getenv('AUDITPULSE_DB_POOL_SIZE'):
+        pool_size = int(os.getenv('AUDITPULSE_DB_POOL_SIZE'))
+    else:
+        runs_per_worker = int(os.getenv('AUDITPULSE_RUNS_PER_WORKER', 4))
+        pool_size = runs_per_worker + max(2, runs_per_worker) + 1
+    return min(pool_size, pooling.CNX_POOL_MAXSIZE)
+
+def get_pool():
+    """
+    Returns the connection pool of the process, created on first use.
+
+    The pool is sized by `get_pool_size` and borrowers wait up to AUDITPULSE_DB_POOL_TIMEOUT
+    seconds (5 minutes by default) for a free connection. It is created lazily so that
+    forked worker processes each open their own connections.
+
+    Returns:
+        BlockingConnectionPool: The process-wide pool.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = BlockingConnectionPool(
+                timeout=float(os.getenv('AUDITPULSE_DB_POOL_TIMEOUT', 5*60)),
+                pool_size=get_pool_size(),
+                pool_name='auditpulse',
+                pool_reset_session=True,
+                password=os.getenv('MYSQL_GCP_PASS'),
+                connection_timeout=10,
+                **DB_CONFIG
+            )
+        return _pool
+
+@contextmanager
+def get_connection():
+    """
+    Borrows a live connection from the pool and returns it when done.
+
+    The connection is pinged first, so a socket the server closed while the
+    worker was busy with LLM calls is reconnected instead of failing the query.
+    """
+    conn = get_pool().get_connection()
+    try:
+        conn.ping(reconnect=True, attempts=3, delay=1)
+        yield conn
+    finally:
+        conn.close()
+
+def execute_batch(statements, fetch=None, dictionary=False, retries=3, backoff=1):
+    """
+    Runs statements in a single transaction, retrying it on transient errors.
+
+    Args:
+        statements (list): (query, values) pairs. A list of value tuples runs the query once per tuple.
+        fetch (str): 'one' or 'all' to return the rows of the last statement, None for its row count.
+        dictionary (bool): Whether fetched rows are dicts instead of tuples.
+        retries (int): Attempts before the error is raised.
+        backoff (float): Delay in seconds before the first retry, doubled on every retry.
+
+    Returns:
+        tuple, dict, list or int: The fetched rows or the row count of the last statement.
+    """
+    for attempt in range(retries):
+        try:
+            with get_connection() as conn:
+                cursor = conn.cursor(dictionary=dictionary)
+                try:
+                    for query, values in statements:
+                        if isinstance(values, list):
+                            cursor.executemany(query, values)
+                        else:
+                            cursor.execute(query, values)
+                    if fetch == 'one':
+                        result = cursor.fetchone()
+                    elif fetch == 'all':
+                        result = cursor.fetchall()
+                    else:
+                        result = cursor.rowcount
+                    conn.commit()
+                    return result
+                except Exception:
+                    conn.rollback()
+                    raise
+                finally:
+                    cursor.close()
+        except TRANSIENT_ERRORS as e:
+            if attempt == retries - 1:
+                raise
+            print(f"Transient MySQL error, retrying in {backoff * 2 ** attempt} seconds: {e}")
+            time.sleep(backoff * 2 ** attempt)
+
+def execute_query(query, values=None, fetch=None, dictionary=False, retries=3, backoff=1):
+    """
+    Runs a single statement in its own transaction, see `execute_batch`.
+
+    Returns:
+        tuple, dict, list or int: The fetched rows or the row count of the statement.
+    """
+    return execute_batch([(query, values)], fetch, dictionary, retries, backoff)
@@ -1,6 +1,6 @@
 import functions_framework
 import os
-import mysql.connector
+from database import execute_query
 import google.auth
 from google.auth.transport.requests import Request
 from google.oauth2 import service_account
@@ -28,22 +28,12 @@ def deploy_backend(request):
         image = "us-east1-docker.pkg.dev/auditpulse/auditpulse-images/auditpulse-app:latest"
         job_url = f"https://{region}-run.googleapis.com/apis/run.googleapis.com/v1/namespaces/{project_id}/jobs/{job_name}"
 
-        mysql_conn = mysql.connector.connect(
-        host='34.46.191.121',
-        port=3306,
-        user='root',
-        database='auditpulse',
-        password=os.getenv('MYSQL_GCP_PASS')
-    )
-
-        mysql_cursor = mysql_conn.cursor()
-
         query = """
         SELECT COUNT(*) FROM runs 
         WHERE status='queued'
         """
-        mysql_cursor.execute(query)
-        result = mysql_cursor.fetchone()
+        # The pool outlives the request, so warm instances reuse their connection.
+        result = execute_query(query, fetch='one')
 
         count = result[0]
 
@@ -53,7 +43,7 @@ def deploy_backend(request):
                     'message': 'There are no jobs queued. Skipping job deployment.'
                 }, 200
         per_request_time_est = 15*60
-        per_instance_request = 2
+        per_instance_request = int(os.getenv('AUDITPULSE_RUNS_PER_WORKER', 4))
         threshold = 0.25
         max_time_allowed = 6*60*60
         batches = (count + per_instance_request - 1) // per_instance_request
@@ -93,6 +83,10 @@ def deploy_backend(request):
                                         }
                                     },
                                     "env": [
+                                        {
+                                            "name": "AUDITPULSE_RUNS_PER_WORKER",
+                                            "value": str(per_instance_request)
+                                        },
                                         {
                                             "name": "SERPER_API_KEY",
                                             "valueFrom": {
@@ -8,57 +8,117 @@ import sqlalchemy
 from sqlalchemy import text
 import uuid
 import time
+import atexit
+import threading
 from google.cloud import pubsub_v1
+from company_resolver import CompanyResolver
+from status_channel import create_status_listener
 
 st.set_page_config(page_title="Audit Pulse", layout="centered")
 # GCS utilities
+@st.cache_resource
+def get_storage_client():
+    # One client per server process, shared by every session
+    return storage.Client()
+
 def download_file_from_gcs(bucket_name, file_path):
     try:
-        client = storage.Client()
-        blob = client.bucket(bucket_name).blob(file_path)
+        blob = get_storage_client().bucket(bucket_name).blob(file_path)
         return blob.download_as_bytes()
     except Exception as e:
         st.error(f"Failed to download file from GCS: {e}")
 
         return None
 
-def fetch_json_from_gcs(bucket_name, blob_name):
-    try:
-        client = storage.Client()
-        blob = client.bucket(bucket_name).blob(blob_name)
-        return json.loads(blob.download_as_string())
-    except Exception as e:
-        st.error(f"Failed to fetch JSON data from GCS: {e}")
-        return None
+class CompanyDirectory:
+    """
+    SEC company list shared by every session of the server process.
+
+    The GCS generation of the list is checked at most every `refresh_interval` seconds
+    and the list is downloaded and indexed again only when it changed. If GCS can't be
+    reached the last loaded list keeps being served.
+
+    Attributes:
+        bucket_name (str): Bucket holding the company list.
+        blob_name (str): Path of the company list in the bucket.
+        refresh_interval (float): Seconds between generation checks.
+    """
+
+    def __init__(self, bucket_name, blob_name, refresh_interval):
+        self.bucket_name = bucket_name
+        self.blob_name = blob_name
+        self.refresh_interval = refresh_interval
+        self.generation = None
+        self.resolver = None
+        self._checked_at = 0
+        self._lock = threading.Lock()
+
+    def get_resolver(self):
+        with self._lock:
+            if self.resolver is not None and time.time() - self._checked_at < self.refresh_interval:
+                return self.resolver
+            self._checked_at = time.time()
+            try:
+                blob = get_storage_client().bucket(self.bucket_name).get_blob(self.blob_name)
+                if blob is not None and blob.generation != self.generation:
+                    companies = json.loads(blob.download_as_bytes(if_generation_match=blob.generation))
+                    self.resolver = CompanyResolver(companies.values())
+                    self.generation = blob.generation
+            except Exception as e:
+                print(f"Failed to refresh company data from GCS: {e}")
+            return self.resolver
+
+@st.cache_resource
+def get_company_directory():
+    return CompanyDirectory("auditpulse-data", "configs/us_public_companies/us_public_companies.json",
+                            float(os.getenv("COMPANY_DIRECTORY_REFRESH", 10 * 60)))
 
 # Cloud SQL connection
+@st.cache_resource
+def get_cloud_sql_engine():
+    # One connector and pooled engine per server process, shared by every session and click
+    instance_connection_name = "auditpulse:us-central1:auditpulse"
+    db_user = "root"
+    db_pass = os.getenv('MYSQL_GCP_PASS')
+    db_name = "auditpulse"
+    ip_type = os.environ.get("IP_TYPE", "PUBLIC").upper()  # Optional: set to "PRIVATE" if needed
+
+    connector = Connector(ip_type=IPTypes.PRIVATE if ip_type == "PRIVATE" else IPTypes.PUBLIC)
+
+    def getconn():
+        return connector.connect(
+            instance_connection_name,
+            "pymysql",
+            user=db_user,
+            password=db_pass,
+            db=db_name,
+        )
+
+    engine = sqlalchemy.create_engine(
+        "mysql+pymysql://",
+        creator=getconn,
+        pool_size=int(os.getenv("DB_POOL_SIZE", 5)),
+        max_overflow=2,
+        pool_timeout=30,
+        pool_recycle=30 * 60,  # Reconnect before Cloud SQL drops idle connections
+        pool_pre_ping=True,
+    )
+
+    def close():
+        engine.dispose()
+        connector.close()
+    atexit.register(close)
+    return engine
+
 def connect_to_cloud_sql():
     try:
-        # Read config from environment variables
-        instance_connection_name = "auditpulse:us-central1:auditpulse"
-        db_user = "root"
-        db_pass = os.getenv('MYSQL_GCP_PASS')
-        db_name = "auditpulse"
-        ip_type = os.environ.get("IP_TYPE", "PUBLIC").upper()  # Optional: set to "PRIVATE" if needed
-
-        connector = Connector(ip_type=IPTypes.PRIVATE if ip_type == "PRIVATE" else IPTypes.PUBLIC)
-
-        def getconn():
-            return connector.connect(
-                instance_connection_name,
-                "pymysql",
-                user=db_user,
-                password=db_pass,
-                db=db_name,
-            )
-
-        return sqlalchemy.create_engine("mysql+pymysql://", creator=getconn)
+        return get_cloud_sql_engine()
     except Exception as e:
         st.error(f"Failed to connect to Cloud SQL: {e}")
         return None
 
 # Pub/Sub message
-def publish_to_pubsub(run_id, username, central_index_key, company_name, ticker, year):
+def publish_to_pubsub(run_id, username, central_index_key, company_name, ticker, year, force_refresh=False):
     try:
         topic_path = 'projects/auditpulse/topics/deployment-request-queue'
         data = json.dumps({
@@ -67,62 +127,141 @@ def publish_to_pubsub(run_id, username, central_index_key, company_name, ticker,
             'central_index_key': central_index_key,
             'company_name': company_name,
             'ticker': ticker,
-            'year': year
+            'year': year,
+            'force_refresh': force_refresh
         }).encode('utf-8')
 
         pubsub_v1.PublisherClient().publish(topic_path, data).result()
+        return True
     except Exception as e:
         print(f"Failed to publish message to Pub/Sub: {e}")
+        return False
+
+# Run status
+@st.cache_resource
+def create_shared_status_listener():
+    # One subscription to the run-status topic per server process, shared by every session
+    return create_status_listener()
+
+def get_status_listener():
+    # Failures are not cached, the next report tries to subscribe again
+    try:
+        return create_shared_status_listener()
+    except Exception as e:
+        print(f"Failed to subscribe to run status events, polling the runs table instead: {e}")
+        return None
+
+def get_run_event(run_id):
+    # Fallback for when the status channel stays silent, e.g. events sent before a restart
+    engine = connect_to_cloud_sql()
+    if not engine:
+        return None
+    with engine.connect() as conn:
+        query = text("SELECT status, audit_report_path, explainability_report_path, message FROM runs WHERE run_id = :run_id;")
+        row = conn.execute(query, {"run_id": run_id}).fetchone()
+    if not row or row[0] not in ("completed", "failed"):
+        return None
+    status, audit_path, explain_path, message = row
+    return {"run_id": run_id, "event": status, "audit_report_path": audit_path,
+            "explainability_report_path": explain_path, "message": message}
 
 # Monitor and download
-def monitor_status_and_download(run_id, bucket_name, start_time):
+def monitor_status_and_download(run_id, bucket_name, start_time, listener=None):
     try:
-        engine = connect_to_cloud_sql()
         total_time = 15 * 60  # 15 minutes in seconds
+        visualization_timeout = 10 * 60  # The explainability report is published after the audit report
+        # The database is only read when no event arrived for this long, or every 30 seconds without a listener
+        silence_timeout = 2 * 60 if listener else 30
+        completed_at = None
+        visualization_failed = False
+        task_progress = None
+        last_event_at = time.time()
         with st.spinner("⏳ Generating reports, please wait (est. 15 minutes)..."):
             progress_bar = st.progress(0)
             time_remaining_text = st.empty()
+            progress_text = st.empty()
+            partial_report = st.empty()
             while True:
-                elapsed = time.time() - start_time
-                remaining = max(0, total_time - elapsed)
-                percent_complete = min(1.0, elapsed / total_time)
-                progress_bar.progress(int(percent_complete * 100))
-                mins, secs = divmod(int(remaining), 60)
-                time_remaining_text.info(
-                    f"Estimated time remaining: {mins:02d}:{secs:02d}")
-                with engine.connect() as conn:
-                    query = text("SELECT status, audit_report_path, explainability_report_path FROM runs WHERE run_id = :run_id;")
-                    row = conn.execute(query, {"run_id": run_id}).fetchone()
-
-                    if row:
-                        status, audit_path, explain_path = row
-                        if status == "completed":
-                            audit_data = download_file_from_gcs(bucket_name, audit_path)
-                            explain_data = download_file_from_gcs(bucket_name, explain_path)
-
-                            if audit_data and explain_data:
-                                st.session_state["audit_file_data"] = audit_data
-                                st.session_state["explainability_file_data"] = explain_data
-                            st.session_state["report_in_progress"] = False
-
-                            break
-                        elif status == "failed":
-                            st.error("❌ Report generation failed.")
-                            break
-
-                    time.sleep(30)
+                if completed_at is None:
+                    elapsed = time.time() - start_time
+                    remaining = max(0, total_time - elapsed)
+                    percent_complete = task_progress if task_progress is not None else min(1.0, elapsed / total_time)
+                    progress_bar.progress(int(percent_complete * 100))
+                    mins, secs = divmod(int(remaining), 60)
+                    time_remaining_text.info(
+                        f"Estimated time remaining: {mins:02d}:{secs:02d}")
+
+                # Events are pushed by the worker, waiting returns as soon as one arrives
+                if listener:
+                    event = listener.get(run_id, timeout=1)
+                else:
+                    time.sleep(1)
+                    event = None
+                if event is None and time.time() - last_event_at > silence_timeout:
+                    event = get_run_event(run_id)
+                    last_event_at = time.time()
+                if event is None:
+                    if completed_at is not None and time.time() - completed_at > visualization_timeout:
+                        st.warning("The explainability report is not available yet.")
+                        break
+                    continue
+                last_event_at = time.time()
+
+                if event["event"] == "running" and event.get("message"):
+                    progress_text.info(f"⏳ {event['message']}")
+                elif event["event"] == "task_completed":
+                    task_progress = event["completed_tasks"] / event["total_tasks"]
+                    progress_text.info(f"⏳ Completed {event['completed_tasks']} of {event['total_tasks']} tasks, "
+                                       f"last: {event['task'].replace('_', ' ')}.")
+                elif event["event"] == "phase_completed":
+                    # The backend publishes the report assembled so far after every phase
+                    progress_text.success(f"✅ {event['message']}")
+                    partial_data = download_file_from_gcs(bucket_name, event["partial_report_path"])
+                    if partial_data:
+                        with partial_report.container():
+                            with st.expander("📝 Report so far"):
+                                st.markdown(partial_data.decode("utf-8"))
+                elif event["event"] == "completed":
+                    if completed_at is None:
+                        completed_at = time.time()
+                        progress_bar.progress(100)
+                        st.session_state["audit_file_data"] = download_file_from_gcs(bucket_name, event["audit_report_path"])
+                        st.session_state["report_in_progress"] = False
+                        time_remaining_text.info("Audit report ready, waiting for the explainability report...")
+                    if event.get("explainability_report_path") and not st.session_state["explainability_file_data"]:
+                        st.session_state["explainability_file_data"] = download_file_from_gcs(bucket_name, event["explainability_report_path"])
+                    if st.session_state["explainability_file_data"]:
+                        break
+                    if visualization_failed:
+                        st.warning("The explainability report could not be generated.")
+                        break
+                elif event["event"] == "visualization_ready":
+                    # Events are not ordered, the audit report may still be on its way
+                    st.session_state["explainability_file_data"] = download_file_from_gcs(bucket_name, event["explainability_report_path"])
+                    if completed_at is not None:
+                        break
+                elif event["event"] == "visualization_failed":
+                    visualization_failed = True
+                    if completed_at is not None:
+                        st.warning("The explainability report could not be generated.")
+                        break
+                elif event["event"] == "failed":
+                    st.error("❌ Report generation failed.")
+                    break
     except Exception as e:
         st.error(f"An error occurred while monitoring report status: {e}")
+    finally:
+        if listener:
+            listener.unwatch(run_id)
 
 # Generate report
-def generate_report(username, central_index_key, year, json_data):
+def generate_report(username, central_index_key, year, company, force_refresh=False):
     try:
         engine = connect_to_cloud_sql()
         if not engine:
             return
 
         run_id = str(uuid.uuid4())
-        company = json_data.get(str(central_index_key), {})
         status = "queued"
         timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 
@@ -146,11 +285,23 @@ def generate_report(username, central_index_key, year, json_data):
         st.session_state["current_run_id"] = run_id
         print(f"🚀 Report generation started! Run ID: {run_id}")
 
-        publish_to_pubsub(run_id, username, central_index_key,
-                          company.get("title", "Unknown"),
-                          company.get("ticker", "Unknown"), year)
+        st.session_state["audit_file_data"] = None
+        st.session_state["explainability_file_data"] = None
 
-        monitor_status_and_download(run_id, "auditpulse-data", time.time())
+        if not publish_to_pubsub(run_id, username, central_index_key,
+                                 company.get("title", "Unknown"),
+                                 company.get("ticker", "Unknown"), year, force_refresh):
+            with engine.begin() as conn:
+                conn.execute(text("UPDATE runs SET status = 'failed', message = :message WHERE run_id = :run_id"),
+                             {"run_id": run_id, "message": "Failed to queue the request."})
+            st.error("❌ Failed to queue the report, please try again.")
+            return
+
+        # The status channel is optional, the runs table covers a run whose events are missed
+        listener = get_status_listener()
+        if listener:
+            listener.watch(run_id)
+        monitor_status_and_download(run_id, "auditpulse-data", time.time(), listener)
 
     except Exception as e:
         st.error(f"Failed to generate report: {e}")
@@ -192,48 +343,60 @@ def main():
     if "explainability_file_data" not in st.session_state:
         st.session_state["explainability_file_data"] = None
 
-    json_data = fetch_json_from_gcs("auditpulse-data", "configs/us_public_companies/us_public_companies.json")
-    if not json_data:
+    resolver = get_company_directory().get_resolver()
+    if resolver is None:
         st.error("Failed to load company data.")
         return
     st.divider()
     st.markdown("### 🧾 Enter Report Details")
 
-    valid_ciks = [int(item['cik_str']) for item in json_data.values()]
+    default_cik = int(resolver.records[4]['cik_str'])
+
+    company_query = st.text_input("🔎 Search Company", placeholder="Company name or ticker, e.g. Apple or AAPL", disabled=st.session_state["report_in_progress"])
+    if company_query:
+        matches = [record for record, _ in resolver.search(company_query, limit=10)]
+        if matches:
+            selected = st.selectbox("Matching companies", matches, format_func=lambda record: f"{record['title']} ({record['ticker']})",
+                                    disabled=st.session_state["report_in_progress"])
+            default_cik = int(selected['cik_str'])
+        else:
+            st.warning("No company matches your search.")
 
     col1, col2 = st.columns(2)
     username = col1.text_input("👤 Username", placeholder="Type your username", max_chars=36, disabled=st.session_state["report_in_progress"])
-    central_index_key = col2.number_input("🏢 Central Index Key", min_value=0, value=valid_ciks[4], step=1, disabled=st.session_state["report_in_progress"])
+    central_index_key = col2.number_input("🏢 Central Index Key", min_value=0, value=default_cik, step=1, disabled=st.session_state["report_in_progress"])
 
     current_year = datetime.datetime.now().year
     year = st.number_input("📅 Year", min_value=1990, max_value=current_year, value=current_year - 1, step=1, disabled=st.session_state["report_in_progress"])
 
-    if central_index_key not in valid_ciks:
+    company_info = resolver.lookup_cik(central_index_key)
+    if company_info is None:
         st.error("Invalid Central Index Key. Please enter a valid one.")
         return
 
-    company_info = next((item for item in json_data.values() if item['cik_str'] == central_index_key), {})
-
     st.markdown("### 🏷️ Company Information")
     st.text_input("Ticker", value=company_info.get("ticker", "Unknown"), disabled=True)
     st.text_input("Company Name", value=company_info.get("title", "Unknown"), disabled=True)
 
+    force_refresh = st.checkbox("🔄 Regenerate even if a recent report exists", value=False, disabled=st.session_state["report_in_progress"])
+
     st.divider()
     if username and central_index_key and year:
         if st.button("📥 Generate Report"):
             st.session_state["report_in_progress"] = True
-            generate_report(username, central_index_key, year, json_data)
+            generate_report(username, central_index_key, year, company_info, force_refresh)
 
-    if st.session_state["audit_file_data"] and st.session_state["explainability_file_data"]:
+    if st.session_state["audit_file_data"]:
         st.divider()
         st.markdown("### 📄 Download Reports")
         st.download_button("⬇️ Audit Report", st.session_state["audit_file_data"], file_name="audit_report.md", mime="text/markdown")
-        st.download_button(
-            "⬇️ Explainability Report",
-            st.session_state["explainability_file_data"],
-            file_name="explainability_report.html",
-            mime="text/html"
-        )
+        if st.session_state["explainability_file_data"]:
+            st.download_button(
+                "⬇️ Explainability Report",
+                st.session_state["explainability_file_data"],
+                file_name="explainability_report.html",
+                mime="text/html"
+            )
 
         st.divider()
         st.markdown("### 💬 Feedback")
@@ -0,0 +1,179 @@
+import re
+import bisect
+from itertools import chain
+from collections import Counter, defaultdict
+
+# Legal suffixes dropped when matching a free-text name, e.g. "Apple" matches "Apple Inc.".
+LEGAL_SUFFIXES = {'inc', 'incorporated', 'corp', 'corporation', 'co', 'company', 'ltd', 'limited',
+                  'llc', 'lp', 'plc', 'sa', 'nv', 'ag', 'holdings', 'group', 'the', 'de', 'new'}
+# Trigrams shared by more than this fraction of the titles (e.g. " in", "cor") don't select
+# candidates when a query has rarer ones, they carry little signal and dominate the lookup time.
+COMMON_TRIGRAM_FRACTION = 0.02
+# Titles sharing the most rare trigrams with a query that are scored, the rest can't rank.
+FUZZY_CANDIDATES = 50
+
+
+def normalize_company_name(company_name):
+    """
+    Normalizes a company name for lookups, ignoring case, punctuation and spacing.
+
+    Args:
+        company_name (str): Company name.
+
+    Returns:
+        str: Lowercase words of the name separated by single spaces.
+    """
+    return ' '.join(re.sub(r'[^0-9a-z]+', ' ', str(company_name).casefold()).split())
+
+def strip_legal_suffixes(normalized_name):
+    """Drops legal suffixes like inc or corp from a normalized name, keeping at least one word."""
+    words = normalized_name.split()
+    while len(words) > 1 and words[-1] in LEGAL_SUFFIXES:
+        words.pop()
+    return ' '.join(words)
+
+def normalize_ticker(ticker):
+    """Upper-cases a ticker and drops separators, so BRK-B, brk.b and BRK B match."""
+    return re.sub(r'[^0-9A-Z]+', '', str(ticker).upper())
+
+def make_trigrams(text):
+    padded = f'  {text} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class CompanyResolver:
+    """
+    Resolves company names and tickers to SEC company records.
+
+    Built once from the company list: exact lookups by CIK, ticker and normalized
+    name, sorted keys for prefix search, and a trigram index over the titles for
+    misspelled or partial names. Queries touch only the matching entries, never the
+    whole list.
+
+    Attributes:
+        records (list): Company records with cik_str, ticker and title.
+    """
+
+    def __init__(self, records):
+        self.records = list(records)
+        self._by_cik = {}
+        self._by_ticker = {}
+        self._by_name = {}
+        self._prefix_keys = []
+        self._trigrams = defaultdict(list)
+        self._trigram_sets = []
+        names = [normalize_company_name(record.get('title') or '') for record in self.records]
+        for idx, (record, name) in enumerate(zip(self.records, names)):
+            ticker = normalize_ticker(record.get('ticker') or '')
+            self._by_cik.setdefault(int(record['cik_str']), idx)
+            if ticker:
+                self._by_ticker.setdefault(ticker, idx)
+                self._prefix_keys.append((ticker.lower(), idx))
+            if name:
+                self._by_name.setdefault(name, idx)
+                self._prefix_keys.append((name, idx))
+            trigrams = make_trigrams(strip_legal_suffixes(name))
+            for trigram in trigrams:
+                self._trigrams[trigram].append(idx)
+            self._trigram_sets.append(trigrams)
+        # Names without their legal suffixes never shadow a full name
+        for idx, name in enumerate(names):
+            if name:
+                self._by_name.setdefault(strip_legal_suffixes(name), idx)
+        self._prefix_keys.sort()
+        self._common_postings = max(50, int(len(self.records) * COMMON_TRIGRAM_FRACTION))
+
+    def _record(self, idx):
+        return self.records[idx] if idx is not None else None
+
+    def lookup_cik(self, central_index_key):
+        try:
+            return self._record(self._by_cik.get(int(str(central_index_key).strip())))
+        except ValueError:
+            return None
+
+    def lookup_ticker(self, ticker):
+        return self._record(self._by_ticker.get(normalize_ticker(ticker)))
+
+    def lookup_name(self, company_name):
+        name = normalize_company_name(company_name)
+        idx = self._by_name.get(name)
+        return self._record(idx if idx is not None else self._by_name.get(strip_legal_suffixes(name)))
+
+    def _exact_matches(self, text):
+        candidates = [self._by_cik.get(int(text)) if text.isdigit() else None, self._by_ticker.get(normalize_ticker(text)),
+                      self._by_name.get(text), self._by_name.get(strip_legal_suffixes(text))]
+        return [idx for idx in candidates if idx is not None]
+
+    def _prefix_matches(self, prefix, limit):
+        start = bisect.bisect_left(self._prefix_keys, (prefix, -1))
+        matches = []
+        for key, idx in self._prefix_keys[start:start + limit * 4]:
+            if not key.startswith(prefix):
+                break
+            matches.append(idx)
+        return matches
+
+    def _fuzzy_matches(self, text):
+        query_trigrams = make_trigrams(text)
+        postings = sorted((self._trigrams[trigram] for trigram in query_trigrams if trigram in self._trigrams), key=len)
+        rare_postings = [posting for posting in postings if len(posting) <= self._common_postings] or postings[:2]
+        candidates = [idx for idx, _ in Counter(chain.from_iterable(rare_postings)).most_common(FUZZY_CANDIDATES)]
+        # Jaccard similarity over all trigrams, including the common ones that did not select candidates
+        return {idx: len(query_trigrams & self._trigram_sets[idx]) / len(query_trigrams | self._trigram_sets[idx]) for idx in candidates}
+
+    def search(self, query, limit=10):
+        """
+        Ranks the companies matching a type-ahead query.
+
+        Exact CIK, ticker and name matches come first, then tickers and names starting with
+        the query, then titles sharing the most trigrams with it.
+
+        Args:
+            query (str): Ticker, CIK or (partial) company name.
+            limit (int): Maximum number of matches.
+
+        Returns:
+            list[tuple]: (record, score) pairs, best first, with scores between 0 and 1.
+        """
+        text = normalize_company_name(query)
+        if not text:
+            return []
+        scores = {}
+
+        def add(idx, score):
+            if score > scores.get(idx, 0):
+                scores[idx] = score
+
+        for idx in self._exact_matches(text):
+            add(idx, 1.0)
+        for idx in self._prefix_matches(text, limit):
+            add(idx, 0.9)
+        if len(scores) < limit:
+            for idx, score in self._fuzzy_matches(strip_legal_suffixes(text)).items():
+                add(idx, round(score * 0.85, 4))
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], self.records[item[0]].get('title', '')))
+        return [(self.records[idx], score) for idx, score in ranked[:limit]]
+
+    def resolve(self, company_name, min_score=0.5):
+        """
+        Maps a free-text company name or ticker to a single company.
+
+        Args:
+            company_name (str): Company name or ticker as typed by a user.
+            min_score (float): Minimum fuzzy similarity accepted when there is no exact match.
+
+        Returns:
+            dict or None: The company record, or None if no company matches closely enough.
+        """
+        text = normalize_company_name(company_name)
+        if not text:
+            return None
+        record = self.lookup_name(text) or self.lookup_ticker(text)
+        if record is not None:
+            return record
+        matches = self._fuzzy_matches(strip_legal_suffixes(text))
+        if not matches:
+            return None
+        idx, score = max(matches.items(), key=lambda item: item[1])
+        return self.records[idx] if score >= min_score else None